@@ -1,4 +1,6 @@
+import glob
 import logging
+import os
 logging.getLogger("py4j").setLevel(logging.ERROR)
 
 from pyspark.sql import SparkSession
@@ -11,8 +13,104 @@ from graphframes import GraphFrame
 spark = SparkSession.builder.appName("ProcesamientoCSV").getOrCreate()
 spark.sparkContext.setLogLevel("ERROR")
 
-# 🔹 Cargar el archivo CSV
-df_sucio = spark.read.csv("wikipedia_crawl_data.csv", header=True)
+# 🔹 Formato de la salida del crawler: "csv" o "parquet" (crawler.py --output-format parquet)
+FORMATO_ENTRADA = os.environ.get("FORMATO_ENTRADA", "csv")
+
+# 🔹 Un crawl repartido (crawler.py --shards N) deja la salida de cada worker en shard-NN/
+def rutas_entrada(patron):
+    return [patron] + sorted(glob.glob(os.path.join("shard-*", patron)))
+
+# 🔹 Con WikipediaCrawler(token_ids=True) los n-gramas son IDs del vocabulario de su carpeta
+#    (vocabulary.txt, un token por línea: la línea es el ID). Cada shard tiene su propio
+#    vocabulario, así que se traducen a texto al cargar cada carpeta, antes de unirlas.
+#    La traducción está en vocabulario.py (se envía a los executors con addPyFile).
+spark.sparkContext.addPyFile(os.path.join(os.path.dirname(os.path.abspath(__file__)), "vocabulario.py"))
+from vocabulario import leer_vocabulario, decodificar_valor
+
+def decodificador(ruta_vocabulario):
+    vocabulario = spark.sparkContext.broadcast(leer_vocabulario(ruta_vocabulario))
+
+    @udf(StringType())
+    def decodificar(valor):
+        return decodificar_valor(vocabulario.value, valor)
+
+    return decodificar
+
+def decodificar_tokens(df_parte, carpeta):
+    ruta_vocabulario = os.path.join(carpeta, "vocabulary.txt")
+    if not os.path.exists(ruta_vocabulario):
+        return df_parte
+    decodificar = decodificador(ruta_vocabulario)
+    for columna in ("palabras", "unigramas", "bigramas", "trigramas"):
+        if columna in df_parte.columns:
+            df_parte = df_parte.withColumn(columna, decodificar(col(columna)))
+    return df_parte
+
+if FORMATO_ENTRADA == "parquet":
+    # Listas y mapas nativos: Spark solo lee las columnas que se usan y aplica los filtros al leer
+    # Llevar las columnas a la misma forma que el CSV para que el resto del análisis no cambie
+    def lista_a_texto(df_parquet, columna):
+        tipo = df_parquet.schema[columna].dataType
+        if isinstance(tipo, MapType):
+            # ngram_format='counts': repetir cada n-grama según su frecuencia
+            clave = "array_join(e.key, ' ')" if isinstance(tipo.keyType, ArrayType) else "CAST(e.key AS STRING)"
+            return expr(f"array_join(flatten(transform(map_entries({columna}), e -> array_repeat({clave}, e.value))), '|')")
+        if isinstance(tipo.elementType, ArrayType):
+            # token_ids: cada bigrama/trigrama es una lista de IDs
+            return expr(f"array_join(transform({columna}, x -> array_join(x, ' ')), '|')")
+        return array_join(col(columna).cast("array<string>"), "|")
+
+    def cargar(ruta):
+        df_parquet = spark.read.parquet(ruta)
+        return df_parquet.select(
+            "titulo",
+            "url",
+            lista_a_texto(df_parquet, "unigramas").alias("palabras"),
+            lista_a_texto(df_parquet, "bigramas").alias("bigramas"),
+            lista_a_texto(df_parquet, "trigramas").alias("trigramas"),
+            array_join(col("links"), "|").alias("links"),
+            col("ediciones").alias("ediciones_map"),
+            "timestamp"
+        )
+
+    partes = [
+        decodificar_tokens(cargar(ruta), os.path.dirname(ruta))
+        for ruta in rutas_entrada("wikipedia_crawl_data_parquet") if os.path.exists(ruta)
+    ]
+    df_sucio = partes[0]
+    for parte in partes[1:]:
+        df_sucio = df_sucio.unionByName(parte)
+else:
+    # 🔹 Cargar el CSV (el crawler lo reparte en segmentos: wikipedia_crawl_data.csv, wikipedia_crawl_data-00001.csv, ...)
+    partes = [
+        decodificar_tokens(spark.read.csv(ruta, header=True), os.path.dirname(ruta))
+        for ruta in rutas_entrada("wikipedia_crawl_data*.csv") if glob.glob(ruta)
+    ]
+    df_sucio = partes[0]
+    for parte in partes[1:]:
+        df_sucio = df_sucio.unionByName(parte)
+
+    # Si el crawler guardó frecuencias (ngram_format='counts', entradas 'ngrama:frecuencia'),
+    # expandirlas a la forma de lista para que el resto del análisis no cambie
+    def expandir_frecuencias(columna):
+        return expr(f"""
+            array_join(
+                flatten(
+                    transform(
+                        split({columna}, '\\\\|'),
+                        x -> IF(
+                            x RLIKE ':[0-9]+$',
+                            array_repeat(regexp_extract(x, '^(.*):[0-9]+$', 1), CAST(regexp_extract(x, ':([0-9]+)$', 1) AS INT)),
+                            array(x)
+                        )
+                    )
+                ),
+                '|'
+            )
+        """)
+
+    for columna in ("palabras", "bigramas", "trigramas"):
+        df_sucio = df_sucio.withColumn(columna, expandir_frecuencias(columna))
 
 
 
@@ -21,6 +119,15 @@ df_sucio = spark.read.csv("wikipedia_crawl_data.csv", header=True)
 # Filtrar filas donde 'url' comienza con "http://" o "https://"
 df = df_sucio.filter(col("url").rlike("^https?://.*$"))
 
+# 🔹 Con WikipediaCrawler(near_duplicates='flag') las páginas casi duplicadas (SimHash) se
+#    guardan igual y quedan anotadas en near_duplicates.csv: se excluyen para que las
+#    plantillas repetidas no inflen las coincidencias de bigramas y trigramas
+EXCLUIR_CASI_DUPLICADOS = os.environ.get("EXCLUIR_CASI_DUPLICADOS", "1") == "1"
+rutas_duplicados = [ruta for ruta in rutas_entrada("near_duplicates.csv") if os.path.exists(ruta)]
+if EXCLUIR_CASI_DUPLICADOS and rutas_duplicados:
+    df_casi_duplicados = spark.read.csv(rutas_duplicados, header=True).select("url").distinct()
+    df = df.join(df_casi_duplicados, on="url", how="left_anti")
+
 # Limpiar palabras muy largas
 df = df.withColumn(
     "palabras",
@@ -63,30 +170,36 @@ df = df.withColumn(
     """)
 )
 
-# 1. Preprocesar la cadena de la columna 'ediciones'
-#    Se asume que la cadena tiene este formato:
-#    "{""2025-06-20"": 2|""2025-06-17"": 1|""2025-06-16"": 1|...}"
-#    y queremos transformarla en:
-#    {"2025-06-20": 2, "2025-06-17": 1, "2025-06-16": 1, ...}
-df_procesado = df_sucio.withColumn("ediciones_clean",
-    # El substring(...) remueve el primer y último carácter (las comillas externas)
-    regexp_replace(
-        # Reemplazamos los pipes (|) por comas (,)
+if FORMATO_ENTRADA == "parquet":
+    # La columna ediciones ya es un mapa fecha -> ediciones
+    df_procesado = df_sucio
+else:
+    # 1. Preprocesar la cadena de la columna 'ediciones'
+    #    Se asume que la cadena tiene este formato:
+    #    "{""2025-06-20"": 2|""2025-06-17"": 1|""2025-06-16"": 1|...}"
+    #    y queremos transformarla en:
+    #    {"2025-06-20": 2, "2025-06-17": 1, "2025-06-16": 1, ...}
+    df_procesado = df_sucio.withColumn("ediciones_clean",
+        # El substring(...) remueve el primer y último carácter (las comillas externas)
         regexp_replace(
-            expr("substring(ediciones, 2, length(ediciones)-2)"),
-            "\\|", ","
-        ),
-        # Reemplazamos las dobles comillas seguidas (""), por una sola (")
-        '""', '"'
+            # Reemplazamos los pipes (|) por comas (,)
+            regexp_replace(
+                expr("substring(ediciones, 2, length(ediciones)-2)"),
+                "\\|", ","
+            ),
+            # Reemplazamos las dobles comillas seguidas (""), por una sola (")
+            '""', '"'
+        )
     )
-)
 
-# 2. Convertir la cadena 'ediciones_clean' en un Map (diccionario) usando from_json
-df_procesado = df_procesado.withColumn("ediciones_map",
-    from_json(col("ediciones_clean"), MapType(StringType(), IntegerType()))
-)
+    # 2. Convertir la cadena 'ediciones_clean' en un Map (diccionario) usando from_json
+    df_procesado = df_procesado.withColumn("ediciones_map",
+        from_json(col("ediciones_clean"), MapType(StringType(), IntegerType()))
+    )
 
 # 3. Sumar los valores del mapa.
+#    Una columna ediciones vacía (nula) es un historial que el crawler no pudo completar:
+#    queda con ediciones_total nulo en lugar de contar como cero ediciones.
 df_procesado = df_procesado.withColumn(
     "ediciones_total",
     expr("aggregate(map_values(ediciones_map), 0, (acc, x) -> acc + x)")
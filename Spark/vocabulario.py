@@ -0,0 +1,19 @@
+# 🔹 Traducción a texto de los n-gramas guardados como IDs (WikipediaCrawler(token_ids=True)).
+#    Sin dependencias de Spark: analysis.py la usa dentro de una UDF y los tests del crawler
+#    la comparan con lo que codifica su Vocabulary.
+
+def leer_vocabulario(ruta):
+    # Un token por línea: la línea (desde 0) es el ID. Una última línea sin '\n' es un token
+    # a medio escribir que ninguna fila confirmada usa (el crawler la trunca al reabrir)
+    with open(ruta, encoding="utf-8") as f:
+        return f.read().split("\n")[:-1]
+
+def decodificar_valor(tokens, valor):
+    # '12|845 3:2' -> 'costa|rica san:2' (entradas separadas por |, IDs de un n-grama por espacios)
+    if not valor:
+        return valor
+    entradas = []
+    for entrada in valor.split("|"):
+        ids, separador, frecuencia = entrada.partition(":")
+        entradas.append(" ".join(tokens[int(i)] for i in ids.split()) + separador + frecuencia)
+    return "|".join(entradas)
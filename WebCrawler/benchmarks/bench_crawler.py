@@ -0,0 +1,201 @@
+"""
+Benchmark de punta a punta de WikipediaCrawler contra un es.wikipedia local (wiki_standin)
+
+Uso:
+    python benchmarks/bench_crawler.py [carpeta_con_html] [--pages 300] [--concurrency 1 8]
+                                       [--latency 0.02] [--jitter 0.01] [--json resultados.json]
+
+Cada configuración corre en un proceso aparte (CPU y memoria pico sin mezclar) con una
+carpeta de datos temporal; el servidor corre en el proceso del benchmark, así su CPU no
+se cuenta. Se reporta páginas/s, segundos de CPU por página, RSS pico, bytes descargados
+y bytes escritos. Con --json se guardan los resultados para comparar entre versiones.
+"""
+import argparse
+import contextlib
+import io
+import json
+import logging
+import multiprocessing
+import os
+import queue
+import resource
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from wiki_standin import StandInServer, WikiStandIn  # noqa: E402
+
+
+def peak_rss_mb(usage):
+    """ru_maxrss está en KB en Linux y en bytes en macOS"""
+    return usage.ru_maxrss / (1024 * 1024 if sys.platform == 'darwin' else 1024)
+
+
+def run_crawl(config, results):
+    """Proceso hijo: crawlear `max_pages` páginas del servidor local y medir"""
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    logging.disable(logging.CRITICAL)
+    from crawler import WikipediaCrawler
+
+    with tempfile.TemporaryDirectory(prefix='bench-crawler-') as data_dir:
+        crawler = WikipediaCrawler(
+            max_depth=config['max_depth'],
+            max_pages=config['pages'],
+            delay=0,
+            concurrency=config['concurrency'],
+            fetch_mode=config['fetch_mode'],
+            cpu_workers=config['cpu_workers'],
+            ngram_format=config['ngram_format'],
+            output_format=config['output_format'],
+            frontier_policy=config['frontier_policy'],
+            token_ids=config['token_ids'],
+            near_duplicates=config['near_duplicates'],
+            base_url=config['base_url'],
+            data_dir=data_dir
+        )
+        # El limitador no debe ser el cuello de botella: se mide el crawler, no el ritmo configurado
+        crawler.rate_limiter.max_rate = crawler.rate_limiter.rate = config['max_rate']
+        crawler.resolve_redirects = config['resolve_redirects']
+
+        start_wall = time.perf_counter()
+        start_cpu = time.process_time()
+        with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+            crawler.crawl([config['start_url']])
+            crawler.save_to_csv()
+            crawler.close_progress_tracking()
+        wall = time.perf_counter() - start_wall
+        children = resource.getrusage(resource.RUSAGE_CHILDREN)
+        cpu = time.process_time() - start_cpu + children.ru_utime + children.ru_stime
+
+        pages = crawler.stats['pages']
+        snapshot = crawler.metrics.snapshot()
+        results.put({
+            'pages': pages,
+            'wall_s': round(wall, 3),
+            'pages_per_s': round(pages / wall, 2) if wall else None,
+            'cpu_s_per_page': round(cpu / pages, 5) if pages else None,
+            'peak_rss_mb': round(max(peak_rss_mb(resource.getrusage(resource.RUSAGE_SELF)), peak_rss_mb(children)), 1),
+            'requests': snapshot['counters'].get('requests', 0),
+            'bytes_downloaded': snapshot['counters'].get('bytes_downloaded', 0),
+            'near_duplicates': snapshot['counters'].get('near_duplicates', 0),
+            'near_duplicate_bytes': snapshot['counters'].get('near_duplicate_bytes', 0),
+            'bytes_written': crawler.output_sink.bytes_written if crawler.output_sink is not None else 0,
+            'stages_ms': {name: round(stage['mean_s'] * 1000, 2)
+                          for name, stage in snapshot['stages'].items() if stage['count']}
+        })
+
+
+class BenchmarkFailed(Exception):
+    """El proceso de una configuración murió, terminó con error o superó el tiempo límite"""
+
+
+def bench(config, timeout=1800.0):
+    """Correr una configuración en un proceso aparte y devolver sus métricas (BenchmarkFailed si falla)"""
+    context = multiprocessing.get_context('spawn')
+    results = context.Queue()
+    process = context.Process(target=run_crawl, args=(config, results))
+    process.start()
+    deadline = time.monotonic() + timeout
+    try:
+        while True:
+            try:
+                result = results.get(timeout=1.0)
+                break
+            except queue.Empty:
+                pass
+            if not process.is_alive():
+                # Un último intento: el resultado pudo llegar justo antes de que terminara
+                try:
+                    result = results.get(timeout=1.0)
+                    break
+                except queue.Empty:
+                    raise BenchmarkFailed(f"el proceso del benchmark terminó sin resultado (exitcode {process.exitcode})")
+            if time.monotonic() > deadline:
+                raise BenchmarkFailed(f"sin resultado después de {timeout:.0f} s")
+        process.join(timeout=60)
+        if process.exitcode != 0:
+            raise BenchmarkFailed(f"el proceso del benchmark terminó con exitcode {process.exitcode}")
+        return result
+    finally:
+        if process.is_alive():
+            process.terminate()
+            process.join()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('html_dir', nargs='?', help="Carpeta con páginas HTML de es.wikipedia guardadas")
+    parser.add_argument('--pages', type=int, default=300, help="Páginas a crawlear por corrida")
+    parser.add_argument('--site-pages', type=int, default=2000, help="Artículos del grafo sintético")
+    parser.add_argument('--max-depth', type=int, default=6)
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 8])
+    parser.add_argument('--cpu-workers', type=int, default=0)
+    parser.add_argument('--fetch-mode', default='html', choices=['html', 'parse', 'rest'])
+    parser.add_argument('--ngram-format', default='lists', choices=['lists', 'counts'])
+    parser.add_argument('--output-format', default='csv', choices=['csv', 'parquet'])
+    parser.add_argument('--token-ids', action='store_true', help="Guardar los n-gramas como IDs del vocabulario")
+    parser.add_argument('--frontier-policy', nargs='+', default=['bfs'], choices=['bfs', 'yield'])
+    parser.add_argument('--redirect-ratio', type=float, default=0.1, help="Fracción de enlaces a redirecciones")
+    parser.add_argument('--template-ratio', type=float, default=0.0,
+                        help="Fracción de artículos generados desde una misma plantilla (casi duplicados)")
+    parser.add_argument('--near-duplicates', choices=['flag', 'skip'], default=None,
+                        help="Detectar casi duplicados con SimHash (anotarlos o no guardarlos)")
+    parser.add_argument('--no-resolve-redirects', action='store_true', help="Encolar los enlaces sin resolver redirecciones")
+    parser.add_argument('--latency', type=float, default=0.02, help="Retraso fijo por respuesta (s)")
+    parser.add_argument('--jitter', type=float, default=0.01, help="Retraso aleatorio adicional máximo (s)")
+    parser.add_argument('--max-rate', type=float, default=1000.0, help="Requests/s permitidos al limitador")
+    parser.add_argument('--repeat', type=int, default=1)
+    parser.add_argument('--json', help="Guardar los resultados en este archivo")
+    parser.add_argument('--timeout', type=float, default=1800.0, help="Segundos máximos por corrida")
+    args = parser.parse_args()
+
+    site = WikiStandIn(args.html_dir, pages=args.site_pages, redirect_ratio=args.redirect_ratio,
+                      template_ratio=args.template_ratio)
+    runs = []
+    failures = 0
+    with StandInServer(site, latency=args.latency, jitter=args.jitter) as server:
+        print(f"Servidor: {server.url} | latencia {args.latency * 1000:.0f} ms + {args.jitter * 1000:.0f} ms | "
+              f"{'HTML grabado' if args.html_dir else 'grafo sintético'}")
+        print(f"{'política':>8} {'conc':>4} {'páginas':>7} {'pág/s':>8} {'CPU s/pág':>10} {'RSS MB':>7} {'req':>6} "
+              f"{'MB bajados':>10} {'MB escritos':>11} {'KB/req':>7}")
+        for policy in args.frontier_policy:
+            for concurrency in args.concurrency:
+                for _ in range(args.repeat):
+                    config = {
+                        'pages': args.pages, 'max_depth': args.max_depth, 'concurrency': concurrency,
+                        'cpu_workers': args.cpu_workers, 'fetch_mode': args.fetch_mode,
+                        'ngram_format': args.ngram_format, 'output_format': args.output_format,
+                        'token_ids': args.token_ids, 'near_duplicates': args.near_duplicates,
+                        'frontier_policy': policy, 'max_rate': args.max_rate,
+                        'resolve_redirects': not args.no_resolve_redirects,
+                        'base_url': server.url, 'start_url': server.start_url()
+                    }
+                    try:
+                        result = bench(config, timeout=args.timeout)
+                    except BenchmarkFailed as e:
+                        print(f"{policy:>8} {concurrency:>4} ERROR: {e}")
+                        failures += 1
+                        continue
+                    runs.append({'config': config, 'result': result})
+                    kb_per_request = result['bytes_written'] / 1024 / max(1, result['requests'])
+                    print(f"{policy:>8} {concurrency:>4} {result['pages']:>7} {result['pages_per_s']:>8.1f} "
+                          f"{result['cpu_s_per_page']:>10.4f} {result['peak_rss_mb']:>7.1f} {result['requests']:>6} "
+                          f"{result['bytes_downloaded'] / 1e6:>10.2f} {result['bytes_written'] / 1e6:>11.2f} "
+                          f"{kb_per_request:>7.1f}")
+                    if args.near_duplicates:
+                        print(f"     casi duplicados: {result['near_duplicates']} páginas, "
+                              f"{result['near_duplicate_bytes'] / 1e6:.2f} MB de salida")
+                    print("     ms/etapa: " + ', '.join(f"{name} {ms}" for name, ms in result['stages_ms'].items()))
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'latency': args.latency, 'jitter': args.jitter, 'runs': runs}, f, ensure_ascii=False, indent=2)
+        print(f"Resultados guardados en {args.json}")
+    if failures:
+        sys.exit(f"{failures} corrida(s) fallaron")
+
+
+if __name__ == '__main__':
+    main()
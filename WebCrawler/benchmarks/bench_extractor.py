@@ -0,0 +1,117 @@
+"""
+Benchmark del extractor de HTML: BeautifulSoup (html.parser) vs lxml en una sola pasada
+
+Uso:
+    python benchmarks/bench_extractor.py [carpeta_con_html] [--repeat N]
+
+Si no se indica una carpeta con páginas de es.wikipedia guardadas (*.html) se genera
+una página sintética con la misma estructura (piel, menú lateral, contenido y pie).
+"""
+import argparse
+import glob
+import os
+import re
+import sys
+import time
+from urllib.parse import urljoin
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bs4 import BeautifulSoup  # noqa: E402
+from html_extractor import extract_article  # noqa: E402
+
+BASE_URL = "https://es.wikipedia.org"
+
+
+def legacy_extract(html):
+    """Extractor anterior de crawl_page (BeautifulSoup + segunda pasada por p/li/dd/dt)"""
+    soup = BeautifulSoup(html, 'html.parser')
+    title_element = soup.find('h1', {'class': 'firstHeading'})
+    title = title_element.get_text().strip() if title_element else "Sin título"
+    content_div = soup.find('div', {'id': 'mw-content-text'})
+    if not content_div:
+        return None
+    for element in content_div.find_all(['script', 'style']):
+        element.decompose()
+    text_content = [content_div.get_text()]
+    for section in soup.find_all(['p', 'li', 'dd', 'dt']):
+        if section.get_text().strip():
+            text_content.append(section.get_text())
+    links = []
+    for link in soup.find_all('a', href=True):
+        href = link.get('href')
+        if href and href.startswith('/wiki/'):
+            if not any(x in href for x in [':', '#', '?', 'Archivo:', 'Categoría:', 'Plantilla:']):
+                links.append(urljoin(BASE_URL, href))
+    return title, ' '.join(text_content), links
+
+
+def count_tokens(text):
+    """Conteo aproximado de tokens con la misma limpieza que clean_text"""
+    text = re.sub(r'[^\w\s]', ' ', text)
+    text = re.sub(r'\d+', '', text)
+    return len(text.split())
+
+
+def synthetic_page(paragraphs=120):
+    """Página con la estructura de un artículo de Wikipedia para cuando no hay HTML grabado"""
+    body = ''.join(
+        f'<p>Párrafo {i} sobre la <a href="/wiki/Historia_de_Costa_Rica">historia</a> y la '
+        f'<a href="/wiki/Geograf%C3%ADa">geografía</a> del país centroamericano.</p>'
+        f'<ul><li>Elemento de lista {i}</li><li><a href="/wiki/Archivo:X.jpg">archivo</a></li></ul>'
+        for i in range(paragraphs)
+    )
+    sidebar = ''.join(f'<li><a href="/wiki/Especial:P{i}">Menú {i}</a></li>' for i in range(80))
+    return (
+        '<html><head><script>var config = {};</script><style>.x{}</style></head><body>'
+        f'<div id="mw-navigation"><ul>{sidebar}</ul></div>'
+        '<h1 id="firstHeading" class="firstHeading mw-first-heading">Costa Rica</h1>'
+        f'<div id="mw-content-text"><div class="mw-parser-output">{body}<script>x()</script></div></div>'
+        '<div id="footer"><ul><li>Última edición</li><li>Política de privacidad</li></ul></div>'
+        '</body></html>'
+    ).encode('utf-8')
+
+
+def bench(name, function, pages, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for html in pages:
+            function(html)
+    elapsed = time.perf_counter() - start
+    per_page_ms = elapsed * 1000 / (repeat * len(pages))
+    print(f"{name:<24} {per_page_ms:8.2f} ms/página  {1000 / per_page_ms:8.1f} páginas/s")
+    return per_page_ms
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('html_dir', nargs='?', help="Carpeta con páginas HTML de es.wikipedia guardadas")
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    if args.html_dir:
+        pages = [open(path, 'rb').read() for path in sorted(glob.glob(os.path.join(args.html_dir, '*.html')))]
+    else:
+        pages = [synthetic_page()]
+    if not pages:
+        sys.exit("No se encontraron páginas .html")
+
+    print(f"Páginas: {len(pages)} | Repeticiones: {args.repeat}")
+    legacy_ms = bench("BeautifulSoup (anterior)", legacy_extract, pages, args.repeat)
+    lxml_ms = bench("lxml una pasada", lambda html: extract_article(html, BASE_URL), pages, args.repeat)
+    print(f"Aceleración: {legacy_ms / lxml_ms:.1f}x")
+
+    # Comparar tokens: el extractor anterior contaba dos veces párrafos y listas
+    legacy_tokens = new_tokens = 0
+    for html in pages:
+        legacy = legacy_extract(html)
+        article = extract_article(html, BASE_URL)
+        if legacy and article:
+            legacy_tokens += count_tokens(legacy[1])
+            new_tokens += count_tokens(article[1])
+    if new_tokens:
+        print(f"Tokens: anterior {legacy_tokens} | nuevo {new_tokens} | inflación anterior {legacy_tokens / new_tokens:.2f}x")
+
+
+if __name__ == '__main__':
+    main()
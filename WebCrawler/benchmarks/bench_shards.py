@@ -0,0 +1,167 @@
+"""
+Crawl repartido en N shards (procesos locales) contra el servidor local de wiki_standin
+
+Cada shard es un proceso con su propia carpeta (shard-NN) y todos comparten el
+coordinador: un archivo SQLite o, con --remote, uno servido por TCP en 127.0.0.1 (con
+una clave aleatoria en WIKICRAWLER_COORDINATOR_KEY). Al terminar comprueba que ninguna
+URL se guardó dos veces y que cada shard solo guardó URLs de su propiedad (shard_of).
+
+Uso:
+    python benchmarks/bench_shards.py [--shards 3] [--site-pages 150] [--concurrency 1 4] [--remote]
+"""
+import argparse
+import contextlib
+import glob
+import io
+import logging
+import multiprocessing
+import os
+import secrets
+import socket
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from coordinator import AUTHKEY_ENV, ShardCoordinator, open_coordinator, serve_coordinator, shard_of
+from wiki_standin import StandInServer, WikiStandIn
+
+
+def run_shard(shard_id, num_shards, spec, base_url, start_url, data_dir, config):
+    """Proceso hijo: crawlear las URLs de un shard hasta que el crawl completo termine"""
+    logging.disable(logging.CRITICAL)
+    from crawler import WikipediaCrawler
+
+    crawler = WikipediaCrawler(
+        max_depth=config['max_depth'],
+        max_pages=config['max_pages'],
+        delay=0,
+        concurrency=config['concurrency'],
+        cpu_workers=0,
+        base_url=base_url,
+        data_dir=os.path.join(data_dir, f"shard-{shard_id:02d}")
+    )
+    crawler.rate_limiter.max_rate = crawler.rate_limiter.rate = 1000.0
+    crawler.connect_coordinator(spec, shard_id, num_shards)
+    with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+        crawler.crawl([start_url])
+        crawler.save_to_csv()
+        crawler.close_progress_tracking()
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def saved_urls(shard_dir):
+    """URLs guardadas por un shard (todas las filas de sus segmentos CSV)"""
+    import pandas as pd
+    paths = sorted(glob.glob(os.path.join(shard_dir, 'wikipedia_crawl_data*.csv')))
+    if not paths:
+        return []
+    return pd.concat([pd.read_csv(path, usecols=['url']) for path in paths])['url'].tolist()
+
+
+def run_sharded_crawl(num_shards=3, site_pages=150, concurrency=1, max_depth=6, max_pages=10000,
+                      remote=False, timeout=600):
+    """
+    Crawlear el sitio sintético con `num_shards` procesos y devolver el resultado
+
+    Devuelve {'urls': {shard: [URLs guardadas]}, 'summary': resumen del coordinador,
+    'exitcodes': [...], 'wall_s': segundos}.
+    """
+    context = multiprocessing.get_context('spawn')
+    config = {'max_depth': max_depth, 'max_pages': max_pages, 'concurrency': concurrency}
+    with StandInServer(WikiStandIn(pages=site_pages)) as server, \
+            tempfile.TemporaryDirectory(prefix='bench-shards-') as data_dir:
+        path = os.path.join(data_dir, 'coordinator.sqlite')
+        coordinator_process = None
+        if remote:
+            os.environ.setdefault(AUTHKEY_ENV, secrets.token_hex(32))  # Los procesos hijos la heredan
+            address = ('127.0.0.1', free_port())
+            coordinator_process = context.Process(target=serve_coordinator, args=(path, num_shards, address),
+                                                  daemon=True)
+            coordinator_process.start()
+            spec = f"{address[0]}:{address[1]}"
+            for _ in range(100):  # Esperar a que el coordinador acepte conexiones
+                with contextlib.suppress(OSError), socket.create_connection(address, timeout=0.1):
+                    break
+                time.sleep(0.1)
+        else:
+            spec = path
+            ShardCoordinator(path, num_shards).reset_workers()
+
+        start = time.perf_counter()
+        workers = [
+            context.Process(target=run_shard, args=(shard_id, num_shards, spec, server.url,
+                                                    server.start_url(), data_dir, config))
+            for shard_id in range(num_shards)
+        ]
+        for worker in workers:
+            worker.start()
+        deadline = time.monotonic() + timeout
+        for worker in workers:
+            worker.join(max(0.0, deadline - time.monotonic()))
+        for worker in workers:
+            if worker.is_alive():
+                worker.terminate()
+                worker.join()
+        wall = time.perf_counter() - start
+
+        try:
+            summary = open_coordinator(spec, num_shards).summary()
+        finally:
+            if coordinator_process is not None:
+                coordinator_process.terminate()
+                coordinator_process.join()
+        return {
+            'urls': {shard_id: saved_urls(os.path.join(data_dir, f"shard-{shard_id:02d}"))
+                     for shard_id in range(num_shards)},
+            'summary': summary,
+            'exitcodes': [worker.exitcode for worker in workers],
+            'wall_s': round(wall, 2)
+        }
+
+
+def check(result, num_shards):
+    """Errores del crawl repartido: URLs repetidas entre shards o guardadas por un shard ajeno"""
+    errors = []
+    if any(code != 0 for code in result['exitcodes']):
+        errors.append(f"shards con error o sin terminar: {result['exitcodes']}")
+    all_urls = [url for urls in result['urls'].values() for url in urls]
+    if len(all_urls) != len(set(all_urls)):
+        errors.append(f"{len(all_urls) - len(set(all_urls))} URLs guardadas más de una vez")
+    for shard_id, urls in result['urls'].items():
+        foreign = [url for url in urls if shard_of(url, num_shards) != shard_id]
+        if foreign:
+            errors.append(f"shard {shard_id}: {len(foreign)} URLs de otro shard (p. ej. {foreign[0]})")
+    return errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--shards', type=int, default=3)
+    parser.add_argument('--site-pages', type=int, default=150, help="Artículos del grafo sintético")
+    parser.add_argument('--max-depth', type=int, default=6)
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 4])
+    parser.add_argument('--remote', action='store_true', help="Coordinador servido por TCP en lugar de SQLite")
+    args = parser.parse_args()
+
+    failed = False
+    for concurrency in args.concurrency:
+        result = run_sharded_crawl(args.shards, args.site_pages, concurrency, args.max_depth, remote=args.remote)
+        pages = {shard_id: len(urls) for shard_id, urls in result['urls'].items()}
+        print(f"conc {concurrency}: {sum(pages.values())} páginas en {result['wall_s']} s | por shard {pages} | "
+              f"{result['summary']['seen']} URLs vistas, {result['summary']['handoff']} sin entregar")
+        errors = check(result, args.shards)
+        for error in errors:
+            print(f"   ERROR: {error}")
+        failed = failed or bool(errors)
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
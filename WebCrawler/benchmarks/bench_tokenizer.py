@@ -0,0 +1,81 @@
+"""
+Micro-benchmark del tokenizador rápido frente a clean_text + word_tokenize
+
+Uso:
+    python benchmarks/bench_tokenizer.py [carpeta_con_html] [--repeat N]
+
+Muestra tokens/s de cada uno sobre las páginas indicadas (o un texto de muestra). Que
+ambos producen la misma secuencia de tokens lo comprueba tests/test_tokenizer.py.
+"""
+import argparse
+import glob
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from html_extractor import extract_article  # noqa: E402
+from text_processing import fast_tokenize, nltk_tokenize  # noqa: E402
+
+BASE_URL = "https://es.wikipedia.org"
+
+SAMPLE_TEXT = (
+    "Costa Rica, oficialmente República de Costa Rica, es un país soberano de América Central. "
+    "Su capital es San José; tiene 5 044 197 habitantes (2021) y una superficie de 51 100 km². "
+    "«El café» fue clave en el siglo XIX — junto al banano — para la economía. "
+    "Ciudades: Alajuela, Cartago, Heredia, Limón, Puntarenas y Liberia. "
+    "Idiomas: español (oficial), bribri, cabécar, maléku, inglés criollo limonense. "
+    "Frases en inglés dentro del texto: we cannot stop, I wanna go, gonna gotta gimme lemme. "
+    "Símbolos raros: ñandú, Ærø, İstanbul, ß, ﬁn, x², 3.º, n.º 1, e-mail, co_autor,  espacio duro. "
+)
+
+
+def sample_pages(html_dir):
+    """Textos de prueba: páginas guardadas o variaciones del texto de muestra"""
+    if html_dir:
+        for path in sorted(glob.glob(os.path.join(html_dir, '*.html'))):
+            with open(path, 'rb') as f:
+                article = extract_article(f.read(), BASE_URL)
+            if article:
+                yield os.path.basename(path), article[1]
+        return
+
+    rng = random.Random(42)
+    words = SAMPLE_TEXT.split(' ')
+    for i in range(50):
+        rng.shuffle(words)
+        yield f"muestra-{i}", ' '.join(words) * 20
+
+
+def bench(name, tokenizer, texts, repeat):
+    tokens = 0
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for text in texts:
+            tokens += len(tokenizer(text))
+    elapsed = time.perf_counter() - start
+    rate = tokens / elapsed
+    print(f"{name:<22} {rate:14,.0f} tokens/s")
+    return rate
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('html_dir', nargs='?', help="Carpeta con páginas HTML de es.wikipedia guardadas")
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    pages = list(sample_pages(args.html_dir))
+    if not pages:
+        sys.exit("No se encontraron páginas .html")
+
+    texts = [text for _, text in pages]
+    nltk_rate = bench("clean_text + NLTK", nltk_tokenize, texts, args.repeat)
+    fast_rate = bench("tokenizador rápido", fast_tokenize, texts, args.repeat)
+    print(f"Aceleración: {fast_rate / nltk_rate:.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,307 @@
+"""
+Servidor HTTP local que imita a es.wikipedia para benchmarks reproducibles del crawler
+
+Sirve artículos en /wiki/<título>, el endpoint REST /api/rest_v1/page/html/<título> y
+respuestas enlatadas de /w/api.php (action=parse, prop=revisions con continuación,
+prop=info y resolución de redirecciones con `redirects`). Los artículos salen de una carpeta con HTML de es.wikipedia grabado
+(<título>.html) o, sin carpeta, de un grafo sintético determinista con la misma estructura.
+Con HTML grabado, un título que no está en la carpeta recibe una de las páginas grabadas
+elegida por hash estable, así los enlaces reales del HTML forman un grafo sin fin.
+Como en Wikipedia, en el grafo sintético los artículos más enlazados (índices bajos) son
+también los más largos, y los esbozos se concentran entre los poco enlazados. Una
+fracción `redirect_ratio` de los enlaces apunta a una redirección ('Alias N'), que se
+sirve con el contenido de su artículo igual que en Wikipedia. Una fracción
+`template_ratio` de los artículos sale de una misma plantilla (como los esbozos de
+municipios generados por bots): casi el mismo texto, con otro nombre y otros enlaces.
+
+Cada respuesta puede retrasarse `latency` segundos (+ hasta `jitter` al azar) para
+simular la red; con `compress` el cuerpo va en gzip si el cliente lo acepta.
+
+Uso independiente:
+    python benchmarks/wiki_standin.py [carpeta_con_html] [--port 8765] [--latency 0.05]
+"""
+import argparse
+import functools
+import glob
+import gzip
+import json
+import os
+import random
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, quote, unquote, urlsplit
+
+VOCABULARY = (
+    "costa rica república país américa central capital san josé población provincia cantón "
+    "historia siglo independencia colonia español gobierno presidente elecciones constitución "
+    "economía café banano turismo exportación agricultura industria comercio moneda colón "
+    "geografía volcán montaña río lago océano pacífico caribe bosque clima lluvia temperatura "
+    "cultura idioma música literatura arte universidad escuela educación ciencia investigación "
+    "especie familia género planta animal ave mamífero reptil insecto flor árbol hábitat "
+    "municipio ciudad pueblo distrito región territorio frontera nicaragua panamá límite "
+    "guerra batalla ejército tratado alianza reino imperio dinastía rey iglesia católica"
+).split()
+
+REVISIONS_PER_RESPONSE = 50
+
+
+class WikiStandIn:
+    """Contenido del sitio: páginas HTML (grabadas o sintéticas) e historial de ediciones enlatado"""
+
+    def __init__(self, html_dir=None, pages=1000, seed=0, stub_ratio=0.05, redirect_ratio=0.1, template_ratio=0.0):
+        self.seed = seed
+        self.pages = pages
+        self.stub_ratio = stub_ratio
+        self.redirect_ratio = redirect_ratio
+        self.template_ratio = template_ratio
+        self.recorded = {}
+        if html_dir:
+            for path in sorted(glob.glob(os.path.join(html_dir, '*.html'))):
+                title = unquote(os.path.splitext(os.path.basename(path))[0]).replace('_', ' ')
+                with open(path, 'rb') as f:
+                    self.recorded[title] = f.read()
+            if not self.recorded:
+                raise ValueError(f"No hay páginas .html en {html_dir}")
+        self.recorded_titles = sorted(self.recorded)
+
+    @property
+    def start_title(self):
+        return self.recorded_titles[0] if self.recorded else 'Artículo 0'
+
+    def rng(self, title):
+        return random.Random(zlib.crc32(f'{self.seed}:{title}'.encode('utf-8')))
+
+    @functools.lru_cache(maxsize=4096)
+    def article_html(self, title):
+        """HTML completo de un artículo (con la piel de Wikipedia) o None si no existe"""
+        if self.recorded:
+            if title in self.recorded:
+                return self.recorded[title]
+            return self.recorded[self.recorded_titles[zlib.crc32(title.encode('utf-8')) % len(self.recorded_titles)]]
+        return self.synthetic_html(title)
+
+    def redirect_target(self, title):
+        """Artículo al que redirige un título del grafo sintético (None si no es una redirección)"""
+        if not self.recorded and title.startswith('Alias ') and title[len('Alias '):].isdigit():
+            return 'Artículo ' + title[len('Alias '):]
+        return None
+
+    def synthetic_html(self, title):
+        target = self.redirect_target(title)
+        if target is not None:
+            return self.synthetic_html(target)
+        if not title.startswith('Artículo ') or not title[len('Artículo '):].isdigit():
+            return None
+        rng = self.rng(title)
+        popularity = max(0.0, 1 - int(title[len('Artículo '):]) / self.pages)
+        if rng.random() < self.stub_ratio * 2 * (1 - popularity):
+            paragraphs = ['<p>Esbozo.</p>']
+        else:
+            # Los artículos de plantilla comparten el texto (mismo generador) y solo cambian
+            # el nombre y los enlaces
+            templated = zlib.crc32(f'plantilla:{title}'.encode('utf-8')) % 1000 < self.template_ratio * 1000
+            template = random.Random(self.seed)
+            paragraphs = [f"<p>{title} es un municipio de la provincia.</p>"] if templated else []
+            for _ in range(6 if templated else rng.randint(4, 12 + int(80 * popularity ** 2))):
+                if templated:
+                    words = [template.choice(VOCABULARY) for _ in range(60)]
+                else:
+                    words = [rng.choice(VOCABULARY) for _ in range(rng.randint(30, 120))]
+                for _ in range(rng.randint(0, 3)):
+                    # Enlaces sesgados hacia los artículos populares (distribución de cola larga)
+                    index = int(self.pages * rng.random() ** 2.5)
+                    # Sin consumir el generador: el grafo no cambia con redirect_ratio
+                    alias = zlib.crc32(f'{title}>{index}'.encode('utf-8')) % 1000 < self.redirect_ratio * 1000
+                    target = f"{'Alias' if alias else 'Artículo'}_{index}"
+                    words.insert(rng.randrange(len(words)), f'<a href="/wiki/{quote(target)}">{rng.choice(VOCABULARY)}</a>')
+                paragraphs.append(f"<p>{' '.join(words)}.</p>")
+        sidebar = ''.join(f'<li><a href="/wiki/Especial:P{i}">Menú {i}</a></li>' for i in range(40))
+        return (
+            '<!DOCTYPE html><html lang="es"><head><meta charset="UTF-8"><title>'
+            f'{title} - Wikipedia, la enciclopedia libre</title><script>var config = {{}};</script>'
+            '<style>.mw-body{margin:0}</style></head><body>'
+            f'<div id="mw-navigation"><ul>{sidebar}</ul></div>'
+            f'<h1 id="firstHeading" class="firstHeading mw-first-heading">{title}</h1>'
+            f'<div id="mw-content-text"><div class="mw-parser-output">{"".join(paragraphs)}'
+            '<ul><li><a href="/wiki/Archivo:Mapa.svg">Mapa</a></li>'
+            '<li><a href="/wiki/Categor%C3%ADa:Pa%C3%ADses">Categoría</a></li></ul>'
+            '<script>mw.loader.load()</script></div></div>'
+            '<div id="footer"><ul><li>Última edición</li><li>Política de privacidad</li></ul></div>'
+            '</body></html>'
+        ).encode('utf-8')
+
+    def article_body(self, title):
+        """Solo el contenido del artículo (lo que devuelven action=parse y el endpoint REST)"""
+        html = self.article_html(title)
+        if html is None:
+            return None
+        text = html.decode('utf-8', errors='replace')
+        start = text.find('<div id="mw-content-text">')
+        end = text.find('<div id="footer">')
+        return text[start:end] if start >= 0 and end > start else text
+
+    def revision_timestamps(self, title):
+        """Historial de ediciones determinista del título (del más nuevo al más viejo)"""
+        rng = self.rng('rev:' + title)
+        day = 0
+        timestamps = []
+        for _ in range(rng.randint(5, 180)):
+            day += rng.randint(0, 20)
+            timestamps.append(time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime(1735689600 - day * 86400)))
+        return timestamps
+
+    def last_revision(self, title):
+        rng = self.rng('rev:' + title)
+        return 100000 + rng.randrange(10 ** 6), self.revision_timestamps(title)[0]
+
+    def api_response(self, query):
+        """Respuesta JSON enlatada de api.php para los parámetros recibidos"""
+        params = {key: values[0] for key, values in parse_qs(query).items()}
+        if params.get('action') == 'parse':
+            title = params.get('page', '').replace('_', ' ')
+            body = self.article_body(title)
+            if body is None:
+                return {'error': {'code': 'missingtitle', 'info': "The page you specified doesn't exist."}}
+            return {'parse': {'title': title, 'text': body}}
+
+        titles = [t for t in params.get('titles', '').split('|') if t]
+        props = params.get('prop', '').split('|')
+        pages = {}
+        result = {'batchcomplete': ''}
+        normalized = []
+        redirects = []
+        for index, title in enumerate(titles):
+            if '_' in title:
+                normalized.append({'from': title, 'to': title.replace('_', ' ')})
+                title = titles[index] = title.replace('_', ' ')
+            target = self.redirect_target(title) if 'redirects' in params else None
+            if target is not None:
+                redirects.append({'from': title, 'to': target})
+                titles[index] = target
+        titles = list(dict.fromkeys(titles))
+        for index, title in enumerate(titles):
+            exists = self.article_html(title) is not None
+            page_id = str(1 + zlib.crc32(title.encode('utf-8')) % 10 ** 7) if exists else str(-1 - index)
+            page = {'ns': 0, 'title': title}
+            if not exists:
+                page['missing'] = ''
+                pages[page_id] = page
+                continue
+            page['pageid'] = int(page_id)
+            if 'info' in props:
+                page['lastrevid'], page['touched'] = self.last_revision(title)
+            if 'revisions' in props:
+                timestamps = self.revision_timestamps(title)
+                offset = int(params.get('rvcontinue', 0) or 0)
+                chunk = timestamps[offset:offset + REVISIONS_PER_RESPONSE]
+                page['revisions'] = [{'timestamp': ts} for ts in chunk]
+                if offset + REVISIONS_PER_RESPONSE < len(timestamps):
+                    result['continue'] = {'rvcontinue': str(offset + REVISIONS_PER_RESPONSE), 'continue': '||'}
+                    result.pop('batchcomplete', None)
+            pages[page_id] = page
+        result['query'] = {'pages': pages}
+        if normalized:
+            result['query']['normalized'] = normalized
+        if redirects:
+            result['query']['redirects'] = redirects
+        return result
+
+
+def make_handler(site, latency=0.0, jitter=0.0, compress=True):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'  # keep-alive, como el sitio real
+        disable_nagle_algorithm = True  # Encabezados y cuerpo van en dos writes: sin esto, ~40 ms extra por respuesta
+
+        def log_message(self, *args):
+            pass
+
+        def send_body(self, status, body, content_type):
+            if compress and 'gzip' in self.headers.get('Accept-Encoding', ''):
+                body = gzip.compress(body, compresslevel=5)
+                encoding = 'gzip'
+            else:
+                encoding = None
+            self.send_response(status)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(body)))
+            if encoding:
+                self.send_header('Content-Encoding', encoding)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if latency or jitter:
+                time.sleep(latency + random.uniform(0, jitter))
+            parts = urlsplit(self.path)
+            if parts.path.startswith('/wiki/'):
+                html = site.article_html(unquote(parts.path[len('/wiki/'):]).replace('_', ' '))
+                if html is None:
+                    return self.send_body(404, b'Not Found', 'text/plain')
+                return self.send_body(200, html, 'text/html; charset=UTF-8')
+            if parts.path.startswith('/api/rest_v1/page/html/'):
+                body = site.article_body(unquote(parts.path.rsplit('/', 1)[1]).replace('_', ' '))
+                if body is None:
+                    return self.send_body(404, b'Not Found', 'text/plain')
+                return self.send_body(200, body.encode('utf-8'), 'text/html; charset=UTF-8')
+            if parts.path == '/w/api.php':
+                body = json.dumps(site.api_response(parts.query), ensure_ascii=False).encode('utf-8')
+                return self.send_body(200, body, 'application/json; charset=utf-8')
+            self.send_body(404, b'Not Found', 'text/plain')
+
+    return Handler
+
+
+class StandInServer:
+    """Servidor local en un thread de fondo: `with StandInServer(...) as server: server.url`"""
+
+    def __init__(self, site=None, port=0, latency=0.0, jitter=0.0, compress=True):
+        self.site = site or WikiStandIn()
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', port), make_handler(self.site, latency, jitter, compress))
+        self.httpd.daemon_threads = True
+        self.thread = None
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.httpd.server_address[1]}"
+
+    def start_url(self):
+        return f"{self.url}/wiki/{quote(self.site.start_title.replace(' ', '_'))}"
+
+    def start(self):
+        self.thread = threading.Thread(target=self.httpd.serve_forever, name='wiki-standin', daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('html_dir', nargs='?', help="Carpeta con páginas HTML de es.wikipedia guardadas")
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--pages', type=int, default=1000, help="Artículos del grafo sintético")
+    parser.add_argument('--latency', type=float, default=0.0, help="Retraso fijo por respuesta (s)")
+    parser.add_argument('--jitter', type=float, default=0.0, help="Retraso aleatorio adicional máximo (s)")
+    args = parser.parse_args()
+
+    site = WikiStandIn(args.html_dir, pages=args.pages)
+    server = StandInServer(site, port=args.port, latency=args.latency, jitter=args.jitter)
+    print(f"Sirviendo en {server.url} (inicio: {server.start_url()})")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,46 @@
+import json
+import os
+import struct
+import zlib
+
+# Formato: MAGIC | versión | largo del JSON de metadatos | largo del conjunto de visitadas | CRC32 |
+#          JSON | conjunto de visitadas (VisitedSet.tobytes)
+# El largo y el CRC32 (de JSON + visitadas) detectan un archivo truncado o corrupto: la tabla de
+# visitadas se carga tal cual y sin ellos un pedazo faltante pasaría por un conjunto válido.
+MAGIC = b'WCKP'
+VERSION = 2
+HEADER = struct.Struct('<4sHIQI')
+
+
+def write_checkpoint(path, meta, visited_bytes):
+    """Escribir el checkpoint completo o nada: archivo temporal + fsync + os.replace"""
+    meta_bytes = json.dumps(meta, ensure_ascii=False).encode('utf-8')
+    crc = zlib.crc32(visited_bytes, zlib.crc32(meta_bytes))
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, VERSION, len(meta_bytes), len(visited_bytes), crc))
+        f.write(meta_bytes)
+        f.write(visited_bytes)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def read_checkpoint(path):
+    """Leer un checkpoint: (metadatos, bytes del conjunto de visitadas); ValueError si no es válido"""
+    with open(path, 'rb') as f:
+        data = f.read()
+    if len(data) < HEADER.size:
+        raise ValueError("checkpoint truncado")
+    magic, version = HEADER.unpack_from(data)[:2]
+    if magic != MAGIC or version != VERSION:
+        raise ValueError(f"checkpoint con formato desconocido ({magic!r}, v{version})")
+    _, _, meta_length, visited_length, crc = HEADER.unpack_from(data)
+    start = HEADER.size
+    if len(data) != start + meta_length + visited_length:
+        raise ValueError(f"checkpoint truncado ({len(data)} de {start + meta_length + visited_length} bytes)")
+    payload = memoryview(data)[start:]
+    if zlib.crc32(payload) != crc:
+        raise ValueError("checkpoint corrupto (CRC32 distinto)")
+    meta = json.loads(bytes(payload[:meta_length]).decode('utf-8'))
+    return meta, payload[meta_length:]
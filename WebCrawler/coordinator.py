@@ -0,0 +1,237 @@
+import logging
+import os
+import re
+import sqlite3
+import threading
+from contextlib import contextmanager
+from multiprocessing.managers import BaseManager
+
+from visited import url_fingerprint
+
+logger = logging.getLogger(__name__)
+
+# Estados de un worker en la tabla workers
+BUSY, IDLE, DONE = 0, 1, 2
+
+# Clave compartida del coordinador remoto: sin valor por defecto (ver coordinator_authkey)
+AUTHKEY_ENV = 'WIKICRAWLER_COORDINATOR_KEY'
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS seen (
+    url TEXT PRIMARY KEY
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS handoff (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    shard INTEGER NOT NULL,
+    url TEXT NOT NULL,
+    depth INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS handoff_shard ON handoff (shard, id);
+CREATE TABLE IF NOT EXISTS workers (
+    shard INTEGER PRIMARY KEY,
+    state INTEGER NOT NULL DEFAULT 0,
+    pages INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+
+def shard_of(url, num_shards):
+    """Shard dueño de una URL canónica (hash estable: el mismo en todas las máquinas y ejecuciones)"""
+    return url_fingerprint(url) % num_shards
+
+
+class ShardCoordinator:
+    """
+    Coordinador de un crawl repartido en `num_shards` workers
+
+    Cada URL pertenece a un solo shard (`shard_of`) y solo su dueño la crawlea, así que
+    cada worker deduplica sus propias URLs en su frontera local. El coordinador guarda el
+    conjunto global de URLs ofrecidas y una bandeja de entrada por shard: `offer()`
+    registra los enlaces nuevos, devuelve los del shard que llama y deja los demás en la
+    bandeja de su dueño, que los recoge con `receive()` / `ack()`.
+
+    El crawl termina cuando todos los workers están ociosos (o terminados) y no quedan
+    enlaces por entregar a un worker activo. Vive en un archivo SQLite (WAL) que pueden
+    abrir varios procesos locales; para workers en otras máquinas se sirve por TCP con
+    `serve_coordinator`.
+    """
+
+    def __init__(self, path, num_shards):
+        self.path = path
+        self.num_shards = num_shards
+        self._lock = threading.Lock()  # Las llamadas remotas llegan desde varios threads
+        self.conn = sqlite3.connect(path, timeout=60, isolation_level=None, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+        with self.transaction():
+            row = self.conn.execute("SELECT value FROM meta WHERE key = 'num_shards'").fetchone()
+            if row is None:
+                self.conn.execute("INSERT INTO meta (key, value) VALUES ('num_shards', ?)", (str(num_shards),))
+            elif int(row[0]) != num_shards:
+                raise ValueError(f"El coordinador {path} es de un crawl con {row[0]} shards, no {num_shards}")
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO workers (shard, state) VALUES (?, ?)",
+                ((shard, BUSY) for shard in range(num_shards))
+            )
+
+    @contextmanager
+    def transaction(self):
+        """Transacción de escritura entre procesos (BEGIN IMMEDIATE toma el lock al empezar)"""
+        with self._lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield
+            except BaseException:
+                self.conn.execute("ROLLBACK")
+                raise
+            self.conn.execute("COMMIT")
+
+    def reset_workers(self):
+        """Marcar todos los workers como activos (al lanzar o reanudar un crawl completo)"""
+        with self.transaction():
+            self.conn.execute("UPDATE workers SET state = ?", (BUSY,))
+
+    def register(self, shard):
+        with self.transaction():
+            self.conn.execute("UPDATE workers SET state = ? WHERE shard = ?", (BUSY, shard))
+
+    def offer(self, shard, urls, depth):
+        """Registrar enlaces encontrados por `shard`: devuelve los nuevos que le pertenecen"""
+        own = []
+        with self.transaction():
+            for url in urls:
+                if not self.conn.execute("INSERT OR IGNORE INTO seen (url) VALUES (?)", (url,)).rowcount:
+                    continue
+                owner = shard_of(url, self.num_shards)
+                if owner == shard:
+                    own.append(url)
+                else:
+                    self.conn.execute(
+                        "INSERT INTO handoff (shard, url, depth) VALUES (?, ?, ?)", (owner, url, depth)
+                    )
+        return own
+
+    def receive(self, shard, limit=1000, after_id=0):
+        """
+        Enlaces entregados a `shard` como [(id, url, profundidad)]; se borran recién con ack()
+
+        `after_id` saltea los que el worker ya recibió y todavía no confirmó.
+        """
+        with self.transaction():
+            rows = self.conn.execute(
+                "SELECT id, url, depth FROM handoff WHERE shard = ? AND id > ? ORDER BY id LIMIT ?",
+                (shard, after_id, limit)
+            ).fetchall()
+            if rows:
+                self.conn.execute("UPDATE workers SET state = ? WHERE shard = ?", (BUSY, shard))
+        return rows
+
+    def ack(self, shard, last_id):
+        """Borrar los enlaces ya guardados en la frontera local del shard"""
+        with self.transaction():
+            self.conn.execute("DELETE FROM handoff WHERE shard = ? AND id <= ?", (shard, last_id))
+
+    def idle(self, shard, pages=None):
+        """
+        El shard se quedó sin trabajo: True si el crawl completo terminó
+
+        Si todavía tiene enlaces en su bandeja sigue activo (debe recogerlos con receive()).
+        """
+        with self.transaction():
+            if pages is not None:
+                self.conn.execute("UPDATE workers SET pages = ? WHERE shard = ?", (pages, shard))
+            if self.conn.execute("SELECT 1 FROM handoff WHERE shard = ? LIMIT 1", (shard,)).fetchone():
+                return False
+            self.conn.execute("UPDATE workers SET state = ? WHERE shard = ? AND state = ?", (IDLE, shard, BUSY))
+            busy = self.conn.execute("SELECT COUNT(*) FROM workers WHERE state = ?", (BUSY,)).fetchone()[0]
+            undelivered = self.conn.execute(
+                "SELECT COUNT(*) FROM handoff WHERE shard IN (SELECT shard FROM workers WHERE state != ?)", (DONE,)
+            ).fetchone()[0]
+            return busy == 0 and undelivered == 0
+
+    def finish(self, shard, pages=None):
+        """El shard terminó (límite de páginas o fin del crawl): su bandeja ya no bloquea a los demás"""
+        with self.transaction():
+            self.conn.execute(
+                "UPDATE workers SET state = ?, pages = COALESCE(?, pages) WHERE shard = ?", (DONE, pages, shard)
+            )
+
+    def summary(self):
+        """Estado global: URLs vistas, enlaces por entregar y (estado, páginas) de cada shard"""
+        with self._lock:
+            return {
+                'seen': self.conn.execute("SELECT COUNT(*) FROM seen").fetchone()[0],
+                'handoff': self.conn.execute("SELECT COUNT(*) FROM handoff").fetchone()[0],
+                'workers': {shard: (state, pages) for shard, state, pages in
+                            self.conn.execute("SELECT shard, state, pages FROM workers ORDER BY shard")}
+            }
+
+    def close(self):
+        self.conn.close()
+
+
+class CoordinatorManager(BaseManager):
+    """Expone un ShardCoordinator por TCP para workers en otras máquinas"""
+
+
+def parse_address(spec):
+    """'host:puerto' -> (host, puerto); None si `spec` es la ruta de un archivo SQLite"""
+    match = re.fullmatch(r'([\w.-]+):(\d+)', spec or '')
+    if match is None or os.path.exists(spec):
+        return None
+    return match.group(1), int(match.group(2))
+
+
+def coordinator_authkey(authkey=None):
+    """
+    Clave del coordinador remoto: la indicada o la de la variable WIKICRAWLER_COORDINATOR_KEY
+
+    El coordinador se sirve con multiprocessing.managers, que intercambia objetos con
+    pickle: quien conozca la clave y llegue al puerto puede ejecutar código en la
+    máquina. Por eso no hay clave por defecto (debe ser secreta y larga, p. ej.
+    `python -c "import secrets; print(secrets.token_hex(32))"`) y el puerto solo debe
+    escuchar en una interfaz de confianza (127.0.0.1, una red privada o un túnel SSH).
+    """
+    authkey = authkey or os.environ.get(AUTHKEY_ENV)
+    if not authkey:
+        raise ValueError(f"El coordinador remoto requiere una clave secreta en la variable {AUTHKEY_ENV}")
+    return authkey.encode('utf-8') if isinstance(authkey, str) else authkey
+
+
+def serve_coordinator(path, num_shards, address, authkey=None):
+    """
+    Servir el coordinador (archivo SQLite `path`) en `address` hasta interrumpirlo
+
+    Requiere la clave compartida (ver coordinator_authkey); los workers remotos deben
+    usar la misma.
+    """
+    authkey = coordinator_authkey(authkey)
+    if address[0] in ('', '0.0.0.0', '::'):
+        logger.warning(f"⚠️ El coordinador escucha en todas las interfaces ({address[0] or '*'}): "
+                       f"cualquiera con la clave que llegue al puerto {address[1]} puede ejecutar código aquí")
+    coordinator = ShardCoordinator(path, num_shards)
+    coordinator.reset_workers()
+    CoordinatorManager.register('coordinator', callable=lambda: coordinator)
+    server = CoordinatorManager(address=address, authkey=authkey).get_server()
+    logger.info(f"🛰️ Coordinador de {num_shards} shards escuchando en {address[0]}:{address[1]} ({path})")
+    server.serve_forever()
+
+
+def open_coordinator(spec, num_shards, authkey=None):
+    """
+    Abrir un coordinador local (ruta SQLite) o conectarse a uno remoto ('host:puerto')
+
+    Solo el remoto usa la clave compartida (ver coordinator_authkey).
+    """
+    address = parse_address(spec)
+    if address is None:
+        return ShardCoordinator(spec, num_shards)
+    CoordinatorManager.register('coordinator')
+    manager = CoordinatorManager(address=address, authkey=coordinator_authkey(authkey))
+    manager.connect()
+    return manager.coordinator()
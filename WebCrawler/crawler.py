@@ -1,21 +1,43 @@
-import requests
-from bs4 import BeautifulSoup
+import argparse
+import asyncio
+import glob
 import re
 import csv
 import json
 import time
 import os
-from urllib.parse import urljoin, urlparse, unquote
-from collections import defaultdict, Counter
+import math
+from urllib.parse import urlparse, unquote, quote
+from collections import defaultdict, Counter, deque
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+import multiprocessing
 import nltk
 from nltk.corpus import stopwords
-from nltk.tokenize import word_tokenize
 import pandas as pd
 from datetime import datetime, timedelta
 import logging
 from tqdm import tqdm
 import colorama
 from colorama import Fore, Back, Style
+import random
+import heapq
+from operator import itemgetter
+from rate_limiter import AdaptiveRateLimiter, ThrottledError, parse_retry_after
+from transport import HttpTransport
+from revisions import RevisionEnricher
+from redirects import RedirectResolver
+from dump_reader import iter_dump_pages, title_to_url
+import text_processing
+from text_processing import process_document, process_wikitext, process_archived
+from sinks import StreamingCsvSink, ParquetSink, parquet_schema
+from frontier import UrlFrontier
+from visited import VisitedSet, canonicalize_url
+from checkpoint import write_checkpoint, read_checkpoint
+from metrics import CrawlMetrics
+from vocabulary import Vocabulary, gram_text
+from warc import WarcWriter, WarcArchive
+from near_duplicates import SimHashIndex
+from coordinator import open_coordinator, serve_coordinator, parse_address, shard_of, coordinator_authkey
 
 # Inicializar colorama para colores en Windows
 colorama.init()
@@ -25,21 +47,142 @@ logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(
 logger = logging.getLogger(__name__)
 
 class WikipediaCrawler:
-    def __init__(self, max_depth=3, max_pages=1000, delay=1):
+    def __init__(self, max_depth=3, max_pages=1000, delay=1, concurrency=1, fetch_mode='html',
+                 cpu_workers=None, tokenizer='fast', ngram_format='lists', bloom_error_rate=None,
+                 output_format='csv', metrics_format='json', base_url="https://es.wikipedia.org",
+                 data_dir=None, frontier_policy='bfs', token_ids=False, archive_responses=False,
+                 near_duplicates=None):
         """
         Inicializar el crawler de Wikipedia
         
         Args:
             max_depth: Profundidad máxima de navegación recursiva
             max_pages: Número máximo de páginas a procesar
-            delay: Tiempo de espera entre requests (en segundos)
+            delay: Tiempo de espera inicial entre requests (en segundos); el limitador
+                   adaptativo lo ajusta según las respuestas de Wikipedia
+            concurrency: Número de requests simultáneos (1 = modo secuencial)
+            fetch_mode: Cómo descargar cada artículo:
+                        'html'  - página completa con la piel de Wikipedia
+                        'parse' - solo el cuerpo del artículo vía action=parse de la API
+                        'rest'  - solo el cuerpo del artículo vía /api/rest_v1/page/html
+            cpu_workers: Procesos para parseo/tokenización/n-gramas en el modo concurrente
+                         (None = núcleos de la máquina menos uno, 0 = procesar en los threads de descarga)
+            tokenizer: 'fast' (regex compiladas, mismos tokens que NLTK) o 'nltk' (word_tokenize)
+            ngram_format: 'lists' (cada aparición, en orden) o 'counts' (mapa n-grama -> frecuencia);
+                          en CSV los mapas se guardan como 'ngrama:frecuencia' separados por |
+            bloom_error_rate: Si se indica, las URLs visitadas van a un filtro de Bloom con esa
+                              tasa de falsos positivos (~2 bytes por URL) en vez del conjunto exacto
+            output_format: 'csv' (segmentos CSV con campos unidos por |) o 'parquet' (columnas de
+                           listas/mapas nativas en data/wikipedia_crawl_data_parquet, requiere pyarrow)
+            metrics_format: 'json' (data/crawler_metrics.json) o 'prometheus' (data/crawler_metrics.prom);
+                            métricas por etapa exportadas cada `metrics.interval` segundos
+            base_url: Sitio MediaWiki a crawlear (p. ej. un servidor local para benchmarks)
+            data_dir: Carpeta de salida y estado (None = 'data' junto a este script)
+            frontier_policy: Orden de la frontera:
+                             'bfs'   - en anchura, con los primeros `links_per_page` enlaces de cada página
+                             'yield' - primero las URLs con más rendimiento estimado (enlaces entrantes
+                                       vistos y tamaño de las páginas que las enlazan)
+            token_ids: Guardar los n-gramas como IDs enteros de un vocabulario persistente
+                       (data/vocabulary.txt, un token por línea: la línea es el ID) en lugar de strings
+            archive_responses: Guardar las respuestas descargadas en WARC comprimidos (data/warc)
+                               para re-procesar el corpus sin red (ver reprocess)
+            near_duplicates: Detección de páginas casi duplicadas (huella SimHash de sus trigramas):
+                             None   - desactivada
+                             'flag' - se guardan igual y se anotan en data/near_duplicates.csv
+                             'skip' - no se guardan (sus enlaces sí se encolan)
         """
-        self.base_url = "https://es.wikipedia.org"
+        if ngram_format not in ('lists', 'counts'):
+            raise ValueError(f"ngram_format inválido: {ngram_format}")
+        if tokenizer not in text_processing.TOKENIZERS:
+            raise ValueError(f"tokenizer inválido: {tokenizer}")
+        if fetch_mode not in ('html', 'parse', 'rest'):
+            raise ValueError(f"fetch_mode inválido: {fetch_mode}")
+        if output_format not in ('csv', 'parquet'):
+            raise ValueError(f"output_format inválido: {output_format}")
+        if frontier_policy not in ('bfs', 'yield'):
+            raise ValueError(f"frontier_policy inválida: {frontier_policy}")
+        if metrics_format not in ('json', 'prometheus'):
+            raise ValueError(f"metrics_format inválido: {metrics_format}")
+        if near_duplicates not in (None, 'flag', 'skip'):
+            raise ValueError(f"near_duplicates inválido: {near_duplicates}")
+
+        self.base_url = base_url.rstrip('/')
         self.max_depth = max_depth
         self.max_pages = max_pages
         self.delay = delay
-        self.visited_urls = set()
+        self.concurrency = max(1, int(concurrency))
+        self.fetch_mode = fetch_mode
+        if cpu_workers is None:
+            # Un núcleo queda para el proceso principal (event loop, escritura); con uno solo no hay pool
+            cpu_workers = (os.cpu_count() or 1) - 1
+        self.cpu_workers = max(0, int(cpu_workers))
+        self.tokenizer = tokenizer
+        self.ngram_format = ngram_format
+        self.token_ids = token_ids
+        self.vocabulary = None  # Se abre al guardar la primera página (ver get_vocabulary)
+        self.archive_responses = archive_responses
+        self.warc_max_file_mb = 1024  # Tamaño de cada .warc.gz antes de rotar
+        self.archive = None           # WarcWriter, se abre con la primera respuesta archivada
+        self.near_duplicates = near_duplicates
+        self.near_duplicate_similarity = 0.9  # Similitud SimHash (1 - bits distintos / 64) para considerar duplicado
+        self.near_duplicate_index = None      # SimHashIndex, se abre con la primera página (ver get_near_duplicate_index)
+        self.near_duplicate_log = None        # data/near_duplicates.csv
+        
+        # Control de velocidad adaptativo (token bucket + AIMD) en lugar de un sleep fijo
+        self.max_retries = 5
+        self.backoff_base = 1.0
+        self.backoff_max = 60.0
+        self.maxlag = 5  # Segundos de lag de replicación tolerados por la API de MediaWiki
+        
+        # Historial de ediciones: etapa en segundo plano y ventana opcional de fechas (ISO 8601)
+        self.async_revisions = True
+        self.revisions_from = None  # p. ej. "2024-01-01T00:00:00Z"
+        self.revisions_to = None
+        self.revision_enricher = None
+        self.revision_retries = 3  # Reintentos de una consulta de revisiones antes de marcarla incompleta
+        self.revision_max_pending = 100  # Páginas en memoria esperando su historial (async_revisions)
+        self.refresh_batch_titles = 50   # Títulos por consulta prop=info en el modo refresh (límite de la API)
+        self.refresh_batch_pages = 500   # Páginas re-crawleadas por cada reescritura de la salida
+        self.rate_limiter = AdaptiveRateLimiter(
+            rate=1.0 / delay if delay > 0 else 50.0,
+            max_concurrency=self.concurrency
+        )
+        self.bloom_error_rate = bloom_error_rate
+        self.visited_urls = self.new_visited_set()  # Huellas de 64 bits de URLs canónicas
         self.crawled_data = []
+        self.page_count = 0  # Páginas aceptadas (incluye las que esperan su historial de ediciones)
+        self.frontier = None  # Frontera persistente (SQLite en data_dir), se abre al crawlear o reanudar
+        self.checkpoint_interval_pages = 1000  # Páginas entre checkpoints binarios
+        self.checkpoint_pages = 0              # Páginas guardadas en el último checkpoint
+        self.resolve_redirects = True      # Encolar solo URLs canónicas (redirecciones resueltas con la API)
+        self.redirect_batch_titles = 50    # Títulos por consulta de redirecciones
+        self.redirect_resolver = None      # Se crea al primer uso (ver get_redirect_resolver)
+        self.links_per_page = 25  # Enlaces de cada página que pasan a la frontera (política 'bfs')
+        self.frontier_policy = frontier_policy
+        self.inlink_weight = 1.0       # Prioridad por cada enlace entrante visto ('yield')
+        self.parent_size_weight = 1.0  # Prioridad por log2(palabras) de la página que enlaza ('yield')
+        
+        # Crawl repartido: shard de este worker y coordinador compartido (ver connect_coordinator)
+        self.coordinator = None
+        self.shard_id = 0
+        self.num_shards = 1
+        self.handoff_poll_pages = 20  # Cada cuántas páginas recoger enlaces entregados por otros shards
+        self.handoff_received_id = 0  # Último enlace entregado ya pasado a la frontera local (sin confirmar)
+        self.handoff_acked_id = 0     # Último enlace borrado del coordinador (confirmado en la frontera)
+        
+        # Salida en streaming: cada página se escribe al terminar y no se guarda en memoria
+        self.stream_output = True
+        self.flush_every_pages = 20  # Presupuesto de páginas en buffer antes de escribir
+        self.max_rss_mb = None       # Presupuesto de memoria: superarlo fuerza la escritura
+        self.max_segment_mb = 256    # Tamaño máximo de cada segmento del CSV
+        self.output_format = output_format
+        self.parquet_row_group_pages = 250   # Filas por row group
+        self.parquet_pages_per_file = 2000   # Filas por archivo Parquet (se confirman al cerrarlo)
+        self.output_sink = None
+        self.output_bytes_start = None  # Bytes de salida al abrir el sink (para medir esta ejecución)
+        
+        # Contadores acumulados para las estadísticas (sin recorrer todas las páginas)
+        self.stats = {'pages': 0, 'words': 0, 'links': 0, 'pages_with_links': 0}
         
         # Configurar headers para evitar ser bloqueado
         self.headers = {
@@ -53,16 +196,17 @@ class WikipediaCrawler:
         self.last_update_time = datetime.now()
         self.pages_per_minute = 0
         self.avg_page_size_kb = 0
-          # Descargar recursos de NLTK si no están disponibles
-        try:
-            nltk.data.find('tokenizers/punkt')
-        except LookupError:
-            nltk.download('punkt')
-        
-        try:
-            nltk.data.find('tokenizers/punkt_tab')
-        except LookupError:
-            nltk.download('punkt_tab')
+          # Descargar recursos de NLTK si no están disponibles (punkt solo lo usa el tokenizador NLTK)
+        if self.tokenizer == 'nltk':
+            try:
+                nltk.data.find('tokenizers/punkt')
+            except LookupError:
+                nltk.download('punkt')
+            
+            try:
+                nltk.data.find('tokenizers/punkt_tab')
+            except LookupError:
+                nltk.download('punkt_tab')
         
         try:
             nltk.data.find('corpora/stopwords')
@@ -76,10 +220,22 @@ class WikipediaCrawler:
                                'no', 'te', 'lo', 'le', 'da', 'su', 'por', 'son', 'con', 
                                'para', 'al', 'del', 'los', 'las', 'una', 'como', 'más'])
         
-        # Crear directorio de datos si no existe (en la carpeta del crawler)
-        script_dir = os.path.dirname(os.path.abspath(__file__))
-        self.data_dir = os.path.join(script_dir, 'data')
+        # Crear directorio de datos si no existe (por defecto en la carpeta del crawler)
+        if data_dir is None:
+            data_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data')
+        self.data_dir = data_dir
         os.makedirs(self.data_dir, exist_ok=True)
+        
+        # Métricas por etapa (fetch, parse, tokenize, ngram, revisions, write), bytes y códigos HTTP
+        metrics_file = 'crawler_metrics.prom' if metrics_format == 'prometheus' else 'crawler_metrics.json'
+        self.metrics = CrawlMetrics(os.path.join(self.data_dir, metrics_file), fmt=metrics_format, interval=10.0)
+        
+        # Transporte HTTP compartido: keep-alive, compresión y GET condicionales
+        self.transport = HttpTransport(
+            self.headers,
+            cache_path=os.path.join(self.data_dir, 'http_validators.json'),
+            pool_size=max(10, self.concurrency)
+        )
     
     def init_progress_tracking(self):
         """Inicializar el sistema de tracking de progreso"""
@@ -108,11 +264,11 @@ class WikipediaCrawler:
         
         # Calcular velocidad de páginas por minuto
         if elapsed_minutes > 0:
-            self.pages_per_minute = len(self.crawled_data) / elapsed_minutes
+            self.pages_per_minute = self.page_count / elapsed_minutes
         
         # Calcular tamaño promedio por página
-        if len(self.crawled_data) > 0 and current_file_size_mb > 0:
-            self.avg_page_size_kb = (current_file_size_mb * 1024) / len(self.crawled_data)
+        if self.page_count > 0 and current_file_size_mb > 0:
+            self.avg_page_size_kb = (current_file_size_mb * 1024) / self.page_count
         
         # Calcular progreso hacia 1GB
         current_size_gb = current_file_size_mb / 1024
@@ -122,7 +278,7 @@ class WikipediaCrawler:
         if current_size_gb > 0 and self.pages_per_minute > 0:
             # Estimar páginas necesarias para 1GB
             estimated_pages_for_1gb = (self.target_size_gb * 1024) / self.avg_page_size_kb if self.avg_page_size_kb > 0 else self.max_pages
-            remaining_pages = max(0, estimated_pages_for_1gb - len(self.crawled_data))
+            remaining_pages = max(0, estimated_pages_for_1gb - self.page_count)
             remaining_minutes = remaining_pages / self.pages_per_minute if self.pages_per_minute > 0 else 0
             remaining_time = timedelta(minutes=remaining_minutes)
         else:
@@ -132,7 +288,7 @@ class WikipediaCrawler:
         self.progress_bar.update(1)
         
         # Mostrar información detallada cada 10 páginas
-        if len(self.crawled_data) % 10 == 0:
+        if self.page_count % 10 == 0:
             self.show_detailed_progress(current_size_gb, progress_percent, remaining_time)
     
     def show_detailed_progress(self, current_size_gb, progress_percent, remaining_time):
@@ -147,10 +303,15 @@ class WikipediaCrawler:
         
         print(f"📊 Progreso: {bar} {Fore.YELLOW}{progress_percent:.1f}%{Style.RESET_ALL}")
         print(f"💾 Tamaño actual: {Fore.CYAN}{current_size_gb * 1024:.1f} MB{Style.RESET_ALL} ({Fore.YELLOW}{current_size_gb:.3f} GB{Style.RESET_ALL})")
-        print(f"📄 Páginas procesadas: {Fore.GREEN}{len(self.crawled_data)}{Style.RESET_ALL}")
+        print(f"📄 Páginas procesadas: {Fore.GREEN}{self.page_count}{Style.RESET_ALL}")
         print(f"⚡ Velocidad: {Fore.MAGENTA}{self.pages_per_minute:.1f} páginas/min{Style.RESET_ALL}")
         print(f"📏 Tamaño promedio: {Fore.CYAN}{self.avg_page_size_kb:.1f} KB/página{Style.RESET_ALL}")
         
+        print(f"📦 Rendimiento: {Fore.CYAN}{self.bytes_per_request() / 1024:.1f} KB de salida por request{Style.RESET_ALL}")
+        
+        limiter = self.rate_limiter.snapshot()
+        print(f"🚦 Ritmo: {Fore.MAGENTA}{limiter['rate']:.1f} req/s{Style.RESET_ALL} | Concurrencia: {limiter['concurrency_limit']} | Throttles: {limiter['throttled']}")
+        
         if remaining_time.total_seconds() > 0:
             hours, remainder = divmod(remaining_time.total_seconds(), 3600)
             minutes, _ = divmod(remainder, 60)
@@ -171,216 +332,1077 @@ class WikipediaCrawler:
         total_time = datetime.now() - self.start_time
         print(f"\n{Back.GREEN}{Fore.WHITE} CRAWLING COMPLETADO {Style.RESET_ALL}")
         print(f"⏱️  Tiempo total: {Fore.CYAN}{total_time}{Style.RESET_ALL}")
-        print(f"📄 Total de páginas: {Fore.GREEN}{len(self.crawled_data)}{Style.RESET_ALL}")
-        print(f"⚡ Velocidad promedio: {Fore.MAGENTA}{len(self.crawled_data) / (total_time.total_seconds() / 60):.1f} páginas/min{Style.RESET_ALL}")
+        print(f"📄 Total de páginas: {Fore.GREEN}{self.page_count}{Style.RESET_ALL}")
+        print(f"⚡ Velocidad promedio: {Fore.MAGENTA}{self.page_count / (total_time.total_seconds() / 60):.1f} páginas/min{Style.RESET_ALL}")
     
     def clean_text(self, text):
         """Limpiar y normalizar texto"""
-        if not text:
-            return ""
-        
-        # Remover caracteres especiales y números
-        text = re.sub(r'[^\w\s]', ' ', text)
-        text = re.sub(r'\d+', '', text)
-        text = re.sub(r'\s+', ' ', text)
-        
-        return text.strip().lower()
+        return text_processing.clean_text(text)
     
     def extract_words(self, text):
         """Extraer palabras limpias del texto"""
-        clean_text = self.clean_text(text)
-        
-        # Tokenizar
-        words = word_tokenize(clean_text, language='spanish')
-          # Filtrar stopwords y palabras muy cortas, pero ser menos restrictivo
-        words = [word for word in words if word not in self.stop_words and len(word) > 1]  # Cambio de >2 a >1
-        
-        return words
+        return text_processing.extract_words(text, self.stop_words, self.tokenizer)
     
     def generate_ngrams(self, words, n):
         """Generar n-gramas de una lista de palabras"""
-        if len(words) < n:
-            return []
-        
-        ngrams = []
-        for i in range(len(words) - n + 1):
-            ngram = ' '.join(words[i:i+n])
-            ngrams.append(ngram)
+        return text_processing.generate_ngrams(words, n)
+    
+    def processing_options(self):
+        """Opciones que necesita la etapa de CPU (se envían una vez a cada proceso del pool)"""
+        return {'stop_words': self.stop_words, 'tokenizer': self.tokenizer, 'ngram_format': self.ngram_format,
+                'simhash': self.near_duplicates is not None}
+    
+    def create_cpu_pool(self):
+        """Crear el pool de procesos para la etapa de CPU"""
+        return ProcessPoolExecutor(
+            max_workers=self.cpu_workers,
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=text_processing.init_worker,
+            initargs=(self.processing_options(),)
+        )
+    
+    def get_page_revisions(self, title, revision_info=None):
+        """
+        Obtener información de ediciones de una página usando la API de Wikipedia
+        
+        Sigue `rvcontinue` hasta recorrer el historial completo (o la ventana
+        revisions_from/revisions_to si está configurada) y cuenta ediciones por día.
+        La API no permite rvlimit con varios títulos, así que es una consulta por página.
+        En la misma consulta se pide prop=info: si se pasa `revision_info` se completa con
+        'lastrevid' y 'touched' de la versión guardada (los usa el modo refresh).
+        
+        Si una consulta falla (también a mitad de la paginación, o con ThrottledError tras
+        el backoff) se reintenta desde la misma continuación hasta `revision_retries`
+        veces; si sigue fallando se lanza la excepción: un conteo parcial nunca se
+        devuelve como si fuera el historial completo (ver fetch_page_revisions).
+        """
+        # URL de la API para obtener revisiones
+        api_url = f"{self.base_url}/w/api.php"
+        params = {
+            'action': 'query',
+            'format': 'json',
+            'titles': title,
+            'prop': 'revisions|info',
+            'rvlimit': 'max',
+            'rvprop': 'timestamp',
+            'maxlag': self.maxlag
+        }
+        if self.revisions_from or self.revisions_to:
+            params['rvdir'] = 'newer'
+            if self.revisions_from:
+                params['rvstart'] = self.revisions_from
+            if self.revisions_to:
+                params['rvend'] = self.revisions_to
+        
+        daily_edits = Counter()
+        failures = 0
+        with self.metrics.stage('revisions'):
+            while True:
+                try:
+                    response = self.request_with_backoff(api_url, params=params)
+                    response.raise_for_status()
+                    data = response.json()
+                    if 'error' in data:
+                        raise ValueError(f"error de la API: {data['error'].get('code')}")
+                except Exception as e:
+                    failures += 1
+                    if failures > self.revision_retries:
+                        raise
+                    retry_after = e.retry_after if isinstance(e, ThrottledError) else None
+                    wait = max(retry_after or 0, min(self.backoff_max, self.backoff_base * (2 ** failures)))
+                    logger.warning(f"⏳ Revisiones de {title}: {e}; reintento {failures}/{self.revision_retries} "
+                                   f"en {wait:.1f}s")
+                    self.metrics.inc('revision_retries')
+                    time.sleep(wait)
+                    continue  # Misma continuación: las páginas ya contadas no se repiten
+                failures = 0
+                
+                if 'query' in data and 'pages' in data['query']:
+                    for page_id, page_data in data['query']['pages'].items():
+                        if revision_info is not None and 'lastrevid' in page_data:
+                            revision_info['lastrevid'] = page_data['lastrevid']
+                            revision_info['touched'] = page_data.get('touched')
+                        # Contar ediciones por día
+                        for rev in page_data.get('revisions', []):
+                            daily_edits[rev['timestamp'][:10]] += 1
+                
+                # Seguir la continuación para no truncar historiales largos
+                if 'continue' not in data:
+                    break
+                params = {**params, **data['continue']}
         
-        return ngrams
+        return dict(daily_edits)
     
-    def get_page_revisions(self, title):
-        """Obtener información de ediciones de una página usando la API de Wikipedia"""
+    def fetch_page_revisions(self, page_data):
+        """
+        Completar 'ediciones' y la revisión de una página con get_page_revisions
+        
+        Si la consulta falla después de los reintentos, 'ediciones' queda en None (historial
+        incompleto: en el CSV la columna va vacía y en Parquet nula, distinto de '{}' sin
+        ediciones) y la página queda sin lastrevid, así el próximo refresh la vuelve a pedir.
+        """
+        revision = page_data.setdefault('revision', {})
         try:
-            # URL de la API para obtener revisiones
-            api_url = f"{self.base_url}/w/api.php"
-            params = {
-                'action': 'query',
-                'format': 'json',
-                'titles': title,
-                'prop': 'revisions',
-                'rvlimit': 'max',
-                'rvprop': 'timestamp'
-            }
-            
-            response = requests.get(api_url, params=params, headers=self.headers, timeout=10)
-            data = response.json()
-            if 'query' in data and 'pages' in data['query']:
-                pages = data['query']['pages']
-                for page_id, page_data in pages.items():
-                    if 'revisions' in page_data:
-                        revisions = page_data['revisions']
-                        # Contar ediciones por día
-                        revision_dates = [rev['timestamp'][:10] for rev in revisions]
-                        daily_edits = Counter(revision_dates)
-                        return dict(daily_edits)
-            
-            return {}
+            page_data['ediciones'] = self.get_page_revisions(page_data['titulo'], revision)
         except Exception as e:
-            logger.warning(f"Error obteniendo revisiones para {title}: {e}")
-            return {}
+            logger.warning(f"Historial de ediciones incompleto para {page_data['titulo']}: {e}")
+            self.metrics.inc('revisions_incomplete')
+            page_data['ediciones'] = None
+            revision.pop('lastrevid', None)
+            revision.pop('touched', None)
+        return page_data
     
-    def extract_links(self, soup, current_url):
-        """Extraer enlaces válidos de Wikipedia de la página"""
-        links = []
-        all_links_found = 0
-        valid_wiki_links = 0
+    def api_query(self, params):
+        """Consulta action=query a la API de MediaWiki (con maxlag y backoff); devuelve el JSON"""
+        response = self.request_with_backoff(
+            f"{self.base_url}/w/api.php",
+            params={'action': 'query', 'format': 'json', **params, 'maxlag': self.maxlag}
+        )
+        response.raise_for_status()
+        return response.json()
+    
+    def get_redirect_resolver(self):
+        if self.redirect_resolver is None:
+            self.redirect_resolver = RedirectResolver(
+                self.api_query, batch_size=self.redirect_batch_titles, metrics=self.metrics
+            )
+        return self.redirect_resolver
+    
+    def canonical_links(self, links):
+        """Resolver redirecciones de los enlaces (si resolve_redirects está activo): solo artículos canónicos"""
+        if not self.resolve_redirects or not links:
+            return links
+        return self.get_redirect_resolver().resolve(links)
+    
+    def extract_links(self, links, current_url, all_links_found=None):
+        """
+        Separar los enlaces a artículos de una página: (todos, nuevos para la frontera)
+        
+        La fila guarda todos los enlaces canónicos de la página sin repetir (ni el enlace a
+        sí misma), visitados o no: así no depende del momento del crawl y una página sin
+        cambios re-crawleada en refresh queda con la misma fila. Los nuevos son los no
+        visitados que van a entrar a la frontera (con la política 'bfs', solo los primeros
+        `links_per_page`); solo esos se resuelven a su artículo canónico (redirecciones y
+        enlaces rojos) y se vuelven a filtrar: una redirección a una página ya visitada se
+        descarta.
+        """
+        links = text_processing.page_links(links, current_url)
+        new_links = [link for link in links if link not in self.visited_urls]
+        if self.frontier_policy == 'bfs':
+            new_links = new_links[:self.links_per_page]  # Más enlaces por página para explorar más contenido
+        new_links = [link for link in self.canonical_links(new_links) if link not in self.visited_urls]
+        
+        # Debug: mostrar estadísticas de extracción de enlaces
+        total = all_links_found if all_links_found is not None else len(links)
+        logger.info(f"🔗 Enlaces en {current_url}: {total} total, {len(links)} /wiki/ válidos, {len(new_links)} nuevos")
+        
+        return links, new_links
+    
+    def request_with_backoff(self, url, params=None, conditional=False):
+        """
+        Realizar un GET respetando el limitador adaptativo
         
-        # Buscar todos los enlaces
-        for link in soup.find_all('a', href=True):
-            href = link.get('href')
-            all_links_found += 1
+        Las respuestas 429/503 y los errores maxlag de la API reducen la velocidad y se
+        reintentan con backoff exponencial (o el Retry-After indicado por el servidor).
+        Si se agotan los reintentos se lanza ThrottledError para reencolar la URL.
+        Con `conditional` se envían los validadores guardados (puede devolver 304).
+        """
+        retry_after = None
+        for attempt in range(self.max_retries + 1):
+            with self.rate_limiter.slot():
+                response = self.transport.get(url, params=params, conditional=conditional)
+            # Bytes en la red: Content-Length (comprimido) si el servidor lo envía
+            body_bytes = len(response.content)
+            self.metrics.record_response(
+                response.status_code, int(response.headers.get('Content-Length') or body_bytes), body_bytes
+            )
+            
+            is_maxlag = response.headers.get('MediaWiki-API-Error') == 'maxlag'
+            if response.status_code not in (429, 503) and not is_maxlag:
+                self.rate_limiter.on_success()
+                return response
             
-            # Filtrar solo enlaces a otras páginas de Wikipedia
-            if href and href.startswith('/wiki/'):
-                valid_wiki_links += 1
-                # Evitar enlaces a archivos, categorías, etc.
-                if not any(x in href for x in [':', '#', '?', 'Archivo:', 'Categoría:', 'Plantilla:']):
-                    full_url = urljoin(self.base_url, href)
-                    if full_url not in self.visited_urls:
-                        links.append(full_url)
+            retry_after = parse_retry_after(response.headers.get('Retry-After'))
+            self.rate_limiter.on_throttle(retry_after)
+            
+            if attempt < self.max_retries:
+                backoff = min(self.backoff_max, self.backoff_base * (2 ** attempt))
+                wait = max(retry_after or 0, backoff) + random.uniform(0, self.backoff_base)
+                reason = 'maxlag' if is_maxlag else f'HTTP {response.status_code}'
+                logger.warning(f"⏳ {reason} en {url}, reintento {attempt + 1}/{self.max_retries} en {wait:.1f}s")
+                time.sleep(wait)
+        
+        raise ThrottledError(f"Reintentos agotados para {url}", retry_after)
+    
+    def title_from_url(self, url):
+        """Obtener el título del artículo a partir de su URL /wiki/"""
+        path = urlparse(url).path
+        return unquote(path.split('/wiki/', 1)[-1]).replace('_', ' ')
+    
+    def fetch_page(self, url):
+        """
+        Descargar una página (etapa de red) según fetch_mode
         
-        # Debug: mostrar estadísticas de extracción de enlaces
-        logger.info(f"🔗 Enlaces en {current_url}: {all_links_found} total, {valid_wiki_links} /wiki/, {len(links)} únicos válidos")
+        Devuelve un documento {'html', 'title'}; 'title' es None cuando el título debe
+        salir del propio HTML. Devuelve None si la página no cambió desde el último crawl.
+        """
+        if self.fetch_mode == 'parse':
+            return self.fetch_page_parse_api(url)
+        if self.fetch_mode == 'rest':
+            return self.fetch_page_rest_api(url)
         
-        return links
+        response = self.request_with_backoff(url, conditional=True)
+        if response.status_code == 304:
+            return None
+        response.raise_for_status()
+        self.archive_response(url, response)
+        return {'html': response.content, 'title': None}
     
-    def crawl_page(self, url):
-        """Crawlear una página específica y extraer toda la información"""
+    def fetch_page_parse_api(self, url):
+        """Pedir a action=parse solo el HTML del cuerpo del artículo (sin piel, menús ni scripts)"""
+        api_url = f"{self.base_url}/w/api.php"
+        params = {
+            'action': 'parse',
+            'format': 'json',
+            'formatversion': 2,
+            'page': self.title_from_url(url),
+            'prop': 'text|displaytitle',
+            'redirects': 1,
+            'disableeditsection': 1,
+            'disabletoc': 1,
+            'disablelimitreport': 1,
+            'maxlag': self.maxlag
+        }
+        response = self.request_with_backoff(api_url, params=params)
+        response.raise_for_status()
+        data = response.json()
+        if 'parse' not in data:
+            raise ValueError(data.get('error', {}).get('info', 'respuesta sin parse'))
+        self.archive_response(url, response)
+        return {'html': data['parse']['text'], 'title': data['parse']['title']}
+    
+    def fetch_page_rest_api(self, url):
+        """Pedir el HTML de Parsoid del artículo al endpoint REST /page/html"""
+        title = self.title_from_url(url)
+        rest_url = f"{self.base_url}/api/rest_v1/page/html/{quote(title.replace(' ', '_'), safe='')}"
+        response = self.request_with_backoff(rest_url, conditional=True)
+        if response.status_code == 304:
+            return None
+        response.raise_for_status()
+        self.archive_response(url, response)
+        return {'html': response.content, 'title': title}
+    
+    def get_archive(self):
+        """Archivo WARC de esta ejecución (solo con archive_responses)"""
+        if self.archive is None and self.archive_responses:
+            self.archive = WarcWriter(os.path.join(self.data_dir, "warc"), max_file_mb=self.warc_max_file_mb)
+        return self.archive
+    
+    def archive_response(self, url, response):
+        """Guardar la respuesta cruda de una página en el WARC (si archive_responses está activo)"""
+        if self.archive_responses:
+            self.get_archive().write_response(url, response, self.fetch_mode)
+    
+    def archive_page_metadata(self, page_data):
+        """Lo que la página no trae en su HTML (ediciones, revisión) va junto a la respuesta archivada"""
+        if self.archive_responses:
+            self.get_archive().write_metadata(page_data['url'], {
+                'titulo': page_data.get('titulo'),
+                'ediciones': page_data.get('ediciones', {}),
+                'revision': page_data.get('revision')
+            })
+    
+    def download_page(self, url):
+        """Descargar una página; None si falló o no cambió (ThrottledError se propaga para reencolar)"""
         try:
             logger.info(f"Procesando: {url}")
             
             # Realizar request
-            response = requests.get(url, headers=self.headers, timeout=10)
-            response.raise_for_status()
-            
-            # Parsear HTML
-            soup = BeautifulSoup(response.content, 'html.parser')
-            
-            # Extraer título
-            title_element = soup.find('h1', {'class': 'firstHeading'})
-            title = title_element.get_text().strip() if title_element else "Sin título"
-              # Extraer contenido principal - incluir más secciones
-            content_div = soup.find('div', {'id': 'mw-content-text'})
-            if not content_div:
-                return None
-            
-            # Remover elementos no deseados pero mantener más contenido
-            for element in content_div.find_all(['script', 'style']):  # Remover menos elementos
-                element.decompose()
-            
-            # Extraer texto de múltiples secciones
-            text_content = []
-            
-            # Contenido principal
-            text_content.append(content_div.get_text())
-            
-            # Buscar secciones adicionales como referencias, enlaces externos, etc.
-            for section in soup.find_all(['p', 'li', 'dd', 'dt']):
-                if section.get_text().strip():
-                    text_content.append(section.get_text())
+            with self.metrics.stage('fetch'):
+                document = self.fetch_page(url)
+            if document is None:
+                logger.info(f"♻️ Sin cambios (304), ya guardada: {url}")
+            return document
             
-            # Combinar todo el texto
-            text = ' '.join(text_content)
-            
-            # Procesar palabras
-            words = self.extract_words(text)
-            
-            if len(words) < 10:  # Saltar páginas con muy poco contenido
-                return None
-            
-            # Generar n-gramas
-            unigramas = words
-            bigramas = self.generate_ngrams(words, 2)
-            trigramas = self.generate_ngrams(words, 3)
-            
-            # Extraer enlaces
-            links = self.extract_links(soup, url)
-            
-            # Obtener información de ediciones
-            ediciones = self.get_page_revisions(title)
-              # Crear registro de datos
-            page_data = {
-                'titulo': title,
-                'url': url,
-                'unigramas': unigramas,
-                'bigramas': bigramas,
-                'trigramas': trigramas,
-                'links': links,
-                'ediciones': ediciones,
-                'timestamp': datetime.now().isoformat()            
-            }
-            
-            return page_data
+        except ThrottledError:
+            # No perder la página: quien llama la reencola para intentarla más tarde
+            raise
+        except Exception as e:
+            logger.error(f"Error procesando {url}: {e}")
+            return None
+    
+    def crawl_page(self, url):
+        """Crawlear una página específica y extraer toda la información"""
+        document = self.download_page(url)
+        if document is None:
+            return None
+        return self.process_page(url, document)
+    
+    def process_page(self, url, document):
+        """Procesar el documento descargado y construir el registro de la página"""
+        try:
+            # Una sola pasada con lxml: título, texto del contenido (sin duplicados) y enlaces
+            page_data, all_links_found, timings = process_document(url, document, self.base_url, self.processing_options())
+            self.metrics.observe_many(timings)
+            return self.finish_page(url, page_data, all_links_found)
             
         except Exception as e:
             logger.error(f"Error procesando {url}: {e}")
             return None
     
-    def crawl_recursive(self, start_urls, current_depth=0):
-        """Crawlear recursivamente desde las URLs iniciales"""
-        if current_depth >= self.max_depth or len(self.crawled_data) >= self.max_pages:
-            return
+    def finish_page(self, url, page_data, all_links_found):
+        """Completar en el proceso principal lo que depende del estado del crawler"""
+        if page_data is None:
+            return None
+        
+        # Extraer enlaces (los nuevos solo viajan hasta enqueue_links, no van a la salida)
+        page_data['links'], page_data['new_links'] = self.extract_links(page_data['links'], url, all_links_found)
+        
+        # Obtener información de ediciones (en segundo plano si async_revisions está activo)
+        if not self.async_revisions:
+            self.fetch_page_revisions(page_data)
+        
+        return page_data
+    
+    def build_page_record(self, title, url, text, links, ediciones):
+        """Tokenizar el texto y crear el registro de datos de una página (None si es muy corta)"""
+        return text_processing.build_record(title, url, text, links, ediciones, self.processing_options())
+    
+    def ingest_dump(self, dump_path, limit=None):
+        """
+        Construir el corpus desde un dump XML local (eswiki-*-pages-articles.xml.bz2) sin red
         
-        # Inicializar progreso si es la primera vez
-        if current_depth == 0 and not self.progress_bar:
+        El dump se lee en streaming página por página; solo se procesan artículos
+        (espacio de nombres 0) que no sean redirecciones. Las ediciones por día salen de
+        las revisiones incluidas en el dump (solo la última en pages-articles).
+        Con cpu_workers > 0 el wikitexto se procesa en el pool de procesos, con una
+        ventana acotada de páginas en vuelo para que la memoria no crezca.
+        """
+        limit = limit or self.max_pages
+        if not self.progress_bar:
+            self.init_progress_tracking()
+        
+        logger.info(f"📦 Ingiriendo dump: {dump_path}")
+        cpu_pool = self.create_cpu_pool() if self.cpu_workers > 0 else None
+        window = deque()
+        max_window = self.cpu_workers * 4
+        
+        def store(page_data):
+            if page_data and self.page_count < limit:
+                self.page_count += 1
+                self.store_page(page_data)
+                self.update_progress_display()
+        
+        scanned = 0
+        try:
+            for dump_page in iter_dump_pages(dump_path):
+                if self.page_count >= limit:
+                    break
+                scanned += 1
+                if dump_page['ns'] != 0 or dump_page['redirect']:
+                    continue
+                
+                url = title_to_url(self.base_url, dump_page['title'])
+                if url in self.visited_urls:
+                    continue
+                self.visited_urls.add(url)
+                
+                ediciones = dict(Counter(ts[:10] for ts in dump_page['timestamps'] if ts))
+                args = (dump_page['title'], url, dump_page['text'], ediciones, self.base_url)
+                
+                if cpu_pool is None:
+                    store(process_wikitext(*args, options=self.processing_options()))
+                    continue
+                
+                window.append(cpu_pool.submit(process_wikitext, *args))
+                if len(window) >= max_window:
+                    store(window.popleft().result())
+            
+            while window:
+                store(window.popleft().result())
+        finally:
+            if cpu_pool is not None:
+                cpu_pool.shutdown(wait=True, cancel_futures=True)
+        
+        logger.info(f"📦 Dump procesado: {scanned} páginas leídas, {self.page_count} artículos guardados")
+    
+    def reprocess(self, warc_dirs, limit=None):
+        """
+        Re-derivar el corpus desde los WARC archivados con archive_responses, sin red
+        
+        Vuelve a correr extracción, limpieza, tokenización y n-gramas (con la configuración
+        actual: stopwords, tokenizador, formato de n-gramas) sobre la última captura de cada
+        página; las ediciones salen de la metadata archivada. Cada worker del pool de CPU
+        lee y descomprime sus propios registros, así el proceso principal solo escribe.
+        Como al crawlear, guarda todos los enlaces a artículos de la página sin repetir
+        (sin resolver redirecciones, que requiere la API).
+        """
+        limit = limit or self.max_pages
+        if not self.progress_bar:
             self.init_progress_tracking()
         
-        next_urls = []
+        pages = WarcArchive(warc_dirs).pages()
+        logger.info(f"🗄️ Re-procesando {len(pages)} páginas archivadas con {max(1, self.cpu_workers)} procesos")
+        cpu_pool = self.create_cpu_pool() if self.cpu_workers > 0 else None
+        window = deque()
+        max_window = self.cpu_workers * 4
+        
+        def store(result):
+            page_data, timings = result
+            self.metrics.observe_many(timings)
+            if page_data and self.page_count < limit:
+                self.page_count += 1
+                self.store_page(page_data)
+                self.update_progress_display()
+        
+        try:
+            for url, location, metadata_location in pages:
+                if self.page_count >= limit:
+                    break
+                if url in self.visited_urls:
+                    continue
+                self.visited_urls.add(url)
+                
+                args = (url, location, metadata_location, self.base_url)
+                if cpu_pool is None:
+                    store(process_archived(*args, options=self.processing_options()))
+                    continue
+                
+                window.append(cpu_pool.submit(process_archived, *args))
+                if len(window) >= max_window:
+                    store(window.popleft().result())
+            
+            while window:
+                store(window.popleft().result())
+        finally:
+            if cpu_pool is not None:
+                cpu_pool.shutdown(wait=True, cancel_futures=True)
+        
+        logger.info(f"🗄️ Re-proceso terminado: {self.page_count} páginas guardadas")
+    
+    def new_visited_set(self):
+        """Conjunto compacto de URLs visitadas dimensionado para max_pages"""
+        return VisitedSet(expected_items=max(self.max_pages * 2, 1024), bloom_error_rate=self.bloom_error_rate)
+    
+    def get_frontier(self):
+        """Frontera de URLs persistente (se crea en data_dir la primera vez)"""
+        if self.frontier is None:
+            self.frontier = UrlFrontier(os.path.join(self.data_dir, "frontier.sqlite"))
+        return self.frontier
+    
+    def frontier_pending(self):
+        """URLs pendientes en la frontera persistente (0 si no hay frontera)"""
+        return self.frontier.pending_count() if self.frontier is not None else 0
+    
+    def enqueue_links(self, page_data, depth):
+        """
+        Pasar los enlaces de una página a la frontera, un nivel más abajo
+        
+        Con la política 'yield' entran todos los enlaces (cada aparición cuenta como enlace
+        entrante) con prioridad por rendimiento estimado: las páginas cortas que crawl_page
+        descarta suelen tener pocos enlaces entrantes y estar enlazadas desde otras cortas.
+        """
+        links = page_data.pop('new_links', [])
+        if depth + 1 >= self.max_depth:
+            return
+        if self.coordinator is not None:
+            # Los enlaces de otros shards quedan en la bandeja de su dueño
+            own, foreign = [], []
+            for link in links:
+                (own if shard_of(link, self.num_shards) == self.shard_id else foreign).append(link)
+            self.coordinator.offer(self.shard_id, foreign, depth + 1)
+            links = own
+        if self.frontier_policy == 'yield':
+            parent_yield = self.parent_size_weight * math.log2(1 + self.ngram_total(page_data.get('unigramas', [])))
+            self.frontier.push_scored(links, depth + 1, parent_yield, self.inlink_weight)
+        else:
+            self.frontier.push_many(links, depth + 1)
+    
+    def connect_coordinator(self, spec, shard_id, num_shards):
+        """
+        Trabajar como el shard `shard_id` de `num_shards` en un crawl repartido
+        
+        `spec` es la ruta del SQLite del coordinador (procesos en la misma máquina) o
+        'host:puerto' de un coordinador servido con --serve-coordinator (con la clave de
+        WIKICRAWLER_COORDINATOR_KEY). Este worker solo crawlea las URLs de su shard; el
+        resto pasa por el coordinador a su dueño.
+        """
+        if not 0 <= shard_id < num_shards:
+            raise ValueError(f"shard inválido: {shard_id} (de {num_shards})")
+        self.coordinator = open_coordinator(spec, num_shards)
+        self.shard_id = shard_id
+        self.num_shards = num_shards
+        self.coordinator.register(shard_id)
+        logger.info(f"🧩 Shard {shard_id + 1}/{num_shards} conectado al coordinador {spec}")
+    
+    def receive_handoff(self):
+        """
+        Pasar a la frontera local los enlaces que otros shards entregaron a este; devuelve cuántos
+        
+        No se confirma la frontera aquí: su transacción también tiene los mark_done de
+        páginas cuyas filas siguen en el buffer de la salida. Los enlaces se borran del
+        coordinador (ack) en el próximo checkpoint_frontier, que corre después de confirmar
+        la salida; si el proceso muere antes, se vuelven a entregar al reanudar.
+        """
+        rows = self.coordinator.receive(self.shard_id, after_id=self.handoff_received_id)
+        if not rows:
+            return 0
+        for _, url, depth in rows:
+            self.frontier.push(url, depth)
+        self.handoff_received_id = rows[-1][0]
+        return len(rows)
+    
+    def shard_finished(self):
+        """Sin trabajo local: True si el crawl completo terminó (todos los shards ociosos)"""
+        if self.coordinator is None:
+            return True
+        if self.handoff_received_id > self.handoff_acked_id:
+            # El coordinador no deja ocioso a un shard con enlaces sin ack: confirmar la salida
+            # (y con ella la frontera) para poder borrarlos
+            self.get_output_sink().close()
+            self.checkpoint_frontier()
+        return self.coordinator.idle(self.shard_id, self.stats['pages'])
+    
+    def checkpoint_frontier(self, force=False):
+        """
+        Confirmar la frontera junto con los contadores (tras escribir las páginas en disco)
+        
+        Cada `checkpoint_interval_pages` páginas (o con force) escribe además el checkpoint binario.
+        """
+        if self.frontier is None:
+            return
+        for sidecar in (self.near_duplicate_index, self.near_duplicate_log):
+            if sidecar is not None:
+                sidecar.flush()
+        received = self.handoff_received_id
+        self.frontier.commit({'stats': self.stats})
+        if self.coordinator is not None and received > self.handoff_acked_id:
+            # Los enlaces entregados ya están en la frontera confirmada: borrarlos del coordinador
+            self.coordinator.ack(self.shard_id, received)
+            self.handoff_acked_id = received
+        if force or self.stats['pages'] - self.checkpoint_pages >= self.checkpoint_interval_pages:
+            self.write_checkpoint()
+    
+    def write_checkpoint(self):
+        """
+        Guardar el checkpoint binario para reanudar en segundos
+        
+        Contiene las huellas de las URLs visitadas (la tabla tal cual), el done_seq de la
+        frontera ya confirmado, los contadores y el manifiesto de la salida. Se llama justo
+        después de confirmar la frontera, así ambos describen el mismo punto.
+        """
+        sink = self.output_sink
+        meta = {
+            'timestamp': datetime.now().isoformat(),
+            'frontier': os.path.basename(self.frontier.path),
+            'frontier_done_seq': self.frontier.done_seq,
+            'stats': self.stats,
+            'output': {
+                'format': self.output_format,
+                'rows': sink.rows_written if sink is not None else 0,
+                'segments': sink.segments if sink is not None else []
+            }
+        }
+        # Las URLs en curso vuelven a pendientes al reanudar: no van como visitadas
+        in_progress = self.frontier.in_progress_urls()
+        for url in in_progress:
+            self.visited_urls.discard(url)
+        visited_bytes = self.visited_urls.tobytes()
+        self.visited_urls.update(in_progress)
+        try:
+            write_checkpoint(os.path.join(self.data_dir, "crawler_checkpoint.bin"), meta, visited_bytes)
+            self.checkpoint_pages = self.stats['pages']
+        except OSError as e:
+            logger.warning(f"No se pudo escribir el checkpoint: {e}")
+    
+    def crawl_sequential(self):
+        """Crawlear de a una página sacando las URLs de la frontera persistente"""
+        if not self.progress_bar:
+            self.init_progress_tracking()
         
-        for url in start_urls:
-            if url in self.visited_urls or len(self.crawled_data) >= self.max_pages:
+        frontier = self.get_frontier()
+        while self.page_count < self.max_pages:
+            entry = frontier.pop()
+            if entry is None:
+                if self.coordinator is None or self.shard_finished():
+                    break
+                # Otros shards siguen activos y pueden entregar enlaces a este
+                if not self.receive_handoff():
+                    time.sleep(0.2)
                 continue
             
+            # La frontera entrega cada URL una sola vez: visited_urls solo filtra enlaces
+            url, depth = entry
             self.visited_urls.add(url)
             
-            # Crawlear la página
-            page_data = self.crawl_page(url)
+            # Crawlear la página (el limitador adaptativo regula la velocidad)
+            try:
+                page_data = self.crawl_page(url)
+            except ThrottledError:
+                logger.warning(f"🔁 Reencolando {url} tras throttling")
+                self.visited_urls.discard(url)
+                self.metrics.inc('requeued')
+                frontier.requeue(url)
+                continue
             
             if page_data:
-                self.crawled_data.append(page_data)
-                next_urls.extend(page_data['links'][:25])  # Más enlaces por página para explorar más contenido
-                
-                # Guardar progreso cada 20 páginas para mejor rendimiento
-                if len(self.crawled_data) % 20 == 0:
-                    self.save_progress_lightweight()  # Guardado rápido y ligero
-                    self.save_state()  # Guardar estado para continuación
+                self.enqueue_links(page_data, depth)
+                self.register_page(page_data)
+            else:
+                self.metrics.inc('pages_discarded')
+                frontier.mark_done(url)
+    
+    async def crawl_async(self):
+        """
+        Crawlear concurrentemente con asyncio sacando las URLs de la frontera persistente
+        
+        Hasta `self.concurrency` workers sacan URLs de la frontera (misma prioridad y
+        profundidad que en el modo secuencial); el limitador adaptativo decide cuántos
+        de ellos pueden salir realmente a la red. Un worker sin URLs espera mientras
+        otros tengan páginas en vuelo, porque esas páginas pueden encolar enlaces nuevos.
+        
+        La descarga (I/O) corre en un pool de threads y el parseo/tokenización/n-gramas
+        (CPU) en un pool de procesos. Cada worker espera a que su documento se procese
+        antes de descargar otro y el pool tiene una ventana acotada de trabajos, así que
+        si la red va más rápido que el CPU las descargas se frenan y la memoria no crece.
+        """
+        if not self.progress_bar:
+            self.init_progress_tracking()
+        
+        loop = asyncio.get_running_loop()
+        frontier = self.get_frontier()
+        in_flight = 0
+        cpu_pool = self.create_cpu_pool() if self.cpu_workers > 0 else None
+        cpu_slots = asyncio.Semaphore(max(1, self.cpu_workers * 2))
+        
+        async def crawl_one(executor, url):
+            if cpu_pool is None:
+                return await loop.run_in_executor(executor, self.crawl_page, url)
+            
+            document = await loop.run_in_executor(executor, self.download_page, url)
+            if document is None:
+                return None
+            
+            try:
+                async with cpu_slots:
+                    page_data, all_links_found, timings = await loop.run_in_executor(
+                        cpu_pool, process_document, url, document, self.base_url
+                    )
+                self.metrics.observe_many(timings)
+            except Exception as e:
+                logger.error(f"Error procesando {url}: {e}")
+                return None
+            
+            # Puede consultar la API de revisiones (si no es asíncrona): fuera del event loop
+            try:
+                return await loop.run_in_executor(executor, self.finish_page, url, page_data, all_links_found)
+            except Exception as e:
+                logger.error(f"Error procesando {url}: {e}")
+                return None
+        
+        try:
+            with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix='crawler-fetch') as executor:
                 
-                # Actualizar progreso con información del archivo CSV
-                csv_file = os.path.join(self.data_dir, "wikipedia_crawl_data.csv")
-                current_file_size_mb = 0
-                if os.path.exists(csv_file):
-                    current_file_size_mb = os.path.getsize(csv_file) / (1024 * 1024)
+                async def worker():
+                    nonlocal in_flight
+                    while self.page_count < self.max_pages:
+                        entry = frontier.pop()
+                        if entry is None:
+                            if self.coordinator is not None and self.receive_handoff():
+                                continue
+                            if in_flight == 0 and self.shard_finished():
+                                return
+                            await asyncio.sleep(0.05)
+                            continue
+                        
+                        # La frontera ya la marcó en curso: ningún otro worker la repite
+                        url, depth = entry
+                        self.visited_urls.add(url)
+                        in_flight += 1
+                        try:
+                            page_data = await crawl_one(executor, url)
+                        except ThrottledError:
+                            logger.warning(f"🔁 Reencolando {url} tras throttling")
+                            self.visited_urls.discard(url)
+                            self.metrics.inc('requeued')
+                            frontier.requeue(url)
+                            continue
+                        finally:
+                            in_flight -= 1
+                        
+                        if not page_data:
+                            self.metrics.inc('pages_discarded')
+                            frontier.mark_done(url)
+                        elif self.page_count < self.max_pages:
+                            self.enqueue_links(page_data, depth)
+                            self.register_page(page_data)
                 
-                # Actualizar display de progreso
-                self.update_progress_display(current_file_size_mb)
-            
-            # Delay entre requests
-            time.sleep(self.delay)
+                await asyncio.gather(*(worker() for _ in range(self.concurrency)))
+        finally:
+            if cpu_pool is not None:
+                cpu_pool.shutdown(wait=True, cancel_futures=True)
+    
+    def crawl(self, start_urls):
+        """
+        Crawlear desde las URLs iniciales usando el modo configurado (secuencial o concurrente)
+        
+        Las URLs iniciales entran a la frontera con profundidad 0 (las ya conocidas se
+        ignoran), así que al reanudar se sigue con lo que quedó pendiente en la frontera.
+        """
+        start_urls = self.canonical_links([canonicalize_url(url) for url in start_urls])
+        if self.coordinator is not None:
+            start_urls = self.coordinator.offer(self.shard_id, start_urls, 0)
+        self.get_frontier().push_many(start_urls, 0)
+        try:
+            if self.concurrency > 1:
+                asyncio.run(self.crawl_async())
+            else:
+                self.crawl_sequential()
+        finally:
+            self.flush_pending_pages()
+            if self.coordinator is not None:
+                self.coordinator.finish(self.shard_id, self.stats['pages'])
+    
+    def register_page(self, page_data):
+        """Aceptar una página procesada y enviarla a la etapa de ediciones o guardarla directamente"""
+        if self.is_near_duplicate(page_data):
+            return
+        self.page_count += 1
+        
+        if self.async_revisions:
+            if self.revision_enricher is None:
+                self.revision_enricher = RevisionEnricher(
+                    self.fetch_page_revisions,
+                    workers=max(2, self.concurrency // 2),
+                    max_pending=self.revision_max_pending
+                )
+            # Con revision_max_pending páginas en espera bloquea hasta que termine una consulta
+            self.revision_enricher.submit(page_data)
+            for enriched_page in self.revision_enricher.drain():
+                self.store_page(enriched_page)
+        else:
+            self.store_page(page_data)
+        
+        # Actualizar display de progreso con los bytes confirmados en el manifiesto (sin stat del CSV)
+        self.update_progress_display(self.output_size_mb())
+        
+        if self.coordinator is not None and self.page_count % self.handoff_poll_pages == 0:
+            self.receive_handoff()
+    
+    def get_near_duplicate_index(self):
+        """Índice SimHash de las páginas guardadas (data/simhashes.txt, se recarga al reanudar)"""
+        if self.near_duplicate_index is None:
+            self.near_duplicate_index = SimHashIndex(
+                self.near_duplicate_similarity,
+                path=os.path.join(self.data_dir, "simhashes.txt")
+            )
+        return self.near_duplicate_index
+    
+    def is_near_duplicate(self, page_data):
+        """
+        Comparar la huella de la página con las ya aceptadas (True si hay que descartarla)
+        
+        Con 'skip' la página no se guarda ni cuenta para max_pages y se marca terminada en
+        la frontera; con 'flag' se guarda igual. En ambos casos se anota en
+        near_duplicates.csv junto a la página original, y los bytes de su fila en el formato
+        de salida (ver output_row_bytes) se suman a near_duplicate_bytes: lo que ahorra
+        'skip' o ahorraría con 'flag'.
+        """
+        fingerprint = page_data.pop('simhash', None)
+        if fingerprint is None or self.near_duplicates is None:
+            return False
+        index = self.get_near_duplicate_index()
+        match = index.nearest(fingerprint, page_data['url'])
+        if match is None:
+            index.add(page_data['url'], fingerprint)
+            return False
+        
+        original_url, similarity = match
+        self.metrics.inc('near_duplicates')
+        self.metrics.inc('near_duplicate_bytes', self.output_row_bytes(page_data))
+        self.log_near_duplicate(page_data['url'], original_url, similarity)
+        if self.near_duplicates == 'flag':
+            return False
+        logger.info(f"🧬 Casi duplicado de {original_url} ({similarity:.0%}), no se guarda: {page_data['url']}")
+        if self.frontier is not None:
+            self.frontier.mark_done(page_data['url'])
+        return True
+    
+    def output_row_bytes(self, page_data):
+        """
+        Bytes que ocuparía la fila de la página en el sink activo (CSV o Parquet), sin guardarla
+        
+        Con token_ids la fila guarda IDs: se codifica una copia de la página (sus tokens ya
+        están casi todos en el vocabulario, es casi un duplicado de una página guardada).
+        """
+        page = dict(page_data)
+        if self.token_ids:
+            self.get_vocabulary().encode_page(page)
+        return self.get_output_sink().row_bytes(self.page_to_output_row(page))
+    
+    def log_near_duplicate(self, url, original_url, similarity):
+        if self.near_duplicate_log is None:
+            path = os.path.join(self.data_dir, "near_duplicates.csv")
+            new_file = not os.path.exists(path)
+            self.near_duplicate_log = open(path, 'a', encoding='utf-8', newline='')
+            if new_file:
+                self.near_duplicate_log.write('url,original,similitud,descartada\n')
+        csv.writer(self.near_duplicate_log).writerow(
+            [url, original_url, f"{similarity:.4f}", int(self.near_duplicates == 'skip')]
+        )
+    
+    def flush_pending_pages(self):
+        """Esperar las páginas que aún consultan su historial de ediciones y guardarlas"""
+        if self.revision_enricher is None:
+            return
+        for enriched_page in self.revision_enricher.close():
+            self.store_page(enriched_page)
+        self.revision_enricher = None
+    
+    def refresh(self):
+        """
+        Actualizar la salida re-crawleando solo las páginas cuya revisión cambió
+        
+        Consulta prop=info en lotes de `refresh_batch_titles` títulos con los lastrevid
+        guardados en la frontera y vuelve a descargar y procesar solo las páginas que
+        cambiaron (o sin revisión conocida: crawls anteriores a este modo o descartadas).
+        Sus filas se reemplazan en el mismo lugar de la salida; el costo es proporcional
+        a las ediciones desde el último crawl y no al tamaño del corpus.
+        """
+        frontier = self.get_frontier()
+        stored = frontier.crawled_revisions()
+        logger.info(f"🔄 Refresh: comprobando la revisión de {len(stored)} páginas guardadas")
+        
+        current = {}  # url -> (lastrevid, touched) según la API
+        missing = 0
+        for start in range(0, len(stored), self.refresh_batch_titles):
+            batch = [url for url, _ in stored[start:start + self.refresh_batch_titles]]
+            batch_current, batch_missing = self.query_revisions(batch)
+            current.update(batch_current)
+            missing += batch_missing
+        
+        changed = [url for url, lastrevid in stored if url in current and current[url][0] != lastrevid]
+        logger.info(f"🔄 {len(changed)} páginas cambiaron, {len(current) - len(changed)} sin cambios, "
+                    f"{missing} ya no existen")
+        
+        refreshed = 0
+        with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix='crawler-refresh') as executor:
+            for start in range(0, len(changed), self.refresh_batch_pages):
+                pages = [page for page in executor.map(self.refresh_page, changed[start:start + self.refresh_batch_pages])
+                         if page is not None]
+                refreshed += self.apply_refresh(pages)
+                logger.info(f"🔄 Refresh: {min(start + self.refresh_batch_pages, len(changed))}/{len(changed)} "
+                            f"páginas revisadas, {refreshed} filas actualizadas")
+        
+        # Las páginas sin cambios (o descartadas otra vez) no se vuelven a consultar hasta que cambien
+        for url, (lastrevid, touched) in current.items():
+            frontier.set_revision(url, lastrevid, touched)
+        self.get_output_sink().close()
+        self.transport.validators.save()
+        self.checkpoint_frontier(force=True)
+        self.metrics.export()
+        return refreshed
+    
+    def query_revisions(self, urls):
+        """
+        Revisión actual de un lote de URLs con una sola consulta prop=info
         
-        # Continuar recursivamente
-        if next_urls and current_depth < self.max_depth - 1:
-            self.crawl_recursive(next_urls, current_depth + 1)
+        Devuelve ({url: (lastrevid, touched)}, páginas que ya no existen). Los títulos
+        normalizados o redirigidos por la API se mapean de vuelta a la URL guardada.
+        """
+        titles = {}
+        for url in urls:
+            titles.setdefault(self.title_from_url(url), []).append(url)
+        params = {
+            'action': 'query',
+            'format': 'json',
+            'titles': '|'.join(titles),
+            'prop': 'info',
+            'redirects': 1,
+            'maxlag': self.maxlag
+        }
+        try:
+            response = self.request_with_backoff(f"{self.base_url}/w/api.php", params=params)
+            query = response.json().get('query', {})
+        except Exception as e:
+            logger.warning(f"Error consultando revisiones de {len(urls)} páginas: {e}")
+            return {}, 0
+        
+        for mapping in ('normalized', 'redirects'):
+            for item in query.get(mapping, []):
+                if item.get('from') in titles:
+                    titles.setdefault(item['to'], []).extend(titles[item['from']])
+        
+        current = {}
+        missing = 0
+        for page in query.get('pages', {}).values():
+            if 'missing' in page or 'invalid' in page:
+                missing += len(titles.get(page.get('title'), []))
+                continue
+            for url in titles.get(page.get('title'), []):
+                current[url] = (page.get('lastrevid'), page.get('touched'))
+        return current, missing
+    
+    def refresh_page(self, url):
+        """Volver a crawlear una página cambiada con su historial de ediciones (None si se descarta)"""
+        try:
+            page_data = self.crawl_page(url)
+        except ThrottledError:
+            logger.warning(f"⏳ {url} sigue limitada, queda para el próximo refresh")
+            return None
+        if page_data is not None and self.async_revisions:
+            self.fetch_page_revisions(page_data)
+        return page_data
+    
+    def apply_refresh(self, pages):
+        """Reemplazar en la salida las filas de las páginas re-crawleadas y ajustar los contadores"""
+        if not pages:
+            return 0
+        for page in pages:
+            self.prepare_page(page)
+        rows = {page['url']: self.page_to_output_row(page) for page in pages}
+        sink = self.get_output_sink()
+        with self.metrics.stage('write'):
+            previous = sink.replace_rows(rows)
+            for page in pages:
+                if page['url'] not in previous:
+                    sink.write(rows[page['url']])  # Antes se había descartado (p. ej. esbozo): ahora entra
+        for page in pages:
+            # Se descuenta y se suma lo mismo: lo que queda en la fila (con los límites del CSV)
+            if page['url'] in previous:
+                self.update_stats(self.row_stats_page(previous[page['url']]), sign=-1)
+            self.update_stats(self.row_stats_page(rows[page['url']]))
+            self.transport.validators.commit(page['url'])
+            self.frontier.set_revision(page['url'], page['revision'].get('lastrevid'), page['revision'].get('touched'))
+        self.metrics.inc('pages_refreshed', len(pages))
+        return len(pages)
+    
+    def row_stats_page(self, row):
+        """
+        Lo que cuentan los contadores de una fila de salida: sus unigramas y enlaces tal como
+        se guardaron (en CSV con límites de tamaño), igual que al releerla con page_from_row
+        """
+        return {'unigramas': self.parse_ngram_field(row.get('unigramas')),
+                'links': self.parse_links_field(row.get('links'))}
+    
+    def update_stats(self, page_data, sign=1):
+        """Actualizar los contadores acumulados con una página guardada (sign=-1 la descuenta)"""
+        links_count = len(page_data.get('links', []))
+        self.stats['pages'] += sign
+        self.stats['words'] += sign * self.ngram_total(page_data.get('unigramas', []))
+        self.stats['links'] += sign * links_count
+        if links_count > 0:
+            self.stats['pages_with_links'] += sign
+    
+    def get_output_sink(self):
+        """Sink de salida segmentado (al abrirlo se descarta lo que no llegó a confirmarse)"""
+        if self.output_sink is None and self.output_format == 'parquet':
+            self.output_sink = ParquetSink(
+                os.path.join(self.data_dir, "wikipedia_crawl_data_parquet"),
+                parquet_schema(self.ngram_format, self.token_ids),
+                row_group_pages=self.parquet_row_group_pages,
+                pages_per_file=self.parquet_pages_per_file,
+                max_rss_mb=self.max_rss_mb,
+                on_flush=self.checkpoint_frontier,
+                before_flush=self.save_vocabulary
+            )
+        elif self.output_sink is None:
+            self.output_sink = StreamingCsvSink(
+                os.path.join(self.data_dir, "wikipedia_crawl_data.csv"),
+                flush_every_pages=self.flush_every_pages,
+                max_rss_mb=self.max_rss_mb,
+                on_flush=self.checkpoint_frontier,  # La frontera avanza junto con el CSV
+                max_segment_mb=self.max_segment_mb,
+                before_flush=self.save_vocabulary  # Los IDs que usan las filas llegan antes al disco
+            )
+        if self.output_bytes_start is None:
+            self.output_bytes_start = self.output_sink.bytes_written  # Lo escrito por ejecuciones anteriores
+        return self.output_sink
+    
+    def get_vocabulary(self):
+        """Vocabulario token -> ID de data_dir (solo con token_ids)"""
+        if self.vocabulary is None and self.token_ids:
+            self.vocabulary = Vocabulary(os.path.join(self.data_dir, "vocabulary.txt"))
+        return self.vocabulary
+    
+    def save_vocabulary(self):
+        if self.vocabulary is not None:
+            self.vocabulary.save()
+    
+    def bytes_per_request(self):
+        """Bytes de salida confirmados por request HTTP de esta ejecución (incluye la API de revisiones)"""
+        requests_made = self.metrics.counters['requests']
+        written = self.get_output_sink().bytes_written - self.output_bytes_start
+        return written / requests_made if requests_made else 0.0
+    
+    def output_size_mb(self):
+        """Tamaño confirmado de la salida (todos los segmentos) en MB"""
+        return self.get_output_sink().bytes_written / (1024 * 1024)
+    
+    def prepare_page(self, page_data):
+        """Dejar una página terminada lista para su fila de salida (nueva o re-crawleada en refresh)"""
+        page_data.pop('simhash', None)  # Solo la usa is_near_duplicate, no va a la salida
+        page_data.pop('new_links', None)  # Solo los usa enqueue_links
+        self.archive_page_metadata(page_data)
+        if self.token_ids:
+            # En memoria y en la salida, los n-gramas pasan a ser arrays de IDs
+            with self.metrics.stage('encode'):
+                self.get_vocabulary().encode_page(page_data)
+    
+    def store_page(self, page_data):
+        """Guardar una página completa y guardar progreso periódicamente"""
+        self.prepare_page(page_data)
+        # Serializar ahora (solo se agrega al final del segmento, nunca se relee el CSV)
+        row = self.page_to_output_row(page_data)
+        # Contadores de la fila guardada: los mismos que al reanudar desde la salida o en refresh
+        self.update_stats(self.row_stats_page(row))
+        self.transport.validators.commit(page_data['url'])
+        if self.frontier is not None:
+            self.frontier.mark_done(page_data['url'], page_data.get('revision'))
+        
+        with self.metrics.stage('write'):
+            self.get_output_sink().write(row)
+        self.metrics.inc('pages')
+        self.metrics.maybe_export()
+        if not self.stream_output:
+            self.crawled_data.append(page_data)
+        
+        # Guardar estado cada 20 páginas para continuación
+        if self.stats['pages'] % 20 == 0:
+            self.save_state()
+    
+    def ngram_entries(self, ngrams, limit):
+        """Entradas a guardar de un campo de n-gramas: la lista tal cual o 'ngrama:frecuencia' (más frecuentes)"""
+        if isinstance(ngrams, dict):
+            top = heapq.nlargest(limit, ngrams.items(), key=itemgetter(1))
+            return [f"{gram_text(gram)}:{count}" for gram, count in top]
+        if isinstance(ngrams, list):
+            return ngrams[:limit]
+        # IDs del vocabulario (token_ids): '12' o '12 845' como los n-gramas de texto
+        return [gram_text(gram) for gram in ngrams[:limit]]
+    
+    def parse_ngram_field(self, value):
+        """Leer un campo de n-gramas del CSV en cualquiera de los dos formatos (o ya nativo, de Parquet)"""
+        if isinstance(value, list):
+            # Parquet: lista de n-gramas o pares (n-grama, frecuencia) de un mapa (con token_ids,
+            # la clave de un bigrama o trigrama es una lista de IDs)
+            if value and isinstance(value[0], tuple):
+                return Counter({tuple(gram) if isinstance(gram, list) else gram: count for gram, count in value})
+            return value
+        entries = value.split('|') if isinstance(value, str) and value else []
+        # Los tokens nunca tienen ':' (solo letras), así que ':' identifica el formato de frecuencias
+        if entries and ':' in entries[0]:
+            counts = Counter()
+            for entry in entries:
+                gram, _, count = entry.rpartition(':')
+                if gram and count.isdigit():
+                    counts[gram] += int(count)
+            return counts
+        return entries
+    
+    def ngram_total(self, ngrams):
+        """Cantidad de apariciones en un campo de n-gramas (lista o mapa de frecuencias)"""
+        return sum(ngrams.values()) if isinstance(ngrams, dict) else len(ngrams)
     
     def safe_string(self, text, max_length=None):
         """Limpiar string para que sea seguro para CSV"""
@@ -406,199 +1428,120 @@ class WikipediaCrawler:
         
         return text
 
-    def save_progress_csv(self):
-        """Guardar progreso intermedio en CSV y mostrar tamaño"""
-        filename = os.path.join(self.data_dir, "wikipedia_crawl_data.csv")
-        
-        if not self.crawled_data:
-            return
-        
-        # Preparar datos para CSV con limpieza robusta
-        csv_data = []
-        for i, page in enumerate(self.crawled_data):
-            try:
-                # Limpiar y validar cada campo
-                titulo = self.safe_string(page.get('titulo', ''), 500)
-                url = self.safe_string(page.get('url', ''), 500)
-                
-                # Procesar n-gramas de forma segura
-                unigramas = []
-                for unigrama in page.get('unigramas', [])[:1500]:
-                    clean_unigrama = self.safe_string(unigrama, 100)
-                    if clean_unigrama:
-                        unigramas.append(clean_unigrama)
-                
-                bigramas = []
-                for bigrama in page.get('bigramas', [])[:1000]:
-                    clean_bigrama = self.safe_string(bigrama, 150)
-                    if clean_bigrama:
-                        bigramas.append(clean_bigrama)
-                
-                trigramas = []
-                for trigrama in page.get('trigramas', [])[:800]:
-                    clean_trigrama = self.safe_string(trigrama, 200)
-                    if clean_trigrama:
-                        trigramas.append(clean_trigrama)
-                
-                # Procesar enlaces de forma segura
-                links = []
-                for link in page.get('links', [])[:100]:  # Limitar enlaces para evitar filas muy grandes
-                    clean_link = self.safe_string(link, 500)
-                    if clean_link and clean_link.startswith('http'):
-                        links.append(clean_link)
-                
-                # Procesar ediciones de forma segura
-                ediciones_dict = page.get('ediciones', {})
-                ediciones_str = ""
-                try:
-                    if isinstance(ediciones_dict, dict) and ediciones_dict:
-                        # Limitar las ediciones para evitar campos muy grandes
-                        limited_ediciones = dict(list(ediciones_dict.items())[:50])
-                        ediciones_str = json.dumps(limited_ediciones, ensure_ascii=False)[:1000]
-                    else:
-                        ediciones_str = "{}"
-                except:
-                    ediciones_str = "{}"
-                
-                row = {
-                    'titulo': titulo,
-                    'url': url,
-                    'unigramas': '|'.join(unigramas),
-                    'bigramas': '|'.join(bigramas),
-                    'trigramas': '|'.join(trigramas),
-                    'links': '|'.join(links),
-                    'ediciones': ediciones_str,
-                    'timestamp': self.safe_string(page.get('timestamp', ''), 50)
-                }
-                csv_data.append(row)
-                
-            except Exception as e:
-                logger.warning(f"Error procesando página {i}: {e}")
-                continue
-        
-        if not csv_data:
-            logger.warning("No hay datos válidos para guardar")
-            return
-        
-        # Intentar guardar CSV con múltiples estrategias
-        max_retries = 3
-        for attempt in range(max_retries):
-            try:
-                df = pd.DataFrame(csv_data)
-                
-                # Estrategia 1: Guardar normal
-                if attempt == 0:
-                    df.to_csv(filename, index=False, encoding='utf-8')
-                # Estrategia 2: Cambiar encoding
-                elif attempt == 1:
-                    df.to_csv(filename, index=False, encoding='utf-8-sig')
-                # Estrategia 3: Usar archivo temporal y renombrar
-                else:
-                    temp_filename = filename + '.tmp'
-                    df.to_csv(temp_filename, index=False, encoding='utf-8')
-                    if os.path.exists(filename):
-                        os.remove(filename)
-                    os.rename(temp_filename, filename)
-                
-                break  # Si llegamos aquí, fue exitoso
-                
-            except Exception as e:
-                logger.warning(f"Intento {attempt + 1} fallido: {e}")
-                if attempt == max_retries - 1:
-                    # Último intento: guardar como backup con timestamp
-                    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-                    backup_filename = os.path.join(self.data_dir, f"wikipedia_crawl_backup_{timestamp}.csv")
-                    try:
-                        df.to_csv(backup_filename, index=False, encoding='utf-8')
-                        filename = backup_filename
-                        logger.info(f"Guardado como archivo de respaldo: {backup_filename}")
-                    except Exception as backup_error:
-                        logger.error(f"Error crítico guardando CSV: {backup_error}")
-                        return
-                else:
-                    time.sleep(1)  # Esperar antes del siguiente intento
-          # Mostrar tamaño actual y estimación
-        file_size_mb = os.path.getsize(filename) / (1024*1024)
-        file_size_gb = file_size_mb / 1024
-        
-        # Calcular estimación para 1GB
-        target_gb = 1.0
-        if file_size_gb > 0:
-            pages_needed = int((target_gb / file_size_gb) * len(self.crawled_data))
-            pages_remaining = pages_needed - len(self.crawled_data)
-            progress_percent = (file_size_gb / target_gb) * 100
-            
-            logger.info(f"CSV guardado: {file_size_mb:.2f} MB ({file_size_gb:.3f} GB) - {len(self.crawled_data)} páginas")
-            logger.info(f"Progreso hacia 1GB: {progress_percent:.2f}% - Faltan aprox. {pages_remaining} páginas")
+    def page_to_output_row(self, page):
+        """Fila de salida de una página según output_format"""
+        if self.output_format == 'parquet':
+            return self.page_to_parquet_row(page)
+        return self.page_to_csv_row(page)
+    
+    def page_to_parquet_row(self, page):
+        """Fila para Parquet: listas y mapas nativos, sin los límites de tamaño del CSV"""
+        def ngram_column(ngrams):
+            return list(ngrams.items()) if isinstance(ngrams, dict) else list(ngrams)
+        
+        ediciones = page.get('ediciones', {})
+        if ediciones is None:
+            ediciones_column = None  # Historial incompleto (ver fetch_page_revisions)
         else:
-            logger.info(f"CSV guardado: {file_size_mb:.2f} MB ({file_size_gb:.3f} GB) - {len(self.crawled_data)} páginas")
+            ediciones_column = list(ediciones.items()) if isinstance(ediciones, dict) else []
+        return {
+            'titulo': page.get('titulo', ''),
+            'url': page.get('url', ''),
+            'unigramas': ngram_column(page.get('unigramas', [])),
+            'bigramas': ngram_column(page.get('bigramas', [])),
+            'trigramas': ngram_column(page.get('trigramas', [])),
+            'links': list(page.get('links', [])),
+            'ediciones': ediciones_column,
+            'timestamp': page.get('timestamp', '')
+        }
+    
+    def page_to_csv_row(self, page):
+        """Convertir una página en una fila de CSV limpia (mismos límites en todos los escritores)"""
+        # Limpiar y validar cada campo
+        titulo = self.safe_string(page.get('titulo', ''), 500)
+        url = self.safe_string(page.get('url', ''), 500)
+        
+        # Procesar n-gramas de forma segura
+        unigramas = []
+        for unigrama in self.ngram_entries(page.get('unigramas', []), 1500):
+            clean_unigrama = self.safe_string(unigrama, 100)
+            if clean_unigrama:
+                unigramas.append(clean_unigrama)
+        
+        bigramas = []
+        for bigrama in self.ngram_entries(page.get('bigramas', []), 1000):
+            clean_bigrama = self.safe_string(bigrama, 150)
+            if clean_bigrama:
+                bigramas.append(clean_bigrama)
+        
+        trigramas = []
+        for trigrama in self.ngram_entries(page.get('trigramas', []), 800):
+            clean_trigrama = self.safe_string(trigrama, 200)
+            if clean_trigrama:
+                trigramas.append(clean_trigrama)
+        
+        # Procesar enlaces de forma segura
+        links = []
+        for link in page.get('links', [])[:100]:
+            clean_link = self.safe_string(link, 500)
+            if clean_link and clean_link.startswith('http'):
+                links.append(clean_link)
+        
+        # Procesar ediciones de forma segura
+        ediciones_dict = page.get('ediciones', {})
+        ediciones_str = ""  # Vacío: historial incompleto (ver fetch_page_revisions)
+        try:
+            if ediciones_dict is None:
+                pass
+            elif isinstance(ediciones_dict, dict) and ediciones_dict:
+                limited_ediciones = dict(list(ediciones_dict.items())[:50])
+                ediciones_str = json.dumps(limited_ediciones, ensure_ascii=False)[:1000]
+            else:
+                ediciones_str = "{}"
+        except:
+            ediciones_str = "{}"
+        
+        row = {
+            'titulo': titulo,
+            'url': url,
+            'unigramas': '|'.join(unigramas),
+            'bigramas': '|'.join(bigramas),
+            'trigramas': '|'.join(trigramas),
+            'links': '|'.join(links),
+            'ediciones': ediciones_str,
+            'timestamp': self.safe_string(page.get('timestamp', ''), 50)
+        }
+        return row
     
     def save_to_csv(self, filename=None):
         """Guardar datos en formato CSV"""
+        if filename is None:
+            # Las filas ya se escribieron al terminar cada página: solo confirmar lo pendiente
+            if self.output_sink is None:
+                logger.warning("No hay datos para guardar")
+                return
+            self.output_sink.close()
+            if self.archive is not None:
+                self.archive.close()
+                self.archive = None
+            self.checkpoint_frontier(force=True)
+            self.close_near_duplicates()  # Al cerrar, checkpoint completo para reanudar rápido
+            self.metrics.export()
+            logger.info(f"Datos guardados en {len(self.output_sink.segments)} segmento(s): {self.output_sink.path}")
+            logger.info(f"Total de páginas en el archivo: {self.output_sink.rows_written}")
+            logger.info(f"Tamaño del archivo: {self.output_size_mb():.2f} MB")
+            return
+        
+        # Exportar las páginas en memoria a un único archivo (requiere stream_output=False)
         if not self.crawled_data:
             logger.warning("No hay datos para guardar")
             return
         
-        if filename is None:
-            filename = os.path.join(self.data_dir, "wikipedia_crawl_data.csv")
-        
         # Preparar datos para CSV con limpieza robusta
         csv_data = []
         for i, page in enumerate(self.crawled_data):
             try:
-                # Limpiar y validar cada campo
-                titulo = self.safe_string(page.get('titulo', ''), 500)
-                url = self.safe_string(page.get('url', ''), 500)
-                
-                # Procesar n-gramas de forma segura
-                unigramas = []
-                for unigrama in page.get('unigramas', [])[:1500]:
-                    clean_unigrama = self.safe_string(unigrama, 100)
-                    if clean_unigrama:
-                        unigramas.append(clean_unigrama)
-                
-                bigramas = []
-                for bigrama in page.get('bigramas', [])[:1000]:
-                    clean_bigrama = self.safe_string(bigrama, 150)
-                    if clean_bigrama:
-                        bigramas.append(clean_bigrama)
-                
-                trigramas = []
-                for trigrama in page.get('trigramas', [])[:800]:
-                    clean_trigrama = self.safe_string(trigrama, 200)
-                    if clean_trigrama:
-                        trigramas.append(clean_trigrama)
-                
-                # Procesar enlaces de forma segura
-                links = []
-                for link in page.get('links', [])[:100]:
-                    clean_link = self.safe_string(link, 500)
-                    if clean_link and clean_link.startswith('http'):
-                        links.append(clean_link)
-                
-                # Procesar ediciones de forma segura
-                ediciones_dict = page.get('ediciones', {})
-                ediciones_str = ""
-                try:
-                    if isinstance(ediciones_dict, dict) and ediciones_dict:
-                        limited_ediciones = dict(list(ediciones_dict.items())[:50])
-                        ediciones_str = json.dumps(limited_ediciones, ensure_ascii=False)[:1000]
-                    else:
-                        ediciones_str = "{}"
-                except:
-                    ediciones_str = "{}"
-                
-                row = {
-                    'titulo': titulo,
-                    'url': url,
-                    'unigramas': '|'.join(unigramas),
-                    'bigramas': '|'.join(bigramas),
-                    'trigramas': '|'.join(trigramas),
-                    'links': '|'.join(links),
-                    'ediciones': ediciones_str,
-                    'timestamp': self.safe_string(page.get('timestamp', ''), 50)
-                }
-                csv_data.append(row)
+                csv_data.append(self.page_to_csv_row(page))
                 
             except Exception as e:
                 logger.warning(f"Error procesando página {i} para CSV final: {e}")
@@ -651,29 +1594,47 @@ class WikipediaCrawler:
         except Exception as e:
             logger.warning(f"Error calculando tamaño del archivo: {e}")
     
+    def close_near_duplicates(self):
+        if self.near_duplicate_index is not None:
+            self.near_duplicate_index.close()
+        if self.near_duplicate_log is not None:
+            self.near_duplicate_log.close()
+            self.near_duplicate_log = None
+    
     def save_to_json(self, filename=None):
         """Guardar datos completos en formato JSON"""
+        if not self.crawled_data:
+            logger.warning("No hay páginas en memoria para el JSON (con stream_output=True solo se escribe el CSV)")
+            return
+        
         if filename is None:
             filename = os.path.join(self.data_dir, "wikipedia_crawl_data.json")
         
+        pages = self.crawled_data
+        if self.token_ids:
+            # Los mapas de frecuencias con tuplas de IDs como clave pasan a claves '12 845'
+            pages = [{key: {gram_text(gram): count for gram, count in value.items()}
+                      if key in ('unigramas', 'bigramas', 'trigramas') and isinstance(value, dict) else value
+                      for key, value in page.items()} for page in pages]
         with open(filename, 'w', encoding='utf-8') as f:
-            json.dump(self.crawled_data, f, ensure_ascii=False, indent=2)
+            json.dump(pages, f, ensure_ascii=False, indent=2, default=list)
         
         logger.info(f"Datos completos guardados en {filename}")
         logger.info(f"Tamaño del archivo: {os.path.getsize(filename) / (1024*1024):.2f} MB")
     
     def print_statistics(self):
         """Mostrar estadísticas del crawling"""
-        if not self.crawled_data:
+        if not self.stats['pages']:
             logger.info("No hay datos para mostrar estadísticas")
             return
         
-        total_pages = len(self.crawled_data)
-        total_words = sum(len(page['unigramas']) for page in self.crawled_data)
-        total_links = sum(len(page['links']) for page in self.crawled_data)
+        # Contadores acumulados en store_page/load_state: no hace falta tener las páginas en memoria
+        total_pages = self.stats['pages']
+        total_words = self.stats['words']
+        total_links = self.stats['links']
         
         # Debug: Mostrar información detallada sobre enlaces
-        pages_with_links = sum(1 for page in self.crawled_data if len(page.get('links', [])) > 0)
+        pages_with_links = self.stats['pages_with_links']
         if total_pages > 0:
             avg_links_per_page = total_links / total_pages
         else:
@@ -686,6 +1647,26 @@ class WikipediaCrawler:
         logger.info(f"Páginas con enlaces: {pages_with_links}/{total_pages}")
         logger.info(f"Promedio de palabras por página: {total_words/total_pages:.2f}")
         logger.info(f"Promedio de enlaces por página: {avg_links_per_page:.2f}")
+        requests_made = self.metrics.counters['requests']
+        if requests_made:
+            logger.info(f"Rendimiento: {self.bytes_per_request() / 1024:.1f} KB de salida por request "
+                        f"({self.stats['pages']}/{requests_made} páginas por request, política '{self.frontier_policy}')")
+        near_duplicates = self.metrics.counters['near_duplicates']
+        if self.near_duplicates is not None:
+            action = 'descartadas' if self.near_duplicates == 'skip' else 'marcadas'
+            logger.info(f"Casi duplicados: {near_duplicates} páginas {action} "
+                        f"({self.metrics.counters['near_duplicate_bytes'] / 1024:.1f} KB de salida)")
+        revisions_incomplete = self.metrics.counters['revisions_incomplete']
+        if revisions_incomplete:
+            logger.warning(f"Historial de ediciones incompleto en {revisions_incomplete} páginas "
+                           f"(columna ediciones vacía; se vuelven a pedir con --refresh)")
+        
+        # Dónde se fue el tiempo (métricas de esta ejecución)
+        metrics_lines = self.metrics.summary_lines()
+        if metrics_lines:
+            logger.info("=== TIEMPO POR ETAPA ===")
+            for line in metrics_lines:
+                logger.info(line)
         
         # Si no hay enlaces, es un problema
         if total_links == 0:
@@ -699,77 +1680,48 @@ class WikipediaCrawler:
         """Guardar el estado actual del crawler para poder continuar después - versión optimizada"""
         state_file = os.path.join(self.data_dir, "crawler_state.json")
         
+        # Las filas en buffer se escriben antes de confirmar el estado (y los validadores HTTP);
+        # la frontera solo avanza si todo lo guardado ya está confirmado en la salida
+        if self.output_sink is not None:
+            self.output_sink.checkpoint()
+        if self.output_sink is None or self.output_sink.committed:
+            self.checkpoint_frontier()
+        
         # Estado mínimo para máximo rendimiento
         state = {
             'visited_urls_count': len(self.visited_urls),
-            'crawled_data_count': len(self.crawled_data),
+            'crawled_data_count': self.stats['pages'],
             'timestamp': datetime.now().strftime("%Y-%m-%d %H:%M:%S")
         }
         
-        # Guardar solo una muestra de URLs visitadas para verificación
-        if len(self.visited_urls) > 1000:
-            state['visited_urls_sample'] = list(self.visited_urls)[-1000:]  # Solo las últimas 1000
-        else:
-            state['visited_urls_sample'] = list(self.visited_urls)
-        
         try:
             with open(state_file, 'w', encoding='utf-8') as f:
                 json.dump(state, f, ensure_ascii=False, separators=(',', ':'))  # Formato compacto
         except:
             pass  # No interrumpir el crawling por problemas de estado
+        
+        self.transport.validators.save()
     
     def load_state(self):
         """Cargar el estado previo del crawler si existe"""
         state_file = os.path.join(self.data_dir, "crawler_state.json")
-        csv_file = os.path.join(self.data_dir, "wikipedia_crawl_data.csv")
+        frontier_file = os.path.join(self.data_dir, "frontier.sqlite")
+        checkpoint_file = os.path.join(self.data_dir, "crawler_checkpoint.bin")
         
-        if os.path.exists(csv_file):
+        # Con frontera persistente se reanuda desde su último commit, sin releer el CSV
+        if os.path.exists(frontier_file) and 'stats' in self.get_frontier().load_meta():
+            if os.path.exists(checkpoint_file):
+                try:
+                    return self.load_state_checkpoint(checkpoint_file)
+                except (ValueError, OSError) as e:
+                    logger.warning(f"Checkpoint inválido ({e}), reconstruyendo desde la frontera...")
+            return self.load_state_frontier()
+        
+        # Abrir el sink recupera el manifiesto (y trunca lo que no llegó a confirmarse)
+        if self.get_output_sink().rows_written:
             try:
-                # Solo necesitamos el CSV para continuar (es más confiable que el JSON)
-                # Cargar datos existentes del CSV
-                df = pd.read_csv(csv_file, encoding='utf-8')
-                logger.info(f"Cargando datos existentes: {len(df)} páginas del CSV")
-                
-                # Reconstruir visited_urls desde las URLs del CSV
-                self.visited_urls = set()
-                for _, row in df.iterrows():
-                    if pd.notna(row['url']) and row['url'].strip():
-                        self.visited_urls.add(row['url'])
-                  # Reconstruir crawled_data básico (sin n-gramas completos para ahorrar memoria)
-                for _, row in df.iterrows():
-                    # Procesar links de forma más segura
-                    links_str = row['links'] if pd.notna(row['links']) else ''
-                    links = []
-                    if links_str:
-                        # Dividir por | y limpiar cada link
-                        raw_links = links_str.split('|')
-                        for link in raw_links:
-                            link = link.strip()
-                            # Solo agregar links que se vean como URLs válidas
-                            if link.startswith('http') and '.' in link and ' ' not in link:
-                                links.append(link)
-                    
-                    page_data = {
-                        'titulo': row['titulo'],
-                        'url': row['url'],
-                        'unigramas': row['unigramas'].split('|') if pd.notna(row['unigramas']) else [],
-                        'bigramas': row['bigramas'].split('|') if pd.notna(row['bigramas']) else [],
-                        'trigramas': row['trigramas'].split('|') if pd.notna(row['trigramas']) else [],
-                        'links': links,  # Usar links procesados y limpios
-                        'ediciones': json.loads(row['ediciones']) if pd.notna(row['ediciones']) and row['ediciones'].strip() else {},
-                        'timestamp': row.get('timestamp', datetime.now().isoformat())
-                    }
-                    self.crawled_data.append(page_data)
-                
-                file_size_mb = os.path.getsize(csv_file) / (1024*1024)
-                logger.info(f"🔄 CONTINUANDO CRAWLING DESDE DONDE SE PAUSÓ")
-                logger.info(f"📊 Estado recuperado: {len(self.visited_urls)} URLs visitadas")
-                logger.info(f"📄 Páginas ya procesadas: {len(self.crawled_data)}")
-                logger.info(f"💾 Tamaño actual del CSV: {file_size_mb:.2f} MB")
-                
-                # Guardar el estado actualizado para futuras ejecuciones
-                self.save_state()
-                return True
+                # Solo necesitamos la salida para continuar (es más confiable que el JSON)
+                return self.load_state_from_output()
                 
             except Exception as e:
                 logger.warning(f"Error cargando estado previo: {e}")
@@ -779,13 +1731,139 @@ class WikipediaCrawler:
         logger.info("🆕 INICIANDO NUEVO CRAWLING")
         return False
     
+    def parse_links_field(self, value):
+        """Convertir la columna links (texto unido por | o lista de Parquet) en una lista de URLs válidas"""
+        if isinstance(value, list):
+            raw_links = value
+        elif pd.notna(value) and value:
+            # Dividir por | y limpiar cada link
+            raw_links = value.split('|')
+        else:
+            raw_links = []
+        
+        links = []
+        for link in raw_links:
+            link = link.strip()
+            # Solo agregar links que se vean como URLs válidas
+            if link.startswith('http') and '.' in link and ' ' not in link:
+                links.append(canonicalize_url(link))
+        return links
+    
+    def parse_ediciones_field(self, value):
+        """Leer la columna ediciones (JSON en el CSV o pares fecha/ediciones en Parquet; None si quedó incompleta)"""
+        if isinstance(value, list):
+            return dict(value)
+        try:
+            return json.loads(value) if pd.notna(value) and value.strip() else None
+        except (TypeError, ValueError):
+            return None
+    
+    def page_from_row(self, row):
+        """Reconstruir una página desde una fila guardada (solo con las columnas que traiga)"""
+        url = row.get('url') or ''
+        return {
+            'titulo': row.get('titulo') or '',
+            'url': canonicalize_url(url.strip()) if url.strip() else '',
+            'unigramas': self.parse_ngram_field(row.get('unigramas')),
+            'bigramas': self.parse_ngram_field(row.get('bigramas')),
+            'trigramas': self.parse_ngram_field(row.get('trigramas')),
+            'links': self.parse_links_field(row.get('links')),  # Usar links procesados y limpios
+            'ediciones': self.parse_ediciones_field(row.get('ediciones')),
+            'timestamp': row.get('timestamp') or datetime.now().isoformat()
+        }
+    
+    def iter_saved_rows(self, columns=None):
+        """Recorrer las filas confirmadas de la salida (CSV o Parquet) sin cargarla completa"""
+        return self.get_output_sink().iter_rows(columns)
+    
+    def load_state_from_output(self):
+        """
+        Reanudar releyendo la salida: reconstruir visited_urls, los contadores y las páginas
+        
+        En modo streaming las páginas no vuelven a memoria y solo se leen las columnas
+        necesarias; los enlaces pendientes se buscan después con get_pending_urls_from_crawled.
+        """
+        columns = ['url', 'unigramas', 'links'] if self.stream_output else None
+        self.visited_urls = self.new_visited_set()
+        saved_urls = []
+        for row in self.iter_saved_rows(columns):
+            page_data = self.page_from_row(row)
+            if page_data['url']:
+                saved_urls.append(page_data['url'])
+                self.visited_urls.add(page_data['url'])
+            self.update_stats(page_data)
+            if not self.stream_output:
+                self.crawled_data.append(page_data)
+        
+        self.page_count = self.stats['pages']
+        file_size_mb = self.output_size_mb()
+        logger.info(f"🔄 CONTINUANDO CRAWLING DESDE DONDE SE PAUSÓ")
+        logger.info(f"📊 Estado recuperado: {len(self.visited_urls)} URLs visitadas")
+        logger.info(f"📄 Páginas ya procesadas: {self.page_count}")
+        logger.info(f"💾 Tamaño actual de la salida: {file_size_mb:.2f} MB")
+        
+        # Guardar el estado actualizado para futuras ejecuciones
+        self.get_frontier().add_visited(saved_urls)
+        self.save_state()
+        return True
+    
+    def load_state_checkpoint(self, checkpoint_file):
+        """
+        Reanudar desde el checkpoint binario: el tiempo no depende del tamaño del corpus
+        
+        Las huellas de visitadas se cargan con una copia de memoria; de la frontera solo
+        se leen las URLs terminadas después del checkpoint (índice sobre done_seq).
+        """
+        start_time = time.time()
+        meta, visited_bytes = read_checkpoint(checkpoint_file)
+        self.visited_urls = VisitedSet.frombytes(visited_bytes)
+        recent_urls = 0
+        for url in self.frontier.visited_urls(since=meta['frontier_done_seq']):
+            self.visited_urls.add(url)
+            recent_urls += 1
+        
+        # Los contadores de la frontera son del último commit (igual o posterior al checkpoint)
+        self.stats.update(self.frontier.load_meta()['stats'])
+        self.page_count = self.stats['pages']
+        self.checkpoint_pages = self.page_count
+        
+        logger.info(f"🔄 CONTINUANDO CRAWLING DESDE DONDE SE PAUSÓ (checkpoint del {meta['timestamp']})")
+        logger.info(f"📊 Estado recuperado: {len(self.visited_urls)} URLs visitadas ({recent_urls} posteriores al checkpoint)")
+        logger.info(f"📄 Páginas ya procesadas: {self.page_count}")
+        logger.info(f"🧭 URLs pendientes en la frontera: {self.frontier.pending_count()}")
+        logger.info(f"⏱️ Estado cargado en {time.time() - start_time:.2f}s")
+        return True
+    
+    def load_state_frontier(self):
+        """Reanudar desde la frontera persistente: URLs visitadas y contadores del último commit"""
+        self.visited_urls = self.new_visited_set()
+        self.visited_urls.update(self.frontier.visited_urls())
+        self.stats.update(self.frontier.load_meta()['stats'])
+        self.page_count = self.stats['pages']
+        
+        logger.info(f"🔄 CONTINUANDO CRAWLING DESDE DONDE SE PAUSÓ")
+        logger.info(f"📊 Estado recuperado: {len(self.visited_urls)} URLs visitadas")
+        logger.info(f"📄 Páginas ya procesadas: {self.page_count}")
+        logger.info(f"🧭 URLs pendientes en la frontera: {self.frontier.pending_count()}")
+        return True
+    
+    def iter_crawled_pages(self):
+        """Páginas ya guardadas (titulo y links): de memoria o, en modo streaming, del CSV"""
+        if not self.stream_output:
+            yield from self.crawled_data
+            return
+        
+        self.get_output_sink().checkpoint()
+        for row in self.iter_saved_rows(columns=['titulo', 'links']):
+            yield {'titulo': row['titulo'], 'links': self.parse_links_field(row['links'])}
+    
     def get_pending_urls_from_crawled(self):
         """Extraer URLs pendientes de las páginas ya crawleadas para continuar"""
         pending_urls = []
         
-        logger.info(f"🔍 Analizando {len(self.crawled_data)} páginas para encontrar enlaces pendientes...")
+        logger.info(f"🔍 Analizando {self.page_count} páginas para encontrar enlaces pendientes...")
         
-        for i, page in enumerate(self.crawled_data):
+        for i, page in enumerate(self.iter_crawled_pages()):
             page_links = page.get('links', [])
             if i < 5:  # Debug: mostrar los primeros 5 páginas
                 logger.info(f"📄 Página {i+1} '{page.get('titulo', 'Sin título')}': {len(page_links)} enlaces")
@@ -819,86 +1897,184 @@ class WikipediaCrawler:
         
         return unique_pending[:100]  # Limitar para no sobrecargar
 
-    def save_progress_lightweight(self):
-        """Guardar progreso de forma rápida y ligera - solo agregar nuevas filas"""
-        filename = os.path.join(self.data_dir, "wikipedia_crawl_data.csv")
-        
-        if not self.crawled_data:
-            return
-          # Determinar si es la primera vez que guardamos
-        is_first_save = not os.path.exists(filename)
-        
-        if not self.crawled_data:
-            return
-        
-        # Si es continuación, solo guardar las páginas nuevas
-        if not is_first_save:
-            # Verificar cuántas páginas ya están en el archivo
-            try:
-                existing_df = pd.read_csv(filename, encoding='utf-8')
-                existing_count = len(existing_df)
-                # Solo guardar las páginas nuevas
-                pages_to_save = self.crawled_data[existing_count:]
-            except:
-                # Si hay error leyendo, guardar todas
-                pages_to_save = self.crawled_data
-        else:
-            pages_to_save = self.crawled_data
-        
-        # Preparar datos de forma más eficiente
-        csv_rows = []
-        for page in pages_to_save:
-            # Proceso más rápido sin validación excesiva
-            row = {
-                'titulo': str(page.get('titulo', ''))[:500].replace('\n', ' ').replace('\r', ' '),
-                'url': str(page.get('url', ''))[:500],
-                'unigramas': '|'.join(str(w) for w in page.get('unigramas', [])[:1500]),
-                'bigramas': '|'.join(str(w) for w in page.get('bigramas', [])[:1000]),
-                'trigramas': '|'.join(str(w) for w in page.get('trigramas', [])[:800]),
-                'links': '|'.join(str(link) for link in page.get('links', [])[:100]),
-                'ediciones': json.dumps(page.get('ediciones', {}))[:1000],
-                'timestamp': str(page.get('timestamp', ''))
-            }
-            csv_rows.append(row)
-        
-        try:            # Guardar de forma más eficiente
-            df = pd.DataFrame(csv_rows)
-            
-            if is_first_save:
-                # Primera vez: crear archivo completo
-                df.to_csv(filename, index=False, encoding='utf-8', mode='w')
-            else:
-                # Append mode para agregar solo las nuevas filas (MÁS RÁPIDO)
-                if len(pages_to_save) > 0:  # Solo si hay páginas nuevas
-                    df.to_csv(filename, index=False, encoding='utf-8', mode='a', header=False)
-              # Mostrar progreso rápido sin cálculos complejos
-            if len(self.crawled_data) % 100 == 0:  # Solo cada 100 páginas mostrar tamaño
-                try:
-                    file_size_mb = os.path.getsize(filename) / (1024*1024)
-                    file_size_gb = file_size_mb / 1024
-                    logger.info(f"💾 CSV: {file_size_mb:.1f} MB ({file_size_gb:.3f} GB) - {len(self.crawled_data)} páginas")
-                except:
-                    pass
-                    
-        except Exception as e:
-            logger.warning(f"Error en guardado ligero: {e}")
-            # Fallback al método robusto solo si falla
-            self.save_progress_csv()
+# URL raíz - solo UNA página de inicio
+START_URL = "https://es.wikipedia.org/wiki/Costa_Rica"
+MAX_PAGES = 40000  # Aumentar significativamente para alcanzar 1GB
+
+def parse_args():
+    """Argumentos de línea de comandos"""
+    parser = argparse.ArgumentParser(description="Crawler de Wikipedia en español")
+    parser.add_argument('--dump', help="Ingerir un dump XML local (.xml, .xml.bz2 o .xml.gz) en lugar de crawlear")
+    parser.add_argument('--limit', type=int, default=None, help="Máximo de artículos a ingerir desde el dump o los WARC")
+    parser.add_argument('--warc', action='store_true',
+                        help="Archivar las respuestas descargadas en data/warc (.warc.gz) para poder re-procesarlas")
+    parser.add_argument('--output-format', choices=('csv', 'parquet'), default='csv',
+                        help="Formato de la salida: segmentos CSV o archivos Parquet en data/wikipedia_crawl_data_parquet")
+    parser.add_argument('--near-duplicates', choices=('flag', 'skip'), default=None,
+                        help="Detectar páginas casi duplicadas (SimHash): anotarlas en data/near_duplicates.csv o no guardarlas")
+    parser.add_argument('--reprocess', action='store_true',
+                        help="Re-derivar el corpus desde los WARC archivados, sin red, en data/reprocessed")
+    parser.add_argument('--refresh', action='store_true',
+                        help="Re-crawlear solo las páginas guardadas cuya revisión cambió y actualizar sus filas")
+    parser.add_argument('--shards', type=int, default=1,
+                        help="Repartir el crawl en N workers por hash de URL (sin --shard: lanza los N procesos locales)")
+    parser.add_argument('--shard', type=int, default=None, help="Correr solo este worker (0..N-1), p. ej. en otra máquina")
+    parser.add_argument('--coordinator', default=None,
+                        help="SQLite del coordinador o 'host:puerto' de uno remoto (por defecto data/coordinator.sqlite)")
+    parser.add_argument('--serve-coordinator', metavar='HOST:PUERTO', default=None,
+                        help="Servir el coordinador por TCP para workers en otras máquinas. Requiere una clave secreta "
+                             "en WIKICRAWLER_COORDINATOR_KEY (la misma en cada worker remoto) y usar una interfaz "
+                             "de confianza: el protocolo usa pickle y quien tenga la clave puede ejecutar código")
+    return parser.parse_args()
+
+def create_crawler(**overrides):
+    """Crawler con la configuración de producción (los argumentos la reemplazan)"""
+    settings = dict(
+        max_depth=8,      # Aumentar profundidad para más exploración
+        max_pages=MAX_PAGES,
+        delay=0.2,        # Velocidad inicial; el limitador adaptativo la ajusta
+        concurrency=8,    # Requests simultáneos (modo asyncio)
+        fetch_mode='html',  # 'parse' o 'rest' piden solo el cuerpo del artículo a la API
+        frontier_policy='yield'  # Primero las páginas con más datos esperados: 1GB con menos requests
+    )
+    settings.update(overrides)
+    return WikipediaCrawler(**settings)
+
+def default_data_dir():
+    return os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data')
+
+def run_shard(shard_id, num_shards, coordinator_spec, archive_responses=False, near_duplicates=None,
+              output_format='csv'):
+    """
+    Worker de un crawl repartido: crawlea solo las URLs de su shard
+    
+    Cada shard tiene su propia carpeta (data/shard-NN) con frontera, checkpoint y
+    segmentos de salida, así que se reanuda igual que un crawl normal. El presupuesto
+    de páginas se reparte en partes iguales entre los shards.
+    """
+    crawler = create_crawler(
+        max_pages=-(-MAX_PAGES // num_shards),
+        data_dir=os.path.join(default_data_dir(), f"shard-{shard_id:02d}"),
+        archive_responses=archive_responses,
+        near_duplicates=near_duplicates,
+        output_format=output_format
+    )
+    crawler.connect_coordinator(coordinator_spec, shard_id, num_shards)
+    crawler.load_state()
+    try:
+        crawler.crawl([START_URL])
+    except KeyboardInterrupt:
+        logger.info(f"⏸️ Shard {shard_id} PAUSADO por el usuario")
+        crawler.flush_pending_pages()
+    crawler.close_progress_tracking()
+    crawler.print_statistics()
+    crawler.save_to_csv()
+    crawler.save_state()
+
+def run_sharded(num_shards, coordinator_spec, archive_responses=False, near_duplicates=None, output_format='csv'):
+    """Lanzar los N workers como procesos locales que comparten el coordinador SQLite"""
+    coordinator = open_coordinator(coordinator_spec, num_shards)
+    coordinator.reset_workers()
+    workers = [
+        multiprocessing.get_context('spawn').Process(
+            target=run_shard,
+            args=(shard_id, num_shards, coordinator_spec, archive_responses, near_duplicates, output_format),
+            name=f"crawler-shard-{shard_id}"
+        )
+        for shard_id in range(num_shards)
+    ]
+    for worker in workers:
+        worker.start()
+    try:
+        for worker in workers:
+            worker.join()
+    except KeyboardInterrupt:
+        # Cada worker recibe el Ctrl+C y guarda su progreso
+        for worker in workers:
+            worker.join()
+    summary = coordinator.summary()
+    logger.info(f"🧩 Crawl repartido: {summary['seen']} URLs vistas, {summary['handoff']} sin entregar")
+    for shard_id, (state, pages) in summary['workers'].items():
+        logger.info(f"   shard {shard_id}: {pages} páginas")
 
 def main():
     """Función principal para ejecutar el crawler"""
-    # URL raíz - solo UNA página de inicio
-    start_url = "https://es.wikipedia.org/wiki/Costa_Rica"
+    args = parse_args()
+    
+    if args.shards > 1 or args.serve_coordinator:
+        os.makedirs(default_data_dir(), exist_ok=True)
+        coordinator_spec = args.coordinator or os.path.join(default_data_dir(), "coordinator.sqlite")
+        if args.serve_coordinator or parse_address(coordinator_spec) is not None:
+            try:
+                coordinator_authkey()  # Sin clave no se sirve ni se usa un coordinador por TCP
+            except ValueError as e:
+                raise SystemExit(str(e))
+        if args.serve_coordinator:
+            address = parse_address(args.serve_coordinator)
+            if address is None:
+                raise SystemExit(f"Dirección inválida: {args.serve_coordinator} (se espera host:puerto)")
+            serve_coordinator(coordinator_spec, args.shards, address)
+        elif args.shard is not None:
+            run_shard(args.shard, args.shards, coordinator_spec, args.warc, args.near_duplicates, args.output_format)
+        else:
+            run_sharded(args.shards, coordinator_spec, args.warc, args.near_duplicates, args.output_format)
+        return
+    
+    if args.reprocess:
+        # Todo sale de los WARC (también los de cada shard), con todos los núcleos y sin red
+        warc_dirs = [path for path in [os.path.join(default_data_dir(), 'warc')] +
+                     sorted(glob.glob(os.path.join(default_data_dir(), 'shard-*', 'warc'))) if os.path.isdir(path)]
+        if not warc_dirs:
+            raise SystemExit("No hay respuestas archivadas: crawlear antes con --warc")
+        crawler = create_crawler(data_dir=os.path.join(default_data_dir(), 'reprocessed'), cpu_workers=os.cpu_count(),
+                                 output_format=args.output_format)
+        crawler.load_state()
+        try:
+            crawler.reprocess(warc_dirs, limit=args.limit)
+        except KeyboardInterrupt:
+            logger.info("⏸️ Re-proceso PAUSADO por el usuario")
+        crawler.close_progress_tracking()
+        crawler.print_statistics()
+        crawler.save_to_csv()
+        crawler.save_state()
+        return
+    
+    start_url = START_URL
     
     # Crear crawler
-    crawler = WikipediaCrawler(
-        max_depth=8,      # Aumentar profundidad para más exploración
-        max_pages=40000,  # Aumentar significativamente para alcanzar 1GB
-        delay=0.2         # Acelerar aún más
-    )
+    crawler = create_crawler(archive_responses=args.warc, near_duplicates=args.near_duplicates,
+                             output_format=args.output_format)
     
     logger.info("=== WIKIPEDIA CRAWLER CON CONTINUACIÓN ===")
-    logger.info(f"Configuración: max_depth={crawler.max_depth}, max_pages={crawler.max_pages}")
+    logger.info(f"Configuración: max_depth={crawler.max_depth}, max_pages={crawler.max_pages}, concurrency={crawler.concurrency}")
+    
+    if args.dump:
+        # Modo offline: todo el corpus sale del dump, sin requests a Wikipedia
+        crawler.load_state()
+        try:
+            crawler.ingest_dump(args.dump, limit=args.limit)
+        except KeyboardInterrupt:
+            logger.info("⏸️ Ingesta PAUSADA por el usuario")
+        crawler.close_progress_tracking()
+        crawler.print_statistics()
+        crawler.save_to_csv()
+        crawler.save_state()
+        return
+    
+    if args.refresh:
+        # Refresh incremental: solo las páginas editadas desde el último crawl
+        if not crawler.load_state():
+            logger.info("No hay un crawl previo para refrescar")
+            return
+        try:
+            refreshed = crawler.refresh()
+            logger.info(f"✅ Refresh completado: {refreshed} páginas actualizadas")
+        except KeyboardInterrupt:
+            logger.info("⏸️ Refresh PAUSADO por el usuario")
+            crawler.save_to_csv()
+        crawler.print_statistics()
+        crawler.save_state()
+        return
     
     try:
         # Mostrar banner inicial con colores
@@ -908,25 +2084,24 @@ def main():
         
         # Intentar cargar estado previo
         if crawler.load_state():
-            # Si se cargó estado, obtener URLs pendientes
-            pending_urls = crawler.get_pending_urls_from_crawled()
+            # Si se cargó estado, seguir con la frontera persistente o, si no la hay, con los enlaces del CSV
+            pending_urls = [] if crawler.frontier_pending() else crawler.get_pending_urls_from_crawled()
             
-            if pending_urls:
+            if pending_urls or crawler.frontier_pending():
                 logger.info("🚀 Reanudando crawling con URLs pendientes")
                 # Mostrar estado de continuación
-                csv_file = os.path.join(crawler.data_dir, "wikipedia_crawl_data.csv")
-                if os.path.exists(csv_file):
-                    current_size_mb = os.path.getsize(csv_file) / (1024 * 1024)
+                current_size_mb = crawler.output_size_mb()
+                if current_size_mb > 0:
                     current_size_gb = current_size_mb / 1024
                     progress_percent = min((current_size_gb / crawler.target_size_gb) * 100, 100)
                     
                     print(f"{Back.GREEN}{Fore.WHITE} CONTINUANDO DESDE DONDE SE PAUSÓ {Style.RESET_ALL}")
                     print(f"📊 Progreso actual: {Fore.YELLOW}{progress_percent:.1f}%{Style.RESET_ALL} hacia 1GB")
                     print(f"💾 Tamaño actual: {Fore.CYAN}{current_size_mb:.1f} MB{Style.RESET_ALL}")
-                    print(f"📄 Páginas ya procesadas: {Fore.GREEN}{len(crawler.crawled_data)}{Style.RESET_ALL}")
+                    print(f"📄 Páginas ya procesadas: {Fore.GREEN}{crawler.page_count}{Style.RESET_ALL}")
                     print(f"{'-' * 60}")
                 
-                crawler.crawl_recursive(pending_urls)
+                crawler.crawl(pending_urls)
             else:
                 logger.info("✅ No se encontraron URLs pendientes. El crawling parece estar completo.")
         else:
@@ -935,7 +2110,7 @@ def main():
             print(f"{Back.GREEN}{Fore.WHITE} INICIANDO NUEVO CRAWLING {Style.RESET_ALL}")
             print(f"🌱 URL raíz: {Fore.CYAN}{start_url}{Style.RESET_ALL}")
             print(f"{'-' * 60}")
-            crawler.crawl_recursive([start_url])
+            crawler.crawl([start_url])
         
         # Mostrar estadísticas
         crawler.print_statistics()
@@ -949,6 +2124,7 @@ def main():
     except KeyboardInterrupt:
         logger.info("⏸️ Crawling PAUSADO por el usuario")
         logger.info("💾 Guardando progreso...")
+        crawler.flush_pending_pages()
         
         # Cerrar tracking de progreso
         if hasattr(crawler, 'progress_bar') and crawler.progress_bar:
@@ -960,6 +2136,7 @@ def main():
         
     except Exception as e:
         logger.error(f"❌ Error durante el crawling: {e}")
+        crawler.flush_pending_pages()
         
         # Cerrar tracking de progreso
         if hasattr(crawler, 'progress_bar') and crawler.progress_bar:
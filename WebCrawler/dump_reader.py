@@ -0,0 +1,147 @@
+import bz2
+import gzip
+import html
+import re
+import xml.etree.ElementTree as ET
+from urllib.parse import quote
+
+# Plantillas y tablas pueden anidarse: se eliminan de adentro hacia afuera
+TEMPLATE_RE = re.compile(r'\{\{[^{}]*\}\}')
+TABLE_RE = re.compile(r'\{\|(?:(?!\{\|)[\s\S])*?\|\}')
+COMMENT_RE = re.compile(r'<!--[\s\S]*?-->')
+REF_RE = re.compile(r'<ref[^>/]*/>|<ref[^>]*>[\s\S]*?</ref>', re.IGNORECASE)
+NOWIKI_BLOCK_RE = re.compile(r'<(math|score|gallery|timeline|syntaxhighlight|source)[^>]*>[\s\S]*?</\1>', re.IGNORECASE)
+TAG_RE = re.compile(r'</?[a-zA-Z][^>]*>')
+WIKILINK_RE = re.compile(r'\[\[([^\[\]|]*)(?:\|([^\[\]]*))?\]\]')
+EXTERNAL_LINK_RE = re.compile(r'\[(?:https?:)?//[^\s\]]+(?:\s([^\]]*))?\]')
+FORMATTING_RE = re.compile(r"'{2,}|^[=*#:;]+|=+\s*$", re.MULTILINE)
+MAGIC_WORD_RE = re.compile(r'__[A-Z]+__')
+
+# Caracteres que MediaWiki deja sin codificar en los href (wfUrlencode)
+URL_SAFE_CHARS = ";@$!*(),/~:"
+
+
+def local_name(tag):
+    """Quitar el namespace XML de una etiqueta ({http://...}page -> page)"""
+    return tag.rsplit('}', 1)[-1]
+
+
+def open_dump(path):
+    """Abrir un dump en modo binario y streaming, descomprimiendo .bz2/.gz sobre la marcha"""
+    if path.endswith('.bz2'):
+        return bz2.open(path, 'rb')
+    if path.endswith('.gz'):
+        return gzip.open(path, 'rb')
+    return open(path, 'rb')
+
+
+def iter_dump_pages(path):
+    """
+    Recorrer un dump XML de MediaWiki (pages-articles) página por página
+
+    Usa iterparse y libera cada <page> al terminarla, así la memoria se mantiene
+    constante sin importar el tamaño del dump. Produce diccionarios con
+    ns, title, redirect, text y las fechas (timestamps) de las revisiones incluidas.
+    """
+    with open_dump(path) as f:
+        context = ET.iterparse(f, events=('start', 'end'))
+        root = None
+        page = None
+
+        for event, elem in context:
+            name = local_name(elem.tag)
+
+            if event == 'start':
+                if root is None:
+                    root = elem
+                elif name == 'page':
+                    page = {'ns': 0, 'title': '', 'redirect': False, 'text': '', 'timestamps': []}
+                continue
+
+            if page is None:
+                continue
+
+            if name == 'title':
+                page['title'] = elem.text or ''
+            elif name == 'ns':
+                page['ns'] = int(elem.text or 0)
+            elif name == 'redirect':
+                page['redirect'] = True
+            elif name == 'timestamp':
+                page['timestamps'].append(elem.text or '')
+            elif name == 'text':
+                # Con varias revisiones (dumps de historial) nos quedamos con la última
+                page['text'] = elem.text or ''
+            elif name == 'page':
+                yield page
+                page = None
+                # Liberar los elementos ya procesados
+                root.clear()
+
+
+def wikitext_to_text(wikitext):
+    """Convertir wikitexto en texto plano aproximado para la tokenización"""
+    if not wikitext:
+        return ""
+
+    text = COMMENT_RE.sub(' ', wikitext)
+    text = REF_RE.sub(' ', text)
+    text = NOWIKI_BLOCK_RE.sub(' ', text)
+
+    # Eliminar plantillas y tablas anidadas de adentro hacia afuera
+    for pattern in (TEMPLATE_RE, TABLE_RE):
+        previous = None
+        while previous != text:
+            previous = text
+            text = pattern.sub(' ', text)
+
+    def replace_link(match):
+        if ':' in match.group(1):
+            return ' '  # Archivo:, Categoría:, interwikis
+        return match.group(2) if match.group(2) is not None else match.group(1)
+
+    # Los archivos pueden tener enlaces en su pie: aplanar de adentro hacia afuera
+    previous = None
+    while previous != text:
+        previous = text
+        text = WIKILINK_RE.sub(replace_link, text)
+
+    text = EXTERNAL_LINK_RE.sub(lambda m: m.group(1) or ' ', text)
+    text = TAG_RE.sub(' ', text)
+    text = MAGIC_WORD_RE.sub(' ', text)
+    text = FORMATTING_RE.sub(' ', text)
+
+    return html.unescape(text)
+
+
+def normalize_title(title):
+    """Normalizar un título como MediaWiki: espacios, guiones bajos y primera letra en mayúscula"""
+    title = ' '.join(title.replace('_', ' ').split())
+    if title:
+        title = title[0].upper() + title[1:]
+    return title
+
+
+def title_to_url(base_url, title):
+    """Construir la URL /wiki/ de un título con el mismo formato que los enlaces del HTML"""
+    return f"{base_url}/wiki/{quote(normalize_title(title).replace(' ', '_'), safe=URL_SAFE_CHARS)}"
+
+
+def extract_wikilinks(wikitext, base_url, page_url=None):
+    """
+    Extraer los enlaces internos a artículos (sin espacios de nombres) como URLs únicas
+
+    Como en las filas del crawl, se descarta el enlace de la página a sí misma (`page_url`).
+    """
+    links = []
+    seen = {page_url}
+    for match in WIKILINK_RE.finditer(wikitext or ''):
+        target = match.group(1).split('#', 1)[0].strip()
+        # Igual que extract_links: sin Archivo:, Categoría:, interwikis ni anclas sueltas
+        if not target or ':' in target or '?' in target:
+            continue
+        url = title_to_url(base_url, target)
+        if url not in seen:
+            seen.add(url)
+            links.append(url)
+    return links
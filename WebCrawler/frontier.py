@@ -0,0 +1,186 @@
+import json
+import logging
+import sqlite3
+
+logger = logging.getLogger(__name__)
+
+# Estados de una URL en la frontera
+PENDING, IN_PROGRESS, DONE = 0, 1, 2
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS frontier (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    url TEXT NOT NULL UNIQUE,
+    depth INTEGER NOT NULL,
+    priority REAL NOT NULL DEFAULT 0,
+    state INTEGER NOT NULL DEFAULT 0,
+    done_seq INTEGER,
+    inlinks INTEGER NOT NULL DEFAULT 0,
+    parent_yield REAL NOT NULL DEFAULT 0,
+    lastrevid INTEGER,
+    touched TEXT
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+# Columnas agregadas después de la primera versión (las fronteras viejas se migran al abrir)
+ADDED_COLUMNS = {
+    'done_seq': 'INTEGER',
+    'inlinks': 'INTEGER NOT NULL DEFAULT 0',
+    'parent_yield': 'REAL NOT NULL DEFAULT 0',
+    'lastrevid': 'INTEGER',
+    'touched': 'TEXT',
+}
+
+INDEXES = """
+CREATE INDEX IF NOT EXISTS frontier_pending ON frontier (priority DESC, depth, id) WHERE state = 0;
+CREATE INDEX IF NOT EXISTS frontier_done ON frontier (done_seq) WHERE state = 2;
+"""
+
+
+class UrlFrontier:
+    """
+    Frontera de URLs persistente en SQLite
+
+    Cada URL se guarda una sola vez (la clave única deduplica al insertar) con su
+    profundidad, prioridad y estado. `pop()` entrega la pendiente de mayor prioridad
+    (a igual prioridad, la menos profunda y la más antigua: recorrido en anchura) usando
+    un índice parcial sobre las pendientes.
+
+    Los cambios se confirman con `commit()`, que el crawler llama justo después de
+    escribir las páginas en disco: así la frontera y el archivo de salida avanzan juntos.
+    Al abrir, las URLs que quedaron "en curso" por una interrupción vuelven a pendientes.
+
+    Cada URL terminada recibe un número de orden (`done_seq`), así un checkpoint puede
+    guardar hasta dónde llegó y al reanudar solo se leen las terminadas después.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+        columns = {row[1] for row in self.conn.execute("PRAGMA table_info(frontier)")}
+        for column, definition in ADDED_COLUMNS.items():
+            if column not in columns:
+                self.conn.execute(f"ALTER TABLE frontier ADD COLUMN {column} {definition}")
+        self.conn.executescript(INDEXES)
+        self.done_seq = self.conn.execute(
+            "SELECT COALESCE(MAX(done_seq), 0) FROM frontier WHERE state = ?", (DONE,)
+        ).fetchone()[0]
+
+        recovered = self.conn.execute(
+            "UPDATE frontier SET state = ? WHERE state = ?", (PENDING, IN_PROGRESS)
+        ).rowcount
+        self.conn.commit()
+        if recovered:
+            logger.info(f"🔁 {recovered} URLs en curso al interrumpirse vuelven a la frontera")
+
+    def push(self, url, depth, priority=0.0):
+        """Encolar una URL si nunca se vio; devuelve True si se agregó"""
+        cursor = self.conn.execute(
+            "INSERT OR IGNORE INTO frontier (url, depth, priority) VALUES (?, ?, ?)",
+            (url, depth, priority)
+        )
+        return cursor.rowcount > 0
+
+    def push_many(self, urls, depth, priority=0.0):
+        """Encolar varias URLs de la misma profundidad; devuelve cuántas eran nuevas"""
+        before = self.conn.total_changes
+        self.conn.executemany(
+            "INSERT OR IGNORE INTO frontier (url, depth, priority) VALUES (?, ?, ?)",
+            ((url, depth, priority) for url in urls)
+        )
+        return self.conn.total_changes - before
+
+    def push_scored(self, urls, depth, parent_yield, inlink_weight=1.0):
+        """
+        Encolar enlaces con prioridad según su rendimiento estimado
+
+        Cada aparición de una URL todavía pendiente suma un enlace entrante y la prioridad
+        se recalcula como el mejor `parent_yield` visto (tamaño de las páginas que la
+        enlazan) más `inlink_weight` por enlace entrante.
+        """
+        self.conn.executemany(
+            "INSERT INTO frontier (url, depth, priority, inlinks, parent_yield) VALUES (?, ?, ?, 1, ?) "
+            "ON CONFLICT(url) DO UPDATE SET "
+            "inlinks = inlinks + 1, "
+            "parent_yield = MAX(parent_yield, excluded.parent_yield), "
+            "priority = MAX(parent_yield, excluded.parent_yield) + ? * (inlinks + 1) "
+            "WHERE state = 0",
+            ((url, depth, parent_yield + inlink_weight, parent_yield, inlink_weight) for url in urls)
+        )
+
+    def pop(self):
+        """Sacar la siguiente URL pendiente como (url, profundidad), o None si no hay"""
+        row = self.conn.execute(
+            "SELECT id, url, depth FROM frontier WHERE state = ? "
+            "ORDER BY priority DESC, depth, id LIMIT 1",
+            (PENDING,)
+        ).fetchone()
+        if row is None:
+            return None
+        self.conn.execute("UPDATE frontier SET state = ? WHERE id = ?", (IN_PROGRESS, row[0]))
+        return row[1], row[2]
+
+    def mark_done(self, url, revision=None):
+        """Marcar una URL como terminada; `revision` ({'lastrevid', 'touched'}) es la versión guardada"""
+        self.done_seq += 1
+        self.conn.execute("UPDATE frontier SET state = ?, done_seq = ? WHERE url = ?", (DONE, self.done_seq, url))
+        if revision and revision.get('lastrevid'):
+            self.set_revision(url, revision['lastrevid'], revision.get('touched'))
+
+    def set_revision(self, url, lastrevid, touched=None):
+        self.conn.execute("UPDATE frontier SET lastrevid = ?, touched = ? WHERE url = ?", (lastrevid, touched, url))
+
+    def crawled_revisions(self):
+        """(url, lastrevid) de las URLs terminadas, para el modo refresh (lastrevid None si no se conoce)"""
+        return self.conn.execute("SELECT url, lastrevid FROM frontier WHERE state = ? ORDER BY id", (DONE,)).fetchall()
+
+    def requeue(self, url):
+        """Devolver una URL en curso a pendientes (p. ej. tras throttling)"""
+        self.conn.execute("UPDATE frontier SET state = ? WHERE url = ?", (PENDING, url))
+
+    def add_visited(self, urls, depth=0):
+        """Registrar URLs ya crawleadas (p. ej. recuperadas del CSV) para no volver a encolarlas"""
+        for url in urls:
+            self.done_seq += 1
+            self.conn.execute(
+                "INSERT INTO frontier (url, depth, state, done_seq) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(url) DO UPDATE SET state = excluded.state, done_seq = excluded.done_seq",
+                (url, depth, DONE, self.done_seq)
+            )
+
+    def visited_urls(self, since=0):
+        """URLs ya terminadas según el último commit (solo las posteriores a `since` en done_seq)"""
+        return (row[0] for row in self.conn.execute(
+            "SELECT url FROM frontier WHERE state = ? AND done_seq > ?", (DONE, since)
+        ))
+
+    def in_progress_urls(self):
+        """URLs sacadas con pop() que todavía no terminaron"""
+        return [row[0] for row in self.conn.execute("SELECT url FROM frontier WHERE state = ?", (IN_PROGRESS,))]
+
+    def pending_count(self):
+        return self.conn.execute("SELECT COUNT(*) FROM frontier WHERE state = ?", (PENDING,)).fetchone()[0]
+
+    def commit(self, meta=None):
+        """Confirmar los cambios de la frontera junto con metadatos del crawler (contadores, etc.)"""
+        if meta is not None:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)",
+                ((key, json.dumps(value)) for key, value in meta.items())
+            )
+        self.conn.commit()
+
+    def load_meta(self):
+        """Metadatos guardados en el último commit ({} si la frontera es nueva)"""
+        return {key: json.loads(value) for key, value in self.conn.execute("SELECT key, value FROM meta")}
+
+    def close(self):
+        self.conn.commit()
+        self.conn.close()
@@ -0,0 +1,62 @@
+from urllib.parse import urljoin
+
+import lxml.html
+from lxml import etree
+
+from visited import canonicalize_url
+
+# Prefijos/caracteres que descartan un enlace /wiki/ (archivos, categorías, anclas, etc.)
+EXCLUDED_LINK_PARTS = [':', '#', '?', 'Archivo:', 'Categoría:', 'Plantilla:']
+
+TITLE_XPATH = etree.XPath("//h1[contains(concat(' ', normalize-space(@class), ' '), ' firstHeading ')]")
+CONTENT_XPATH = etree.XPath("//div[@id='mw-content-text']")
+
+
+def filter_wiki_links(hrefs, base_url):
+    """Quedarse con los enlaces a artículos de Wikipedia y convertirlos en URLs absolutas canónicas"""
+    links = []
+    for href in hrefs:
+        # Parsoid (API REST) usa enlaces relativos "./Titulo"
+        if href.startswith('./'):
+            href = '/wiki/' + href[2:]
+        if href.startswith('/wiki/') and not any(x in href for x in EXCLUDED_LINK_PARTS):
+            links.append(canonicalize_url(urljoin(base_url, href)))
+    return links
+
+
+def extract_article(html, base_url, title=None):
+    """
+    Extraer título, texto y enlaces de un artículo en una sola pasada con lxml
+
+    Args:
+        html: HTML de la página (bytes o str)
+        base_url: URL base para construir los enlaces absolutos
+        title: Título ya conocido (modos de API); en ese caso `html` es solo el
+               cuerpo del artículo y se usa completo como contenido
+
+    Returns:
+        (titulo, texto, enlaces, total_hrefs) o None si no hay contenido principal
+    """
+    root = lxml.html.fromstring(html)
+
+    if title is None:
+        title_element = TITLE_XPATH(root)
+        title = title_element[0].text_content().strip() if title_element else "Sin título"
+        content = CONTENT_XPATH(root)
+        if not content:
+            return None
+        content = content[0]
+    else:
+        # Parsoid devuelve un documento completo; action=parse solo un fragmento
+        content = root.body if root.tag == 'html' else root
+
+    # Quitar scripts y estilos (conservando el texto que les sigue)
+    etree.strip_elements(content, 'script', 'style', with_tail=False)
+
+    # El texto del contenido ya incluye párrafos, listas y definiciones: no se recorre dos veces
+    text = ''.join(content.itertext())
+
+    hrefs = [href for href in (a.get('href') for a in content.iter('a')) if href]
+    links = filter_wiki_links(hrefs, base_url)
+
+    return title, text, links, len(hrefs)
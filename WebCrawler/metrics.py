@@ -0,0 +1,197 @@
+import bisect
+import json
+import logging
+import os
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+from sinks import current_rss_mb
+
+logger = logging.getLogger(__name__)
+
+# Etapas de una página, en el orden en que ocurren
+STAGES = ('fetch', 'parse', 'tokenize', 'ngram', 'revisions', 'write')
+
+# Límites superiores (segundos) de los buckets del histograma de latencias
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+class StageHistogram:
+    """Histograma acumulativo de latencias de una etapa (mismos buckets que Prometheus)"""
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # El último es +Inf
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds):
+        self.counts[bisect.bisect_left(self.buckets, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def quantile(self, q):
+        """Cuantil aproximado: límite superior del bucket donde cae (None sin observaciones)"""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(self.buckets, self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return self.max
+
+    def snapshot(self):
+        return {
+            'count': self.count,
+            'total_s': round(self.total, 6),
+            'mean_s': round(self.total / self.count, 6) if self.count else None,
+            'p50_s': self.quantile(0.5),
+            'p95_s': self.quantile(0.95),
+            'max_s': round(self.max, 6),
+            'buckets': dict(zip([str(b) for b in self.buckets] + ['+Inf'], self.counts))
+        }
+
+
+class CrawlMetrics:
+    """
+    Métricas por etapa del crawler: tiempos, histogramas de latencia, bytes y códigos HTTP
+
+    Las etapas se miden con `stage(nombre)` (o `observe` si el tiempo se midió en otro
+    proceso, como el parseo en el pool de CPU). Es thread-safe: la descarga y la API de
+    revisiones corren en pools de threads. `maybe_export()` escribe cada `interval`
+    segundos un archivo JSON o de texto Prometheus (reemplazo atómico) para ver el cuello
+    de botella de un crawl en marcha sin un profiler.
+    """
+
+    def __init__(self, path=None, fmt='json', interval=10.0):
+        if fmt not in ('json', 'prometheus'):
+            raise ValueError(f"formato de métricas inválido: {fmt}")
+        self.path = path
+        self.fmt = fmt
+        self.interval = interval
+        self.histograms = {stage: StageHistogram() for stage in STAGES}
+        self.counters = Counter()
+        self.status_codes = Counter()
+        self.start_time = time.time()
+        self.start_cpu = time.process_time()
+        self.last_export = 0.0
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def stage(self, name):
+        """Medir el tiempo de pared de un bloque como una observación de la etapa"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start)
+
+    def observe(self, name, seconds):
+        with self._lock:
+            histogram = self.histograms.get(name)
+            if histogram is None:
+                histogram = self.histograms[name] = StageHistogram()
+            histogram.observe(seconds)
+
+    def observe_many(self, timings):
+        """Registrar varias etapas medidas juntas ({etapa: segundos})"""
+        for name, seconds in timings.items():
+            self.observe(name, seconds)
+
+    def record_response(self, status_code, wire_bytes, body_bytes):
+        """Contar una respuesta HTTP: bytes transferidos (comprimidos) y del cuerpo ya descomprimido"""
+        with self._lock:
+            self.status_codes[status_code] += 1
+            self.counters['requests'] += 1
+            self.counters['bytes_downloaded'] += wire_bytes
+            self.counters['bytes_decoded'] += body_bytes
+
+    def inc(self, name, amount=1):
+        with self._lock:
+            self.counters[name] += amount
+
+    def snapshot(self):
+        """Estado actual de todas las métricas como diccionario serializable"""
+        elapsed = time.time() - self.start_time
+        with self._lock:
+            stages = {name: histogram.snapshot() for name, histogram in self.histograms.items()}
+            counters = dict(self.counters)
+            status_codes = {str(code): count for code, count in sorted(self.status_codes.items())}
+        pages = counters.get('pages', 0)
+        cpu_seconds = time.process_time() - self.start_cpu
+        return {
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'elapsed_s': round(elapsed, 3),
+            'cpu_s': round(cpu_seconds, 3),
+            'cpu_s_per_page': round(cpu_seconds / pages, 6) if pages else None,
+            'pages_per_s': round(pages / elapsed, 3) if elapsed > 0 else None,
+            'rss_mb': current_rss_mb(),
+            'counters': counters,
+            'http_status': status_codes,
+            'stages': stages
+        }
+
+    def to_prometheus(self, snapshot):
+        """Formato de texto de Prometheus (para node_exporter textfile o un scrape directo)"""
+        lines = [
+            '# TYPE crawler_stage_seconds histogram'
+        ]
+        for name, stage in snapshot['stages'].items():
+            cumulative = 0
+            for bound, count in stage['buckets'].items():
+                cumulative += count
+                lines.append(f'crawler_stage_seconds_bucket{{stage="{name}",le="{bound}"}} {cumulative}')
+            lines.append(f'crawler_stage_seconds_sum{{stage="{name}"}} {stage["total_s"]}')
+            lines.append(f'crawler_stage_seconds_count{{stage="{name}"}} {stage["count"]}')
+        lines.append('# TYPE crawler_http_responses_total counter')
+        for code, count in snapshot['http_status'].items():
+            lines.append(f'crawler_http_responses_total{{code="{code}"}} {count}')
+        lines.append('# TYPE crawler_events_total counter')
+        for name, value in sorted(snapshot['counters'].items()):
+            lines.append(f'crawler_events_total{{event="{name}"}} {value}')
+        lines.append('# TYPE crawler_cpu_seconds_total counter')
+        lines.append(f"crawler_cpu_seconds_total {snapshot['cpu_s']}")
+        if snapshot['rss_mb'] is not None:
+            lines.append('# TYPE crawler_rss_bytes gauge')
+            lines.append(f"crawler_rss_bytes {int(snapshot['rss_mb'] * 1024 * 1024)}")
+        return '\n'.join(lines) + '\n'
+
+    def export(self):
+        """Escribir las métricas al archivo configurado (reemplazo atómico, sin fsync)"""
+        self.last_export = time.time()
+        if not self.path:
+            return
+        snapshot = self.snapshot()
+        if self.fmt == 'prometheus':
+            content = self.to_prometheus(snapshot)
+        else:
+            content = json.dumps(snapshot, ensure_ascii=False, indent=2)
+        tmp_path = self.path + '.tmp'
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                f.write(content)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            logger.warning(f"No se pudieron exportar las métricas: {e}")
+
+    def maybe_export(self):
+        """Exportar si pasaron `interval` segundos desde la última exportación"""
+        if self.path and time.time() - self.last_export >= self.interval:
+            self.export()
+
+    def summary_lines(self):
+        """Resumen legible por etapa: tiempo total, medio y p95"""
+        snapshot = self.snapshot()
+        lines = []
+        for name, stage in snapshot['stages'].items():
+            if stage['count']:
+                lines.append(f"{name:<10} {stage['count']:>7} obs | total {stage['total_s']:.1f}s | "
+                             f"media {stage['mean_s'] * 1000:.1f} ms | p95 ≤ {stage['p95_s'] * 1000:.0f} ms")
+        return lines
@@ -0,0 +1,152 @@
+import hashlib
+import logging
+import os
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+FINGERPRINT_BITS = 64
+
+# Constantes de mezcla (splitmix64) para combinar los hashes de las palabras de un shingle
+SHINGLE_MULTIPLIERS = np.array([0x9e3779b97f4a7c15, 0xc2b2ae3d27d4eb4f, 0x165667b19e3779f9], dtype=np.uint64)
+MIX_1 = np.uint64(0xbf58476d1ce4e5b9)
+MIX_2 = np.uint64(0x94d049bb133111eb)
+
+
+def word_hashes(words):
+    """Hash estable de 64 bits de cada palabra (blake2b una sola vez por palabra distinta)"""
+    positions = {}
+    digests = []
+    for word in words:
+        if word not in positions:
+            positions[word] = len(digests)
+            digests.append(hashlib.blake2b(word.encode('utf-8'), digest_size=8).digest())
+    unique = np.frombuffer(b''.join(digests), dtype='<u8')
+    return unique[np.fromiter(map(positions.__getitem__, words), dtype=np.intp, count=len(words))]
+
+
+def simhash(words, shingle=3):
+    """
+    Huella SimHash de 64 bits de una página a partir de sus shingles de `shingle` palabras
+
+    Cada shingle distinto se hashea a 64 bits y vota +1/-1 en cada bit; la huella toma
+    el signo de cada suma. Páginas con casi los mismos shingles (esbozos de plantilla,
+    desambiguaciones) quedan a pocos bits de distancia de Hamming. El hash del shingle
+    combina los de sus palabras con aritmética de 64 bits en numpy: cada palabra se
+    hashea una sola vez y la huella no depende de PYTHONHASHSEED (los procesos del
+    pool y las ejecuciones siguientes dan la misma).
+    """
+    if not words:
+        return 0
+    hashes = word_hashes(words)
+    n = min(shingle, len(hashes))
+    with np.errstate(over='ignore'):
+        x = np.zeros(len(hashes) - n + 1, dtype=np.uint64)
+        for offset in range(n):
+            x += hashes[offset:len(hashes) - n + 1 + offset] * SHINGLE_MULTIPLIERS[offset]
+        x ^= x >> np.uint64(30)
+        x *= MIX_1
+        x ^= x >> np.uint64(27)
+        x *= MIX_2
+        x ^= x >> np.uint64(31)
+    x = np.unique(x).astype('<u8')
+    # Columna k de la matriz de bits = bit k del hash (bytes little-endian, bits en orden little)
+    bits = np.unpackbits(x.view(np.uint8).reshape(-1, 8), axis=1, bitorder='little')
+    majority = bits.sum(axis=0, dtype=np.int64) * 2 > len(x)
+    return int(np.packbits(majority, bitorder='little').view('<u8')[0])
+
+
+def hamming(a, b):
+    return (a ^ b).bit_count()
+
+
+class SimHashIndex:
+    """
+    Índice en memoria de huellas SimHash para encontrar páginas casi duplicadas
+
+    Una similitud s equivale a una distancia de Hamming máxima d = (1 - s) * 64 bits.
+    La huella se parte en d + 1 bandas: si dos huellas difieren en a lo sumo d bits, al
+    menos una banda es idéntica (principio del palomar), así que solo se comparan las
+    huellas que comparten alguna banda en lugar de todas. Las huellas se agregan al
+    archivo `path` (hex y URL por línea) para reconstruir el índice al reanudar.
+    """
+
+    def __init__(self, similarity=0.9, path=None):
+        if not 0 < similarity <= 1:
+            raise ValueError(f"similitud inválida: {similarity}")
+        self.similarity = similarity
+        self.max_distance = int((1 - similarity) * FINGERPRINT_BITS)
+        bands = self.max_distance + 1
+        width = FINGERPRINT_BITS // bands
+        # Las primeras bandas toman los bits que sobran de la división
+        self.bands = []
+        start = 0
+        for band in range(bands):
+            size = width + (1 if band < FINGERPRINT_BITS % bands else 0)
+            self.bands.append((start, (1 << size) - 1))
+            start += size
+        self.buckets = [{} for _ in self.bands]  # banda -> {valor: [índices de huella]}
+        self.fingerprints = []
+        self.urls = []
+        self.path = path
+        self.file = None
+        if path and os.path.exists(path):
+            self.load()
+
+    def __len__(self):
+        return len(self.fingerprints)
+
+    def load(self):
+        with open(self.path, encoding='utf-8') as f:
+            for line in f:
+                parts = line.split()
+                if len(parts) == 2:
+                    self.add(parts[1], int(parts[0], 16), persist=False)
+        logger.info(f"🧬 {len(self)} huellas SimHash cargadas de {self.path}")
+
+    def band_values(self, fingerprint):
+        return [(fingerprint >> start) & mask for start, mask in self.bands]
+
+    def nearest(self, fingerprint, url=None):
+        """
+        (URL, similitud) de la página más parecida dentro del umbral, o None
+
+        Se ignora la huella de la misma `url`: al reanudar, una página que quedó en el
+        archivo pero no llegó a confirmarse en la salida se vuelve a crawlear.
+        """
+        best = None
+        seen = set()
+        for buckets, value in zip(self.buckets, self.band_values(fingerprint)):
+            for index in buckets.get(value, ()):
+                if index in seen:
+                    continue
+                seen.add(index)
+                if self.urls[index] == url:
+                    continue
+                distance = hamming(fingerprint, self.fingerprints[index])
+                if distance <= self.max_distance and (best is None or distance < best[1]):
+                    best = (index, distance)
+        if best is None:
+            return None
+        return self.urls[best[0]], 1 - best[1] / FINGERPRINT_BITS
+
+    def add(self, url, fingerprint, persist=True):
+        index = len(self.fingerprints)
+        self.fingerprints.append(fingerprint)
+        self.urls.append(url)
+        for buckets, value in zip(self.buckets, self.band_values(fingerprint)):
+            buckets.setdefault(value, []).append(index)
+        if persist and self.path:
+            if self.file is None:
+                self.file = open(self.path, 'a', encoding='utf-8')
+            self.file.write(f"{fingerprint:016x} {url}\n")
+
+    def flush(self):
+        if self.file is not None:
+            self.file.flush()
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
@@ -0,0 +1,146 @@
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+
+
+class ThrottledError(Exception):
+    """El servidor pidió bajar la velocidad (HTTP 429/503 o error maxlag de MediaWiki)"""
+
+    def __init__(self, message, retry_after=None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def parse_retry_after(value):
+    """Convertir el header Retry-After (segundos o fecha HTTP) a segundos de espera"""
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_date = parsedate_to_datetime(value)
+        if retry_date.tzinfo is None:
+            retry_date = retry_date.replace(tzinfo=timezone.utc)
+        return max(0.0, (retry_date - datetime.now(timezone.utc)).total_seconds())
+    except (TypeError, ValueError):
+        return None
+
+
+class AdaptiveRateLimiter:
+    """
+    Control de velocidad con token bucket y ajuste AIMD de la concurrencia
+
+    - El token bucket limita los requests por segundo (`rate`) permitiendo ráfagas de `burst`.
+    - La concurrencia permitida (`limit`) sube de forma aditiva con cada respuesta exitosa
+      y baja de forma multiplicativa cuando el servidor responde 429/503 o maxlag.
+    - Un Retry-After bloquea a todos los workers hasta que vence el plazo indicado.
+
+    Es thread-safe: los workers del pool de descargas llaman a `slot()` alrededor de cada request.
+    """
+
+    def __init__(self, rate=5.0, burst=None, min_rate=0.5, max_rate=50.0,
+                 max_concurrency=8, min_concurrency=1,
+                 increase_step=0.5, decrease_factor=0.5, cooldown=1.0):
+        self.rate = max(min_rate, min(rate, max_rate))
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.capacity = burst if burst is not None else max(1.0, float(max_concurrency))
+        self.tokens = self.capacity
+        self.max_concurrency = max(1, max_concurrency)
+        self.min_concurrency = max(1, min(min_concurrency, self.max_concurrency))
+        self.limit = float(self.max_concurrency)
+        self.increase_step = increase_step
+        self.decrease_factor = decrease_factor
+        self.cooldown = cooldown
+
+        self.in_flight = 0
+        self.blocked_until = 0.0
+        self.last_decrease = 0.0
+        self.throttle_count = 0
+        self.success_count = 0
+
+        self._last_refill = time.monotonic()
+        self._cond = threading.Condition()
+
+    def _refill(self, now):
+        """Recargar tokens según el tiempo transcurrido"""
+        elapsed = now - self._last_refill
+        if elapsed > 0:
+            self.tokens = min(self.capacity, self.tokens + elapsed * self.rate)
+            self._last_refill = now
+
+    def acquire(self):
+        """Esperar hasta tener un token y un espacio de concurrencia libre"""
+        with self._cond:
+            while True:
+                now = time.monotonic()
+                if now < self.blocked_until:
+                    self._cond.wait(self.blocked_until - now)
+                    continue
+
+                self._refill(now)
+                has_slot = self.in_flight < int(self.limit)
+                if has_slot and self.tokens >= 1:
+                    self.tokens -= 1
+                    self.in_flight += 1
+                    return
+
+                # Sin espacio: esperar a que otro worker libere; sin token: esperar la recarga
+                timeout = None if not has_slot else (1 - self.tokens) / self.rate
+                self._cond.wait(timeout)
+
+    def release(self):
+        """Liberar el espacio de concurrencia ocupado por un request"""
+        with self._cond:
+            self.in_flight = max(0, self.in_flight - 1)
+            self._cond.notify_all()
+
+    @contextmanager
+    def slot(self):
+        """Context manager que envuelve un request con acquire/release"""
+        self.acquire()
+        try:
+            yield
+        finally:
+            self.release()
+
+    def on_success(self):
+        """Incremento aditivo: una respuesta normal permite ir un poco más rápido"""
+        with self._cond:
+            self.success_count += 1
+            self.limit = min(self.max_concurrency, self.limit + 1.0 / max(self.limit, 1.0))
+            self.rate = min(self.max_rate, self.rate + self.increase_step / self.rate)
+            self._cond.notify_all()
+
+    def on_throttle(self, retry_after=None):
+        """Decremento multiplicativo y pausa global si el servidor envió Retry-After"""
+        with self._cond:
+            now = time.monotonic()
+            self.throttle_count += 1
+
+            # Una ráfaga de 429 simultáneos cuenta como una sola señal de congestión
+            if now - self.last_decrease >= self.cooldown:
+                self.limit = max(self.min_concurrency, self.limit * self.decrease_factor)
+                self.rate = max(self.min_rate, self.rate * self.decrease_factor)
+                self.tokens = min(self.tokens, 1.0)
+                self.last_decrease = now
+
+            if retry_after:
+                self.blocked_until = max(self.blocked_until, now + retry_after)
+            self._cond.notify_all()
+
+    def snapshot(self):
+        """Estado actual del limitador para logs y métricas"""
+        with self._cond:
+            return {
+                'rate': round(self.rate, 2),
+                'concurrency_limit': int(self.limit),
+                'in_flight': self.in_flight,
+                'throttled': self.throttle_count,
+                'successes': self.success_count,
+            }
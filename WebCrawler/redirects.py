@@ -0,0 +1,113 @@
+import logging
+import threading
+from collections import OrderedDict
+from urllib.parse import unquote, urlsplit
+
+from dump_reader import title_to_url
+from visited import canonicalize_url
+
+logger = logging.getLogger(__name__)
+
+# Marca en la caché de un título que no existe (enlace rojo): el enlace se descarta
+MISSING = ''
+
+
+class RedirectResolver:
+    """
+    Resolver enlaces /wiki/ a la URL del artículo canónico antes de encolarlos
+
+    Muchos enlaces apuntan a redirecciones (otra grafía, sin tildes, plurales) de un
+    artículo que ya está en la frontera; sin resolverlos se descarga, parsea y guarda el
+    mismo artículo bajo otra URL. Los títulos desconocidos se consultan en lotes de
+    `batch_size` con action=query&redirects (una sola request por lote, sin contenido) y
+    el resultado queda en una caché LRU de `max_entries` títulos, así los enlaces
+    frecuentes se resuelven una sola vez. Los títulos inexistentes se descartan.
+
+    Es thread-safe: las páginas se terminan de procesar en el pool de descargas.
+    """
+
+    def __init__(self, query_api, batch_size=50, max_entries=200000, metrics=None):
+        """
+        Args:
+            query_api: Función parámetros -> respuesta JSON de action=query (p. ej. api_query)
+            batch_size: Títulos por consulta (50 es el máximo de la API sin permisos de bot)
+            max_entries: Títulos recordados en la caché
+            metrics: CrawlMetrics opcional para contar consultas y redirecciones
+        """
+        self.query_api = query_api
+        self.batch_size = batch_size
+        self.max_entries = max_entries
+        self.metrics = metrics
+        self.cache = OrderedDict()  # título -> título canónico (MISSING si no existe)
+        self._lock = threading.Lock()
+
+    def inc(self, name, amount=1):
+        if self.metrics is not None and amount:
+            self.metrics.inc(name, amount)
+
+    def resolve(self, urls):
+        """
+        URLs canónicas (sin repetir, en el mismo orden) de los artículos a los que apuntan `urls`
+
+        Si la API falla, los títulos de ese lote quedan sin resolver (se devuelven tal cual)
+        y se reintentan la próxima vez que aparezcan.
+        """
+        titles = {}
+        for url in urls:
+            parts = urlsplit(url)
+            if parts.path.startswith('/wiki/'):
+                titles[url] = unquote(parts.path[len('/wiki/'):]).replace('_', ' ')
+
+        with self._lock:
+            unknown = list(dict.fromkeys(title for title in titles.values() if title not in self.cache))
+        for start in range(0, len(unknown), self.batch_size):
+            self.query_batch(unknown[start:start + self.batch_size])
+
+        resolved = []
+        seen = set()
+        redirected = missing = 0
+        with self._lock:
+            for url in urls:
+                title = titles.get(url)
+                target = self.cache.get(title) if title is not None else None
+                if target is None:
+                    canonical = url
+                elif target == MISSING:
+                    missing += 1
+                    continue
+                else:
+                    self.cache.move_to_end(title)
+                    if target != title:
+                        redirected += 1
+                    parts = urlsplit(url)
+                    canonical = canonicalize_url(title_to_url(f"{parts.scheme}://{parts.netloc}", target))
+                if canonical not in seen:
+                    seen.add(canonical)
+                    resolved.append(canonical)
+        self.inc('links_redirected', redirected)
+        self.inc('links_missing', missing)
+        return resolved
+
+    def query_batch(self, titles):
+        """Consultar un lote de títulos y guardar su destino en la caché"""
+        try:
+            data = self.query_api({'titles': '|'.join(titles), 'redirects': 1})
+        except Exception as e:
+            logger.warning(f"No se pudieron resolver redirecciones de {len(titles)} títulos: {e}")
+            self.inc('redirect_errors')
+            return
+        self.inc('redirect_queries')
+        query = data.get('query', {})
+        normalized = {item['from']: item['to'] for item in query.get('normalized', [])}
+        redirects = {item['from']: item['to'] for item in query.get('redirects', [])}
+        # Destinos que no existen o no son artículos (p. ej. una redirección a una categoría)
+        excluded = {page.get('title') for page in query.get('pages', {}).values()
+                    if 'missing' in page or 'invalid' in page or page.get('ns', 0) != 0}
+
+        with self._lock:
+            for title in titles:
+                target = normalized.get(title, title)
+                target = redirects.get(target, target)
+                self.cache[title] = MISSING if target in excluded else target
+            while len(self.cache) > self.max_entries:
+                self.cache.popitem(last=False)
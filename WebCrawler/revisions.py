@@ -0,0 +1,72 @@
+import logging
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+
+class RevisionEnricher:
+    """
+    Etapa de enriquecimiento en segundo plano para el historial de ediciones
+
+    El crawler entrega cada página recién procesada con `submit()` y sigue descargando;
+    un pool de threads consulta la API de revisiones y completa `page_data['ediciones']`.
+    Las páginas ya enriquecidas se recogen con `drain()` para guardarlas.
+
+    Cada página en espera conserva sus n-gramas completos hasta que llega su historial
+    (varias páginas de rvcontinue), así que a lo sumo `max_pending` páginas esperan a
+    la vez: cuando se llega al límite `submit()` bloquea hasta que termine una consulta.
+    La memoria queda acotada aunque la API de revisiones vaya más lenta que las
+    descargas, y el crawler se frena a su ritmo.
+    """
+
+    def __init__(self, fetch_revisions, workers=4, max_pending=100):
+        """
+        Args:
+            fetch_revisions: Función que completa en su lugar 'ediciones' y la revisión de
+                             una página (p. ej. fetch_page_revisions, que reintenta y marca
+                             el historial como incompleto si la consulta falla)
+            workers: Threads dedicados a consultar la API de revisiones
+            max_pending: Páginas esperando su historial como máximo (enviadas y sin terminar)
+        """
+        self.fetch_revisions = fetch_revisions
+        self.pending_slots = threading.BoundedSemaphore(max(1, max_pending))
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='crawler-revisions')
+        self.completed = deque()
+        self.in_progress = 0
+        self._lock = threading.Lock()
+
+    def submit(self, page_data):
+        """Encolar una página para completar sus ediciones (bloquea si ya hay `max_pending` en espera)"""
+        self.pending_slots.acquire()
+        with self._lock:
+            self.in_progress += 1
+        self.executor.submit(self._enrich, page_data)
+
+    def _enrich(self, page_data):
+        try:
+            self.fetch_revisions(page_data)
+        except Exception as e:
+            logger.warning(f"Error enriqueciendo {page_data.get('titulo')}: {e}")
+            page_data['ediciones'] = None  # Incompleto, no "sin ediciones"
+        finally:
+            with self._lock:
+                self.in_progress -= 1
+                self.completed.append(page_data)
+            self.pending_slots.release()
+
+    def drain(self):
+        """Devolver las páginas que ya tienen su historial completo"""
+        pages = []
+        with self._lock:
+            while self.completed:
+                pages.append(self.completed.popleft())
+        return pages
+
+    def close(self):
+        """Esperar a que terminen las consultas pendientes y devolver las últimas páginas"""
+        if self.in_progress:
+            logger.info(f"⏳ Esperando historial de ediciones de {self.in_progress} páginas...")
+        self.executor.shutdown(wait=True)
+        return self.drain()
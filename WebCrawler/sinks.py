@@ -0,0 +1,482 @@
+import csv
+import io
+import json
+import logging
+import os
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # Solo hace falta con output_format='parquet'
+    pa = pq = None
+
+logger = logging.getLogger(__name__)
+
+# Las columnas de n-gramas pueden superar el límite por defecto del módulo csv (128 KB)
+csv.field_size_limit(max(csv.field_size_limit(), 16 * 1024 * 1024))
+
+CSV_COLUMNS = ['titulo', 'url', 'unigramas', 'bigramas', 'trigramas', 'links', 'ediciones', 'timestamp']
+
+
+def current_rss_mb():
+    """Memoria residente actual del proceso en MB (None si no se puede medir)"""
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss / (1024 * 1024)
+    except ImportError:
+        pass
+    try:
+        # Linux: segunda columna de statm = páginas residentes
+        with open('/proc/self/statm') as f:
+            resident_pages = int(f.read().split()[1])
+        return resident_pages * os.sysconf('SC_PAGE_SIZE') / (1024 * 1024)
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def write_json_atomic(path, data):
+    """Escribir un JSON completo o nada: archivo temporal + fsync + os.replace"""
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def rewrite_path(directory, name):
+    """Archivo temporal de un segmento reescrito (oculto: no coincide con los patrones de Spark)"""
+    return os.path.join(directory, f".{name}.rewrite")
+
+
+def finish_rewrite(directory, segment):
+    """
+    Completar el reemplazo de un segmento reescrito (también tras una interrupción)
+
+    El manifiesto registra la reescritura pendiente antes de reemplazar el archivo, así
+    que al abrir se sabe si falta el rename (el temporal sigue ahí) y cuántos bytes tiene
+    la nueva versión.
+    """
+    temp_path = rewrite_path(directory, segment['file'])
+    if os.path.exists(temp_path):
+        os.replace(temp_path, os.path.join(directory, segment['file']))
+    segment['bytes'] = segment.pop('rewrite_bytes')
+    segment['rows'] = segment.pop('rewrite_rows')
+
+
+def remove_stale_rewrites(directory, segments):
+    """Borrar temporales de reescrituras que nunca llegaron a registrarse en el manifiesto"""
+    pending = {segment['file'] for segment in segments if 'rewrite_bytes' in segment}
+    for name in os.listdir(directory or '.'):
+        if name.startswith('.') and name.endswith('.rewrite') and name[1:-len('.rewrite')] not in pending:
+            os.remove(os.path.join(directory, name))
+
+
+class StreamingCsvSink:
+    """
+    Escritura incremental del CSV: cada página se serializa al terminar y se suelta de memoria
+
+    Las filas se acumulan en un buffer pequeño que se vacía al archivo (modo append, sin
+    volver a leerlo) cuando llega a `flush_every_pages` filas o cuando la memoria residente
+    supera `max_rss_mb`. `on_flush` se llama después de cada escritura confirmada en disco
+    y `before_flush` justo antes de escribir (p. ej. para persistir el vocabulario de IDs).
+
+    La salida se reparte en segmentos de hasta `max_segment_mb` (`wikipedia_crawl_data.csv`,
+    `wikipedia_crawl_data-00001.csv`, ...), cada uno con su encabezado. Un manifiesto
+    (`<nombre>.manifest.json`) guarda las filas y bytes confirmados de cada segmento y se
+    reemplaza atómicamente después de cada escritura: al abrir, lo que haya quedado después
+    del último byte confirmado (una fila a medio escribir) se trunca.
+    """
+
+    def __init__(self, path, flush_every_pages=20, max_rss_mb=None, columns=CSV_COLUMNS, on_flush=None,
+                 max_segment_mb=256, before_flush=None):
+        self.path = path
+        self.base, self.extension = os.path.splitext(path)
+        self.manifest_path = self.base + '.manifest.json'
+        self.flush_every_pages = max(1, flush_every_pages)
+        self.max_rss_mb = max_rss_mb
+        self.max_segment_bytes = int(max_segment_mb * 1024 * 1024)
+        self.columns = columns
+        self.on_flush = on_flush
+        self.before_flush = before_flush
+        self.buffer = []
+        self.segments = []  # [{'file', 'rows', 'bytes'}] confirmados
+        self.load_manifest()
+
+    def segment_path(self, index):
+        if index == 0:
+            return self.path
+        return f"{self.base}-{index:05d}{self.extension}"
+
+    def segment_paths(self):
+        """Rutas de los segmentos confirmados, en orden"""
+        directory = os.path.dirname(self.path)
+        return [os.path.join(directory, segment['file']) for segment in self.segments]
+
+    @property
+    def rows_written(self):
+        return sum(segment['rows'] for segment in self.segments)
+
+    @property
+    def bytes_written(self):
+        return sum(segment['bytes'] for segment in self.segments)
+
+    def load_manifest(self):
+        """Leer el manifiesto y descartar lo no confirmado; adoptar un CSV previo sin manifiesto"""
+        if os.path.exists(self.manifest_path):
+            with open(self.manifest_path, encoding='utf-8') as f:
+                self.segments = json.load(f)['segments']
+            directory = os.path.dirname(self.path)
+            remove_stale_rewrites(directory, self.segments)
+            if any('rewrite_bytes' in segment for segment in self.segments):
+                for segment in self.segments:
+                    if 'rewrite_bytes' in segment:
+                        finish_rewrite(directory, segment)
+                self.save_manifest()
+            for path, segment in zip(self.segment_paths(), self.segments):
+                self.recover_segment(path, segment)
+        elif os.path.exists(self.path) and os.path.getsize(self.path) > 0:
+            # CSV de una versión anterior: se cuenta una sola vez y pasa a ser el segmento 0
+            with open(self.path, newline='', encoding='utf-8') as f:
+                rows = max(0, sum(1 for _ in csv.reader(f)) - 1)
+            self.segments = [{'file': os.path.basename(self.path), 'rows': rows,
+                              'bytes': os.path.getsize(self.path)}]
+            self.save_manifest()
+            logger.info(f"📒 CSV existente adoptado como primer segmento ({rows} filas)")
+
+    def recover_segment(self, path, segment):
+        size = os.path.getsize(path) if os.path.exists(path) else 0
+        if size > segment['bytes']:
+            logger.warning(f"✂️ Truncando {os.path.basename(path)}: {size - segment['bytes']} bytes sin confirmar")
+            with open(path, 'r+b') as f:
+                f.truncate(segment['bytes'])
+        elif size < segment['bytes']:
+            logger.warning(f"⚠️ {os.path.basename(path)} tiene menos bytes que los confirmados en el manifiesto")
+
+    def save_manifest(self):
+        write_json_atomic(self.manifest_path, {
+            'columns': self.columns,
+            'rows': self.rows_written,
+            'bytes': self.bytes_written,
+            'segments': self.segments
+        })
+
+    def write(self, row):
+        """Agregar una fila; se escribe en disco según el presupuesto de páginas o de memoria"""
+        self.buffer.append(row)
+        if len(self.buffer) >= self.flush_every_pages or self.over_memory_budget():
+            self.flush()
+
+    def row_bytes(self, row):
+        """Bytes que ocuparía la fila en el segmento, sin escribirla"""
+        out = io.StringIO()
+        csv.DictWriter(out, fieldnames=self.columns, lineterminator='\n').writerow(row)
+        return len(out.getvalue().encode('utf-8'))
+
+    def over_memory_budget(self):
+        if not self.max_rss_mb:
+            return False
+        rss = current_rss_mb()
+        return rss is not None and rss > self.max_rss_mb
+
+    def flush(self):
+        """Escribir las filas pendientes al final del segmento actual y confirmarlas en el manifiesto"""
+        if not self.buffer:
+            return
+        if self.before_flush is not None:
+            self.before_flush()
+        if not self.segments or self.segments[-1]['bytes'] >= self.max_segment_bytes:
+            path = self.segment_path(len(self.segments))
+            self.segments.append({'file': os.path.basename(path), 'rows': 0, 'bytes': 0})
+            # Registrar el segmento vacío antes de escribirlo: si se corta, al abrir se trunca a 0
+            self.save_manifest()
+        segment = self.segments[-1]
+        new_segment = segment['bytes'] == 0
+
+        # Serializar todo el lote antes de tocar el archivo: una sola escritura por flush
+        out = io.StringIO()
+        writer = csv.DictWriter(out, fieldnames=self.columns, lineterminator='\n')
+        if new_segment:
+            writer.writeheader()
+        writer.writerows(self.buffer)
+        data = out.getvalue().encode('utf-8')
+
+        # Un segmento nuevo empieza vacío aunque haya quedado un archivo de un intento sin confirmar
+        with open(self.segment_paths()[-1], 'wb' if new_segment else 'ab') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+
+        segment['rows'] += len(self.buffer)
+        segment['bytes'] += len(data)
+        self.save_manifest()
+        self.buffer = []
+        if self.on_flush is not None:
+            self.on_flush()
+
+    def checkpoint(self):
+        """Confirmar lo que haya en el buffer (en el CSV cada flush ya es un commit)"""
+        self.flush()
+
+    @property
+    def committed(self):
+        """True si todas las filas recibidas ya están confirmadas en disco"""
+        return not self.buffer
+
+    def iter_rows(self, columns=None):
+        """Recorrer las filas confirmadas de todos los segmentos como diccionarios"""
+        for path in self.segment_paths():
+            with open(path, newline='', encoding='utf-8') as f:
+                for row in csv.DictReader(f):
+                    yield {column: row.get(column, '') for column in columns} if columns else row
+
+    def replace_rows(self, replacements):
+        """
+        Reemplazar en su lugar filas confirmadas ({url: fila nueva}); devuelve {url: fila anterior}
+
+        Solo se reescriben los segmentos que contienen alguna de las URLs, leyéndolos y
+        escribiéndolos en streaming (sin cargar el segmento en memoria).
+        """
+        self.flush()
+        if self.before_flush is not None:
+            self.before_flush()
+        directory = os.path.dirname(self.path)
+        replaced = {}
+        for index, path in enumerate(self.segment_paths()):
+            with open(path, newline='', encoding='utf-8') as f:
+                if not any(row.get('url') in replacements for row in csv.DictReader(f)):
+                    continue
+            segment = self.segments[index]
+            temp_path = rewrite_path(directory, segment['file'])
+            rows = 0
+            with open(path, newline='', encoding='utf-8') as source, \
+                    open(temp_path, 'w', newline='', encoding='utf-8') as target:
+                writer = csv.DictWriter(target, fieldnames=self.columns, lineterminator='\n', extrasaction='ignore')
+                writer.writeheader()
+                for row in csv.DictReader(source):
+                    url = row.get('url')
+                    if url in replacements:
+                        replaced[url] = row
+                        row = replacements[url]
+                    writer.writerow(row)
+                    rows += 1
+                target.flush()
+                os.fsync(target.fileno())
+            segment['rewrite_bytes'] = os.path.getsize(temp_path)
+            segment['rewrite_rows'] = rows
+            self.save_manifest()
+            finish_rewrite(directory, segment)
+            self.save_manifest()
+        return replaced
+
+    def close(self):
+        self.flush()
+
+
+def parquet_schema(ngram_format='lists', token_ids=False):
+    """
+    Esquema Arrow de la salida: listas nativas, o mapas n-grama -> frecuencia con ngram_format='counts'
+
+    Con `token_ids` los tokens son IDs del vocabulario (int32): un unigrama es un ID y
+    un bigrama o trigrama es una lista de IDs.
+    """
+    if pa is None:
+        raise ImportError("output_format='parquet' requiere pyarrow (pip install pyarrow)")
+    token = pa.int32() if token_ids else pa.string()
+    gram = pa.list_(pa.int32()) if token_ids else pa.string()
+    if ngram_format == 'counts':
+        unigram_type = pa.map_(token, pa.int32())
+        ngram_type = pa.map_(gram, pa.int32())
+    else:
+        unigram_type = pa.list_(token)
+        ngram_type = pa.list_(gram)
+    return pa.schema([
+        ('titulo', pa.string()),
+        ('url', pa.string()),
+        ('unigramas', unigram_type),
+        ('bigramas', ngram_type),
+        ('trigramas', ngram_type),
+        ('links', pa.list_(pa.string())),
+        ('ediciones', pa.map_(pa.string(), pa.int32())),
+        ('timestamp', pa.string()),
+    ])
+
+
+class ParquetSink:
+    """
+    Salida columnar en Parquet, escrita en row groups a medida que llegan las páginas
+
+    Cada `row_group_pages` filas se escribe un row group en el archivo en curso
+    (`.part-NNNNN.parquet.inprogress`, oculto para Spark). Al llegar a `pages_per_file`
+    filas, o en `close()`, el archivo se cierra (Parquet escribe su footer al final), se
+    renombra a `part-NNNNN.parquet` y se registra en `_manifest.json`: solo entonces sus
+    filas quedan confirmadas y se llama a `on_flush` (`before_flush`, antes de escribir
+    cada row group). Un archivo en curso que quedó de una ejecución interrumpida nunca
+    se confirmó y se borra al abrir.
+    """
+
+    def __init__(self, directory, schema, row_group_pages=250, pages_per_file=2000, max_rss_mb=None,
+                 on_flush=None, compression='zstd', before_flush=None):
+        if pq is None:
+            raise ImportError("output_format='parquet' requiere pyarrow (pip install pyarrow)")
+        os.makedirs(directory, exist_ok=True)
+        self.path = directory
+        self.manifest_path = os.path.join(directory, '_manifest.json')
+        self.schema = schema
+        self.row_group_pages = max(1, row_group_pages)
+        self.pages_per_file = max(self.row_group_pages, pages_per_file)
+        self.max_rss_mb = max_rss_mb
+        self.on_flush = on_flush
+        self.before_flush = before_flush
+        self.compression = compression
+        self.buffer = []
+        self.segments = []  # [{'file', 'rows', 'bytes'}] confirmados
+        self.writer = None
+        self.current_file = None
+        self.current_rows = 0
+        self.load_manifest()
+
+    def load_manifest(self):
+        if os.path.exists(self.manifest_path):
+            with open(self.manifest_path, encoding='utf-8') as f:
+                self.segments = json.load(f)['segments']
+            remove_stale_rewrites(self.path, self.segments)
+            if any('rewrite_bytes' in segment for segment in self.segments):
+                for segment in self.segments:
+                    if 'rewrite_bytes' in segment:
+                        finish_rewrite(self.path, segment)
+                self.save_manifest()
+        for name in os.listdir(self.path):
+            if name.endswith('.inprogress'):
+                logger.warning(f"✂️ Descartando {name}: archivo Parquet sin confirmar")
+                os.remove(os.path.join(self.path, name))
+
+    def save_manifest(self):
+        write_json_atomic(self.manifest_path, {
+            'schema': self.schema.to_string(),
+            'rows': self.rows_written,
+            'bytes': sum(segment['bytes'] for segment in self.segments),
+            'segments': self.segments
+        })
+
+    def segment_paths(self):
+        return [os.path.join(self.path, segment['file']) for segment in self.segments]
+
+    @property
+    def rows_written(self):
+        return sum(segment['rows'] for segment in self.segments)
+
+    @property
+    def bytes_written(self):
+        """Bytes confirmados más lo ya escrito en el archivo en curso"""
+        in_progress = 0
+        if self.current_file is not None:
+            in_progress = os.path.getsize(self.in_progress_path())
+        return sum(segment['bytes'] for segment in self.segments) + in_progress
+
+    @property
+    def committed(self):
+        return not self.buffer and self.writer is None
+
+    def in_progress_path(self):
+        return os.path.join(self.path, f".{self.current_file}.inprogress")
+
+    def write(self, row):
+        """Agregar una fila; se escribe un row group según el presupuesto de páginas o de memoria"""
+        self.buffer.append(row)
+        if len(self.buffer) >= self.row_group_pages or self.over_memory_budget():
+            self.flush()
+
+    def row_bytes(self, row):
+        """
+        Bytes de la fila en columnas Arrow, sin escribirla
+
+        Es el tamaño antes de comprimir: la compresión de Parquet es por página de columna
+        dentro del row group, así que una fila sola no tiene un tamaño comprimido propio.
+        """
+        return pa.Table.from_pylist([row], schema=self.schema).nbytes
+
+    def over_memory_budget(self):
+        if not self.max_rss_mb:
+            return False
+        rss = current_rss_mb()
+        return rss is not None and rss > self.max_rss_mb
+
+    def flush(self):
+        """Escribir las filas pendientes como un row group del archivo en curso"""
+        if not self.buffer:
+            return
+        if self.before_flush is not None:
+            self.before_flush()
+        if self.writer is None:
+            self.current_file = f"part-{len(self.segments):05d}.parquet"
+            self.writer = pq.ParquetWriter(self.in_progress_path(), self.schema, compression=self.compression)
+        table = pa.Table.from_pylist(self.buffer, schema=self.schema)
+        self.writer.write_table(table, row_group_size=len(self.buffer))
+        self.current_rows += len(self.buffer)
+        self.buffer = []
+        if self.current_rows >= self.pages_per_file:
+            self.commit_file()
+
+    def commit_file(self):
+        """Cerrar el archivo en curso y confirmarlo en el manifiesto"""
+        self.writer.close()
+        in_progress = self.in_progress_path()
+        with open(in_progress, 'rb') as f:
+            os.fsync(f.fileno())
+        final_path = os.path.join(self.path, self.current_file)
+        os.replace(in_progress, final_path)
+        self.segments.append({'file': self.current_file, 'rows': self.current_rows,
+                              'bytes': os.path.getsize(final_path)})
+        self.save_manifest()
+        self.writer = None
+        self.current_file = None
+        self.current_rows = 0
+        if self.on_flush is not None:
+            self.on_flush()
+
+    def checkpoint(self):
+        """Las filas se confirman al cerrar cada archivo: un checkpoint no fuerza row groups chicos"""
+
+    def iter_rows(self, columns=None):
+        """Recorrer las filas confirmadas (listas y mapas nativos; los mapas como pares)"""
+        for path in self.segment_paths():
+            for batch in pq.ParquetFile(path).iter_batches(columns=columns):
+                yield from batch.to_pylist()
+
+    def replace_rows(self, replacements):
+        """
+        Reemplazar en su lugar filas confirmadas ({url: fila nueva}); devuelve {url: fila anterior}
+
+        Confirma primero el archivo en curso; solo se reescriben los archivos que contienen
+        alguna de las URLs (cada uno tiene a lo sumo `pages_per_file` filas).
+        """
+        self.close()
+        if self.before_flush is not None:
+            self.before_flush()
+        replaced = {}
+        for segment, path in zip(self.segments, self.segment_paths()):
+            urls = pq.read_table(path, columns=['url']).column('url').to_pylist()
+            if not any(url in replacements for url in urls):
+                continue
+            rows = pq.read_table(path).to_pylist()
+            for i, row in enumerate(rows):
+                if row['url'] in replacements:
+                    replaced[row['url']] = row
+                    rows[i] = replacements[row['url']]
+            temp_path = rewrite_path(self.path, segment['file'])
+            with pq.ParquetWriter(temp_path, self.schema, compression=self.compression) as writer:
+                writer.write_table(pa.Table.from_pylist(rows, schema=self.schema), row_group_size=self.row_group_pages)
+            with open(temp_path, 'rb') as f:
+                os.fsync(f.fileno())
+            segment['rewrite_bytes'] = os.path.getsize(temp_path)
+            segment['rewrite_rows'] = len(rows)
+            self.save_manifest()
+            finish_rewrite(self.path, segment)
+            self.save_manifest()
+        return replaced
+
+    def close(self):
+        self.flush()
+        if self.writer is not None:
+            self.commit_file()
@@ -0,0 +1,7 @@
+import os
+import sys
+
+WEBCRAWLER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, WEBCRAWLER_DIR)
+sys.path.insert(0, os.path.join(WEBCRAWLER_DIR, 'benchmarks'))
+sys.path.insert(0, os.path.join(os.path.dirname(WEBCRAWLER_DIR), 'Spark'))
@@ -0,0 +1,116 @@
+import os
+import struct
+
+import pytest
+
+import checkpoint
+from checkpoint import HEADER, MAGIC, read_checkpoint, write_checkpoint
+from visited import VisitedSet
+
+URLS = [f'https://es.wikipedia.org/wiki/P{i}' for i in range(3000)]
+META = {'frontier_done_seq': 3000, 'timestamp': '2024-01-01T00:00:00', 'titulo': 'Educación'}
+
+
+def visited_set(**options):
+    # El conjunto exacto arranca chico para que crezca; el filtro de Bloom no crece
+    expected_items = len(URLS) if options.get('bloom_error_rate') else 64
+    visited = VisitedSet(expected_items=expected_items, **options)
+    visited.update(URLS)
+    visited.discard(URLS[0])
+    return visited
+
+
+@pytest.mark.parametrize('options', [{}, {'bloom_error_rate': 0.001}])
+def test_roundtrip(tmp_path, options):
+    path = str(tmp_path / 'crawler_checkpoint.bin')
+    write_checkpoint(path, META, visited_set(**options).tobytes())
+    meta, visited_bytes = read_checkpoint(path)
+    visited = VisitedSet.frombytes(visited_bytes)
+    assert meta == META
+    assert len(visited) == len(URLS) - 1
+    assert URLS[0] not in visited
+    assert all(url in visited for url in URLS[1:])
+    assert not os.path.exists(path + '.tmp')
+
+
+def corrupt(path, offset):
+    with open(path, 'r+b') as f:
+        f.seek(offset)
+        byte = f.read(1)
+        f.seek(offset)
+        f.write(bytes([byte[0] ^ 0xFF]))
+
+
+@pytest.mark.parametrize('damage', ['truncated', 'header_only', 'flipped_meta', 'flipped_table', 'version'])
+def test_damaged_checkpoint_is_rejected(tmp_path, damage):
+    path = str(tmp_path / 'crawler_checkpoint.bin')
+    write_checkpoint(path, META, visited_set().tobytes())
+    size = os.path.getsize(path)
+    if damage == 'truncated':
+        with open(path, 'r+b') as f:
+            f.truncate(size - 4096)  # Sigue siendo múltiplo de 8: la tabla parecería válida
+    elif damage == 'header_only':
+        with open(path, 'r+b') as f:
+            f.truncate(HEADER.size - 1)
+    elif damage == 'flipped_meta':
+        corrupt(path, HEADER.size + 2)
+    elif damage == 'flipped_table':
+        corrupt(path, size - 100)
+    else:
+        with open(path, 'r+b') as f:
+            f.write(struct.pack('<4sH', MAGIC, checkpoint.VERSION + 1))
+    with pytest.raises(ValueError):
+        read_checkpoint(path)
+
+
+def test_failed_write_keeps_the_previous_checkpoint(tmp_path, monkeypatch):
+    path = str(tmp_path / 'crawler_checkpoint.bin')
+    write_checkpoint(path, META, visited_set().tobytes())
+
+    def fail(fd):
+        raise OSError("disco lleno")
+
+    monkeypatch.setattr(checkpoint.os, 'fsync', fail)
+    with pytest.raises(OSError):
+        write_checkpoint(path, {**META, 'frontier_done_seq': 9999}, VisitedSet().tobytes())
+    monkeypatch.undo()
+
+    meta, visited_bytes = read_checkpoint(path)
+    assert meta == META
+    assert len(VisitedSet.frombytes(visited_bytes)) == len(URLS) - 1
+
+
+def test_crawler_falls_back_to_the_frontier_when_the_checkpoint_is_damaged(tmp_path):
+    import contextlib
+    import io
+    import logging
+
+    from crawler import WikipediaCrawler
+    from wiki_standin import StandInServer, WikiStandIn
+
+    def make_crawler(server):
+        crawler = WikipediaCrawler(max_depth=4, max_pages=30, delay=0, cpu_workers=0, base_url=server.url,
+                                   data_dir=str(tmp_path))
+        crawler.rate_limiter.max_rate = crawler.rate_limiter.rate = 1000.0
+        return crawler
+
+    logging.disable(logging.CRITICAL)
+    try:
+        with StandInServer(WikiStandIn(pages=50)) as server, contextlib.redirect_stdout(io.StringIO()), \
+                contextlib.redirect_stderr(io.StringIO()):
+            crawler = make_crawler(server)
+            crawler.crawl([server.start_url()])
+            crawler.save_to_csv()
+            crawler.close_progress_tracking()
+            path = str(tmp_path / 'crawler_checkpoint.bin')
+            read_checkpoint(path)  # El cierre dejó un checkpoint válido
+
+            with open(path, 'r+b') as f:
+                f.truncate(os.path.getsize(path) - 8)
+            resumed = make_crawler(server)
+            assert resumed.load_state()
+    finally:
+        logging.disable(logging.NOTSET)
+    assert resumed.stats == crawler.stats
+    assert len(resumed.visited_urls) == len(crawler.visited_urls)
+    assert all(url in resumed.visited_urls for url in crawler.get_frontier().visited_urls())
@@ -0,0 +1,77 @@
+import json
+import os
+
+import pandas as pd
+import pytest
+
+from dump_reader import iter_dump_pages
+
+SAMPLE_DUMP = os.path.join(os.path.dirname(__file__), 'data', 'sample-pages-articles.xml.bz2')
+BASE_URL = 'https://es.wikipedia.org'
+COLUMNS = ['titulo', 'url', 'unigramas', 'bigramas', 'trigramas', 'links', 'ediciones', 'timestamp']
+
+
+@pytest.fixture
+def ingested(tmp_path):
+    from crawler import WikipediaCrawler
+    crawler = WikipediaCrawler(cpu_workers=0, base_url=BASE_URL, data_dir=str(tmp_path))
+    crawler.stream_output = False  # También en memoria, para revisar los registros completos
+    crawler.ingest_dump(SAMPLE_DUMP)
+    crawler.save_to_csv()
+    crawler.close_progress_tracking()
+    return crawler, tmp_path
+
+
+def test_iter_dump_pages():
+    pages = list(iter_dump_pages(SAMPLE_DUMP))
+    assert [(page['title'], page['ns'], page['redirect']) for page in pages] == [
+        ('Costa Rica', 0, False),
+        ('Volcán Arenal', 0, False),
+        ('CR', 0, True),
+        ('Usuario:Ejemplo', 2, False),
+        ('Esbozo', 0, False),
+    ]
+    assert len(pages[0]['timestamps']) == 3
+    assert pages[0]['text'].startswith('{{Ficha de país')  # El texto de la última revisión
+
+
+def test_ingest_dump_records(ingested):
+    crawler, _ = ingested
+    records = {page['titulo']: page for page in crawler.crawled_data}
+    # Sin redirecciones, páginas de otros espacios de nombres ni esbozos de menos de 10 palabras
+    assert list(records) == ['Costa Rica', 'Volcán Arenal']
+
+    costa_rica = records['Costa Rica']
+    assert set(costa_rica) >= set(COLUMNS)
+    assert costa_rica['url'] == f'{BASE_URL}/wiki/Costa_Rica'
+    assert costa_rica['links'] == [
+        f'{BASE_URL}/wiki/Am%C3%A9rica_Central',
+        f'{BASE_URL}/wiki/San_Jos%C3%A9_(Costa_Rica)',
+        f'{BASE_URL}/wiki/Nicaragua',
+        f'{BASE_URL}/wiki/Panam%C3%A1',
+        f'{BASE_URL}/wiki/Oc%C3%A9ano_Pac%C3%ADfico',
+    ]  # Sin el enlace a sí misma, como en las filas del crawl
+    assert costa_rica['ediciones'] == {'2024-01-05': 2, '2024-02-10': 1}
+    # Plantillas, referencias, categorías e interwikis no llegan al texto
+    assert 'ficha' not in costa_rica['unigramas']
+    assert 'fuente' not in costa_rica['unigramas']
+    assert 'categoría' not in costa_rica['unigramas']
+    assert 'costa rica' in costa_rica['bigramas']
+
+    arenal = records['Volcán Arenal']
+    assert arenal['ediciones'] == {'2023-11-20': 1}
+    assert arenal['links'] == [
+        f'{BASE_URL}/wiki/Costa_Rica',
+        f'{BASE_URL}/wiki/Provincia_de_Alajuela',
+        f'{BASE_URL}/wiki/Lago_Arenal',
+    ]
+
+
+def test_ingest_dump_csv(ingested):
+    crawler, data_dir = ingested
+    rows = pd.read_csv(os.path.join(data_dir, 'wikipedia_crawl_data.csv'))
+    assert list(rows.columns) == COLUMNS
+    assert rows['titulo'].tolist() == ['Costa Rica', 'Volcán Arenal']
+    assert json.loads(rows['ediciones'][0]) == {'2024-01-05': 2, '2024-02-10': 1}
+    assert rows['links'][1].split('|') == crawler.crawled_data[1]['links']
+    assert crawler.stats['pages'] == 2
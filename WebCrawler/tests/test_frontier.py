@@ -0,0 +1,83 @@
+from frontier import DONE, PENDING, UrlFrontier
+
+URLS = [f'https://es.wikipedia.org/wiki/P{i}' for i in range(6)]
+
+
+def crash(frontier):
+    """Cerrar la conexión sin commit, como si el proceso muriera"""
+    frontier.conn.close()
+
+
+def state(frontier, url):
+    return frontier.conn.execute("SELECT state FROM frontier WHERE url = ?", (url,)).fetchone()[0]
+
+
+def test_push_deduplicates_urls(tmp_path):
+    frontier = UrlFrontier(str(tmp_path / 'frontier.sqlite'))
+    assert frontier.push(URLS[0], 0)
+    assert not frontier.push(URLS[0], 3)
+    assert frontier.push_many(URLS[:3], 1) == 2
+    frontier.mark_done(frontier.pop()[0])
+    # Una URL terminada no vuelve a la frontera aunque aparezca otra vez
+    assert frontier.push_many(URLS[:4], 1) == 1
+    assert frontier.pending_count() == 3
+    assert frontier.conn.execute("SELECT depth FROM frontier WHERE url = ?", (URLS[0],)).fetchone()[0] == 0
+
+
+def test_pop_order_and_scored_priorities(tmp_path):
+    frontier = UrlFrontier(str(tmp_path / 'frontier.sqlite'))
+    frontier.push_many(URLS[3:5], 2)
+    frontier.push_many(URLS[:3], 1)
+    # En anchura: primero la menos profunda y, a igual profundidad, la más antigua
+    assert [frontier.pop()[0] for _ in range(3)] == URLS[:3]
+
+    frontier.push_scored([URLS[4]], 2, parent_yield=1.0)
+    frontier.push_scored([URLS[4], URLS[5]], 2, parent_yield=3.0)
+    assert frontier.pop() == (URLS[4], 2)  # Mejor padre (3.0) y dos enlaces entrantes
+    assert frontier.pop() == (URLS[5], 2)
+    assert frontier.pop() == (URLS[3], 2)
+    assert frontier.pop() is None
+
+
+def test_resume_requeues_in_progress_and_drops_uncommitted_work(tmp_path):
+    path = str(tmp_path / 'frontier.sqlite')
+    frontier = UrlFrontier(path)
+    frontier.push_many(URLS[:4], 0)
+    first, _ = frontier.pop()
+    frontier.mark_done(first)
+    second, _ = frontier.pop()
+    frontier.commit({'pages': 1})
+    third, _ = frontier.pop()
+    frontier.mark_done(second)  # Sin commit: la página no llegó a confirmarse en la salida
+    crash(frontier)
+
+    frontier = UrlFrontier(path)
+    assert state(frontier, first) == DONE
+    assert state(frontier, second) == PENDING
+    assert state(frontier, third) == PENDING
+    assert frontier.in_progress_urls() == []
+    assert frontier.load_meta() == {'pages': 1}
+    assert [frontier.pop()[0] for _ in range(3)] == [second, third, URLS[3]]
+
+
+def test_done_seq_orders_finished_urls_across_runs(tmp_path):
+    path = str(tmp_path / 'frontier.sqlite')
+    frontier = UrlFrontier(path)
+    frontier.push_many(URLS, 0)
+    for _ in range(3):
+        frontier.mark_done(frontier.pop()[0])
+    frontier.commit()
+    checkpoint_seq = frontier.done_seq
+    frontier.mark_done(frontier.pop()[0])
+    crash(frontier)
+
+    frontier = UrlFrontier(path)
+    assert frontier.done_seq == checkpoint_seq == 3  # Sigue desde la última terminada confirmada
+    frontier.mark_done(frontier.pop()[0])
+    frontier.add_visited([URLS[5]])
+    frontier.commit()
+    seqs = dict(frontier.conn.execute("SELECT url, done_seq FROM frontier WHERE state = ?", (DONE,)))
+    assert [seqs[url] for url in URLS[:4] + URLS[5:]] == [1, 2, 3, 4, 5]
+    # Un checkpoint en done_seq=3 solo necesita leer las terminadas después
+    assert set(frontier.visited_urls(since=checkpoint_seq)) == {URLS[3], URLS[5]}
+    assert set(frontier.visited_urls()) == set(URLS[:4] + URLS[5:])
@@ -0,0 +1,123 @@
+import random
+
+import pytest
+
+from crawler import WikipediaCrawler
+from near_duplicates import FINGERPRINT_BITS, SimHashIndex, hamming, simhash
+
+# Un artículo sintético de 400 palabras: cambiar una sola altera 3 de sus ~400 shingles
+_rng = random.Random(11)
+WORDS = [f'palabra{_rng.randrange(300)}' for _ in range(400)]
+
+
+def flip(fingerprint, bits):
+    for bit in bits:
+        fingerprint ^= 1 << bit
+    return fingerprint
+
+
+def test_bands_partition_the_fingerprint():
+    for similarity in (0.8, 0.9, 0.95, 1.0):
+        index = SimHashIndex(similarity)
+        assert len(index.bands) == index.max_distance + 1
+        covered = 0
+        for start, mask in index.bands:
+            assert covered & (mask << start) == 0
+            covered |= mask << start
+        assert covered == (1 << FINGERPRINT_BITS) - 1
+    with pytest.raises(ValueError):
+        SimHashIndex(0)
+
+
+def test_banded_lookup_finds_every_fingerprint_within_the_threshold():
+    rng = random.Random(7)
+    index = SimHashIndex(0.9)
+    assert index.max_distance == 6
+    originals = [rng.getrandbits(FINGERPRINT_BITS) for _ in range(200)]
+    for i, fingerprint in enumerate(originals):
+        index.add(f'P{i}', fingerprint)
+
+    for i, fingerprint in enumerate(originals):
+        # Hasta max_distance bits distintos, repartidos al azar entre las bandas: siempre se encuentra
+        distance = rng.randint(0, index.max_distance)
+        near = flip(fingerprint, rng.sample(range(FINGERPRINT_BITS), distance))
+        assert index.nearest(near) == (f'P{i}', 1 - distance / FINGERPRINT_BITS)
+        # Un bit más ya no alcanza el umbral aunque comparta bandas con la original
+        far = flip(fingerprint, rng.sample(range(FINGERPRINT_BITS), index.max_distance + 1))
+        match = index.nearest(far)
+        assert match is None or hamming(far, originals[int(match[0][1:])]) <= index.max_distance
+
+
+def test_nearest_prefers_the_closest_and_ignores_the_same_url():
+    index = SimHashIndex(0.9)
+    base = random.Random(3).getrandbits(FINGERPRINT_BITS)
+    index.add('lejana', flip(base, [1, 20, 40, 60]))
+    index.add('cercana', flip(base, [5]))
+    assert index.nearest(base) == ('cercana', 1 - 1 / FINGERPRINT_BITS)
+    # Al reanudar, la huella de la misma página no cuenta como duplicado de sí misma
+    assert index.nearest(base, url='cercana') == ('lejana', 1 - 4 / FINGERPRINT_BITS)
+
+
+def test_index_reloads_from_its_file(tmp_path):
+    path = str(tmp_path / 'simhashes.txt')
+    index = SimHashIndex(0.9, path=path)
+    fingerprints = {f'P{i}': random.Random(i).getrandbits(FINGERPRINT_BITS) for i in range(20)}
+    for url, fingerprint in fingerprints.items():
+        index.add(url, fingerprint)
+    index.close()
+    with open(path, 'a', encoding='utf-8') as f:
+        f.write('0123')  # Línea cortada por una interrupción
+
+    reloaded = SimHashIndex(0.9, path=path)
+    assert len(reloaded) == len(fingerprints)
+    assert all(reloaded.nearest(fingerprint) == (url, 1.0) for url, fingerprint in fingerprints.items())
+
+
+def test_simhash_is_stable_and_close_for_near_identical_texts():
+    fingerprint = simhash(WORDS)
+    assert simhash(list(WORDS)) == fingerprint
+    edited = WORDS[:-1] + ['ecoturismo']
+    assert hamming(simhash(edited), fingerprint) <= SimHashIndex(0.9).max_distance
+    rng = random.Random(12)
+    unrelated = [f'término{rng.randrange(300)}' for _ in range(400)]
+    assert hamming(simhash(unrelated), fingerprint) > SimHashIndex(0.9).max_distance
+
+
+def near_duplicate_pages():
+    pages = []
+    for i, words in enumerate((WORDS, WORDS[:-1] + ['ecoturismo'])):
+        pages.append({
+            'titulo': f'Costa Rica {i}', 'url': f'https://es.wikipedia.org/wiki/Costa_Rica_{i}',
+            'unigramas': list(words), 'bigramas': [' '.join(words[j:j + 2]) for j in range(len(words) - 1)],
+            'trigramas': [' '.join(words[j:j + 3]) for j in range(len(words) - 2)],
+            'links': [], 'ediciones': {'2024-01-01': 1}, 'timestamp': '2024-01-01T00:00:00',
+            'simhash': simhash(words)
+        })
+    return pages
+
+
+@pytest.mark.parametrize('options', [{}, {'token_ids': True}, {'output_format': 'parquet'},
+                                     {'output_format': 'parquet', 'token_ids': True}])
+def test_near_duplicate_bytes_are_measured_in_the_output_format(tmp_path, options):
+    crawler = WikipediaCrawler(delay=0, data_dir=str(tmp_path), near_duplicates='skip', **options)
+    original, duplicate = near_duplicate_pages()
+    expected_page = dict(duplicate)
+    assert not crawler.is_near_duplicate(original)
+    crawler.store_page(original)
+    assert crawler.is_near_duplicate(duplicate)
+
+    sink = crawler.get_output_sink()
+    if crawler.token_ids:
+        crawler.get_vocabulary().encode_page(expected_page)
+    expected_page.pop('simhash')
+    expected = sink.row_bytes(crawler.page_to_output_row(expected_page))
+    assert crawler.metrics.counters['near_duplicate_bytes'] == expected
+    assert crawler.stats['pages'] == 1
+
+    if options.get('output_format') != 'parquet':
+        # En CSV es exactamente lo que la fila agrega al segmento
+        sink.flush()
+        before = sink.bytes_written
+        crawler.store_page(duplicate)
+        sink.flush()
+        assert sink.bytes_written - before == expected
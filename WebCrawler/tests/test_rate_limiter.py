@@ -0,0 +1,164 @@
+from contextlib import contextmanager
+from email.utils import format_datetime
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+import crawler as crawler_module
+import rate_limiter
+from crawler import WikipediaCrawler
+from rate_limiter import AdaptiveRateLimiter, ThrottledError, parse_retry_after
+
+
+class FakeClock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(rate_limiter.time, 'monotonic', clock)
+    return clock
+
+
+def test_throttle_decreases_multiplicatively_once_per_cooldown(clock):
+    limiter = AdaptiveRateLimiter(rate=8.0, min_rate=0.5, max_concurrency=8, cooldown=1.0)
+    limiter.on_throttle()
+    assert (limiter.limit, limiter.rate) == (4.0, 4.0)
+
+    # Una ráfaga de 429 simultáneos es una sola señal de congestión
+    clock.advance(0.5)
+    limiter.on_throttle()
+    assert (limiter.limit, limiter.rate) == (4.0, 4.0)
+    assert limiter.throttle_count == 2
+
+    for _ in range(10):
+        clock.advance(1.0)
+        limiter.on_throttle()
+    assert limiter.limit == limiter.min_concurrency == 1
+    assert limiter.rate == limiter.min_rate
+
+
+def test_success_increases_additively_up_to_the_maximum(clock):
+    limiter = AdaptiveRateLimiter(rate=2.0, max_rate=3.0, max_concurrency=4, increase_step=0.5)
+    limiter.on_throttle()
+    assert (limiter.limit, limiter.rate) == (2.0, 1.0)
+    limiter.on_success()
+    assert limiter.limit == pytest.approx(2.5)  # +1/limit por respuesta
+    assert limiter.rate == pytest.approx(1.5)  # +increase_step/rate
+    for _ in range(100):
+        limiter.on_success()
+    assert (limiter.limit, limiter.rate) == (4, 3.0)
+
+
+def test_retry_after_blocks_every_worker_until_it_expires(clock):
+    limiter = AdaptiveRateLimiter()
+    limiter.on_throttle(retry_after=30)
+    assert limiter.blocked_until == clock.now + 30
+    clock.advance(10)
+    limiter.on_throttle(retry_after=5)  # Un plazo más corto no acorta la pausa
+    assert limiter.blocked_until == clock.now + 20
+
+
+def test_token_bucket_refills_with_the_clock(clock):
+    limiter = AdaptiveRateLimiter(rate=4.0, burst=2, max_concurrency=8)
+    for _ in range(2):
+        with limiter.slot():
+            pass
+    assert limiter.tokens == 0
+    clock.advance(0.25)
+    limiter._refill(clock())
+    assert limiter.tokens == pytest.approx(1.0)
+    clock.advance(10)
+    limiter._refill(clock())
+    assert limiter.tokens == 2  # Nunca más que la ráfaga permitida
+
+
+def test_parse_retry_after():
+    assert parse_retry_after('120') == 120.0
+    assert parse_retry_after(' 1.5 ') == 1.5
+    assert parse_retry_after('-3') == 0.0
+    assert parse_retry_after(None) is None
+    assert parse_retry_after('pronto') is None
+    later = datetime.now(timezone.utc) + timedelta(seconds=60)
+    assert 55 <= parse_retry_after(format_datetime(later, usegmt=True)) <= 60
+
+
+class FakeResponse:
+    def __init__(self, status_code, headers=None, content=b'{}'):
+        self.status_code = status_code
+        self.headers = headers or {}
+        self.content = content
+
+
+class FakeTransport:
+    def __init__(self, responses):
+        self.responses = list(responses)
+        self.calls = 0
+
+    def get(self, url, params=None, conditional=False):
+        self.calls += 1
+        return self.responses.pop(0)
+
+
+class RecordingLimiter:
+    def __init__(self):
+        self.events = []
+
+    @contextmanager
+    def slot(self):
+        yield
+
+    def on_success(self):
+        self.events.append('success')
+
+    def on_throttle(self, retry_after=None):
+        self.events.append(('throttle', retry_after))
+
+
+@pytest.fixture
+def backoff_crawler(tmp_path, monkeypatch):
+    sleeps = []
+    monkeypatch.setattr(crawler_module.time, 'sleep', sleeps.append)
+    monkeypatch.setattr(crawler_module.random, 'uniform', lambda a, b: 0.0)
+    crawler = WikipediaCrawler(delay=0, data_dir=str(tmp_path))
+    crawler.rate_limiter = RecordingLimiter()
+    crawler.backoff_base = 1.0
+    crawler.backoff_max = 60.0
+    crawler.sleeps = sleeps
+    return crawler
+
+
+def test_request_with_backoff_retries_429_503_and_maxlag(backoff_crawler):
+    crawler = backoff_crawler
+    crawler.transport = FakeTransport([
+        FakeResponse(429, {'Retry-After': '7'}),
+        FakeResponse(503),
+        FakeResponse(200, {'MediaWiki-API-Error': 'maxlag', 'Retry-After': '1'}),
+        FakeResponse(200, content=b'{"query": {}}'),
+    ])
+    response = crawler.request_with_backoff('https://es.wikipedia.org/w/api.php', params={'maxlag': 5})
+    assert response.content == b'{"query": {}}'
+    # Retry-After manda si es mayor que el backoff exponencial (1, 2, 4 s)
+    assert crawler.sleeps == [7.0, 2.0, 4.0]
+    assert crawler.rate_limiter.events == [('throttle', 7.0), ('throttle', None), ('throttle', 1.0), 'success']
+    assert crawler.metrics.counters['requests'] == 4
+
+
+def test_request_with_backoff_gives_up_with_throttled_error(backoff_crawler):
+    crawler = backoff_crawler
+    crawler.max_retries = 2
+    crawler.backoff_max = 1.5
+    crawler.transport = FakeTransport([FakeResponse(429, {'Retry-After': '0.5'}) for _ in range(3)])
+    with pytest.raises(ThrottledError) as error:
+        crawler.request_with_backoff('https://es.wikipedia.org/wiki/Costa_Rica')
+    assert error.value.retry_after == 0.5  # Quien llama reencola la URL con este plazo
+    assert crawler.transport.calls == 3
+    assert crawler.sleeps == [1.0, 1.5]  # Backoff acotado por backoff_max
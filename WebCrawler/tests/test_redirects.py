@@ -0,0 +1,95 @@
+from dump_reader import title_to_url
+from redirects import RedirectResolver
+
+BASE_URL = 'https://es.wikipedia.org'
+
+
+def url(title):
+    return title_to_url(BASE_URL, title)
+
+
+class FakeApi:
+    """action=query&redirects con normalización, redirecciones, páginas inexistentes y de otro espacio"""
+
+    normalized = {'costa rica (país)': 'Costa rica (país)'}
+    redirects = {'Costa rica (país)': 'Costa Rica', 'CR': 'Costa Rica', 'Cat': 'Categoría:Gatos'}
+    missing = {'Página inexistente'}
+
+    def __init__(self, fail=False):
+        self.batches = []
+        self.fail = fail
+
+    def __call__(self, params):
+        titles = params['titles'].split('|')
+        self.batches.append(titles)
+        if self.fail:
+            raise ConnectionError("sin red")
+        query = {'normalized': [], 'redirects': [], 'pages': {}}
+        for index, title in enumerate(titles):
+            target = self.normalized.get(title, title)
+            if target != title:
+                query['normalized'].append({'from': title, 'to': target})
+            if target in self.redirects:
+                query['redirects'].append({'from': target, 'to': self.redirects[target]})
+                target = self.redirects[target]
+            page = {'title': target, 'ns': 14 if target.startswith('Categoría:') else 0}
+            if target in self.missing:
+                page['missing'] = ''
+            query['pages'][str(-index - 1) if 'missing' in page else str(index + 1)] = page
+        return {'query': query}
+
+
+def test_resolves_normalized_redirect_chains_and_drops_missing_pages():
+    api = FakeApi()
+    resolver = RedirectResolver(api)
+    links = [url('costa rica (país)'), url('CR'), url('Costa Rica'), url('Página inexistente'),
+             url('Cat'), url('Volcán Arenal')]
+    # Tres grafías del mismo artículo quedan en una sola URL; las que no son artículos se descartan
+    assert resolver.resolve(links) == [url('Costa Rica'), url('Volcán Arenal')]
+    assert len(api.batches) == 1
+
+
+def test_batches_unknown_titles_and_caches_them():
+    api = FakeApi()
+    resolver = RedirectResolver(api, batch_size=50)
+    links = [url(f'Artículo {i}') for i in range(120)]
+    assert resolver.resolve(links + links[:10]) == links
+    assert [len(batch) for batch in api.batches] == [50, 50, 20]
+    resolver.resolve(links[:60] + [url('CR')])
+    assert api.batches[3:] == [['CR']]  # Solo se consulta el título nuevo
+
+
+def test_lru_cache_keeps_recently_used_titles():
+    api = FakeApi()
+    resolver = RedirectResolver(api, max_entries=3)
+    resolver.resolve([url('A'), url('B'), url('C')])
+    resolver.resolve([url('A')])  # A pasa a ser el más reciente
+    resolver.resolve([url('D')])  # Sale B, el menos usado
+    assert list(resolver.cache) == ['C', 'A', 'D']
+    resolver.resolve([url('A'), url('B')])
+    assert api.batches[-1] == ['B']
+
+
+def test_api_errors_leave_links_unresolved_and_retry_later():
+    api = FakeApi(fail=True)
+    resolver = RedirectResolver(api)
+    assert resolver.resolve([url('CR')]) == [url('CR')]
+    api.fail = False
+    assert resolver.resolve([url('CR')]) == [url('Costa Rica')]
+    assert len(api.batches) == 2
+
+
+def test_bfs_only_resolves_links_that_will_be_enqueued(tmp_path):
+    from crawler import WikipediaCrawler
+
+    crawler = WikipediaCrawler(delay=0, data_dir=str(tmp_path), frontier_policy='bfs')
+    crawler.links_per_page = 3
+    api = FakeApi()
+    crawler.api_query = api
+    crawler.visited_urls.add(url('Artículo 0'))
+    page_links = [url(f'Artículo {i}') for i in range(200)] + [url('CR')]
+
+    links, new_links = crawler.extract_links(page_links, url('Costa Rica'))
+    assert links == page_links  # La fila guarda todos los enlaces de la página
+    assert new_links == [url(f'Artículo {i}') for i in range(1, 4)]
+    assert api.batches == [[f'Artículo {i}' for i in range(1, 4)]]
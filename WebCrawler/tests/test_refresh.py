@@ -0,0 +1,63 @@
+import contextlib
+import io
+import logging
+
+import pandas as pd
+import pytest
+
+from crawler import WikipediaCrawler
+from wiki_standin import StandInServer, WikiStandIn
+
+
+class EditedStandIn(WikiStandIn):
+    """Sitio sintético cuyas páginas pueden recibir una revisión nueva con el mismo contenido"""
+
+    revision_offset = 0
+
+    def last_revision(self, title):
+        lastrevid, touched = super().last_revision(title)
+        return lastrevid + self.revision_offset, touched
+
+
+def make_crawler(server, data_dir, **options):
+    crawler = WikipediaCrawler(max_depth=4, max_pages=60, delay=0, cpu_workers=0, base_url=server.url,
+                               data_dir=str(data_dir), **options)
+    crawler.rate_limiter.max_rate = crawler.rate_limiter.rate = 1000.0
+    return crawler
+
+
+def saved_links(data_dir):
+    frame = pd.concat(pd.read_csv(path, usecols=['url', 'links'], keep_default_na=False)
+                      for path in sorted(data_dir.glob('wikipedia_crawl_data*.csv')))
+    return dict(zip(frame['url'], frame['links']))
+
+
+@pytest.mark.parametrize('options', [{}, {'token_ids': True}, {'ngram_format': 'counts'}])
+def test_refreshing_unchanged_pages_keeps_stats_and_links(tmp_path, options):
+    site = EditedStandIn(pages=80)
+    logging.disable(logging.CRITICAL)
+    try:
+        with StandInServer(site) as server, contextlib.redirect_stdout(io.StringIO()), \
+                contextlib.redirect_stderr(io.StringIO()):
+            crawler = make_crawler(server, tmp_path, **options)
+            crawler.crawl([server.start_url()])
+            crawler.save_to_csv()
+            crawler.close_progress_tracking()
+            crawled_stats = dict(crawler.stats)
+            links = saved_links(tmp_path)
+
+            # Todas las páginas tienen una revisión nueva, pero el contenido es el mismo
+            site.revision_offset = 1
+            crawler = make_crawler(server, tmp_path, **options)
+            assert crawler.load_state()
+            assert dict(crawler.stats) == crawled_stats  # Los contadores salen de las filas guardadas
+            assert crawler.refresh() == crawled_stats['pages']
+            crawler.close_progress_tracking()
+    finally:
+        logging.disable(logging.NOTSET)
+
+    assert dict(crawler.stats) == crawled_stats
+    assert saved_links(tmp_path) == links
+    # Cada fila guarda todos los enlaces de la página, también los ya visitados, pero no a sí misma
+    assert all(url not in row.split('|') for url, row in links.items())
+    assert sum(row.count('|') + 1 for row in links.values() if row) == crawled_stats['links']
@@ -0,0 +1,92 @@
+import time
+from collections import Counter
+
+import pytest
+
+from crawler import WikipediaCrawler
+from revisions import RevisionEnricher
+from wiki_standin import StandInServer, WikiStandIn
+
+TITLE = 'Artículo 3'
+
+
+class FlakyStandIn(WikiStandIn):
+    """Sitio sintético cuya API de revisiones falla `failures` veces en cada página de continuación"""
+
+    def __init__(self, failures, **kwargs):
+        super().__init__(**kwargs)
+        self.failures = failures
+        self.calls = Counter()
+
+    def api_response(self, query):
+        if 'rvcontinue' in query:
+            self.calls[query] += 1
+            if self.calls[query] <= self.failures:
+                return {'error': {'code': 'maxlag', 'info': 'Waiting for a database server'}}
+        return super().api_response(query)
+
+
+@pytest.fixture
+def make_crawler(tmp_path):
+    servers = []
+
+    def make(site):
+        server = StandInServer(site).start()
+        servers.append(server)
+        crawler = WikipediaCrawler(delay=0, base_url=server.url, data_dir=str(tmp_path))
+        crawler.backoff_base = crawler.backoff_max = 0.01
+        return crawler
+
+    yield make
+    for server in servers:
+        server.stop()
+
+
+def expected_edits(site, title):
+    return dict(Counter(timestamp[:10] for timestamp in site.revision_timestamps(title)))
+
+
+def test_partial_history_is_retried_from_the_continuation(make_crawler):
+    site = FlakyStandIn(failures=2, pages=20)
+    assert len(site.revision_timestamps(TITLE)) > 50  # Necesita al menos una continuación
+    crawler = make_crawler(site)
+    page = crawler.fetch_page_revisions({'titulo': TITLE})
+    assert page['ediciones'] == expected_edits(site, TITLE)
+    assert page['revision']['lastrevid'] == site.last_revision(TITLE)[0]
+    assert crawler.metrics.counters['revision_retries'] > 0
+    assert crawler.metrics.counters['revisions_incomplete'] == 0
+
+
+def test_failed_history_is_marked_incomplete(make_crawler):
+    site = FlakyStandIn(failures=10, pages=20)
+    crawler = make_crawler(site)
+    page = crawler.fetch_page_revisions({'titulo': TITLE})
+    # Ni un conteo parcial ni '{}': la página queda sin lastrevid para que refresh la vuelva a pedir
+    assert page['ediciones'] is None
+    assert 'lastrevid' not in page['revision']
+    assert crawler.metrics.counters['revisions_incomplete'] == 1
+    assert crawler.page_to_csv_row({'titulo': TITLE, 'url': 'https://x/wiki/A', **page})['ediciones'] == ''
+    assert crawler.parse_ediciones_field('') is None
+    assert crawler.parse_ediciones_field('{}') == {}
+
+
+
+def test_enricher_bounds_the_pages_waiting_for_their_history():
+    finished = []
+
+    def slow_fetch(page_data):
+        time.sleep(0.02)  # La API de revisiones va más lenta que las descargas
+        page_data['ediciones'] = {'2024-01-01': 1}
+        finished.append(page_data['titulo'])
+
+    enricher = RevisionEnricher(slow_fetch, workers=2, max_pending=4)
+    stored = []
+    peak = 0
+    for i in range(40):
+        enricher.submit({'titulo': f'Artículo {i}'})
+        peak = max(peak, i + 1 - len(finished))  # Enviadas y todavía sin historial
+        stored.extend(enricher.drain())
+    stored.extend(enricher.close())
+    assert peak <= 4
+    assert sorted(page['titulo'] for page in stored) == sorted(f'Artículo {i}' for i in range(40))
+    assert all(page['ediciones'] == {'2024-01-01': 1} for page in stored)
@@ -0,0 +1,27 @@
+import pytest
+
+from bench_shards import check, run_sharded_crawl
+
+NUM_SHARDS = 3
+
+
+@pytest.mark.parametrize('concurrency', [1, 4])
+def test_shards_share_the_crawl_without_duplicates(concurrency):
+    result = run_sharded_crawl(NUM_SHARDS, site_pages=120, concurrency=concurrency, timeout=300)
+    assert check(result, NUM_SHARDS) == []
+    # El grafo se recorre completo y todos los enlaces entregados se confirmaron (ack)
+    assert result['summary']['handoff'] == 0
+    assert all(result['urls'].values())
+
+
+def test_remote_coordinator(monkeypatch):
+    monkeypatch.setenv('WIKICRAWLER_COORDINATOR_KEY', 'clave-de-prueba')
+    result = run_sharded_crawl(NUM_SHARDS, site_pages=120, concurrency=4, remote=True, timeout=300)
+    assert check(result, NUM_SHARDS) == []
+
+
+def test_remote_coordinator_requires_a_key(monkeypatch, tmp_path):
+    from coordinator import open_coordinator
+    monkeypatch.delenv('WIKICRAWLER_COORDINATOR_KEY', raising=False)
+    with pytest.raises(ValueError):
+        open_coordinator('127.0.0.1:9', NUM_SHARDS)
@@ -0,0 +1,133 @@
+import csv
+import json
+import os
+
+import pytest
+
+import sinks
+from sinks import CSV_COLUMNS, StreamingCsvSink
+
+
+def row(i, text='original'):
+    return {'titulo': f'Artículo {i}', 'url': f'https://es.wikipedia.org/wiki/Art%C3%ADculo_{i}',
+            'unigramas': f'{text}|palabra', 'bigramas': '', 'trigramas': '', 'links': '',
+            'ediciones': '{}', 'timestamp': '2024-01-01T00:00:00'}
+
+
+def open_sink(tmp_path, **options):
+    return StreamingCsvSink(str(tmp_path / 'wikipedia_crawl_data.csv'), **options)
+
+
+def urls(sink):
+    return [saved['url'] for saved in sink.iter_rows()]
+
+
+def test_uncommitted_tail_is_truncated_on_open(tmp_path):
+    sink = open_sink(tmp_path, flush_every_pages=5)
+    for i in range(10):
+        sink.write(row(i))
+    committed = os.path.getsize(sink.path)
+    # Corte a mitad de un flush: quedó parte de una fila después del último byte confirmado
+    with open(sink.path, 'ab') as f:
+        f.write(b'Art\xc3\xadculo 10,https://es.wikipedia.org/wiki/Art')
+
+    sink = open_sink(tmp_path, flush_every_pages=5)
+    assert os.path.getsize(sink.path) == committed
+    assert sink.rows_written == 10
+    assert urls(sink) == [row(i)['url'] for i in range(10)]
+
+
+def test_legacy_csv_is_adopted_as_the_first_segment(tmp_path):
+    with open(tmp_path / 'wikipedia_crawl_data.csv', 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=CSV_COLUMNS, lineterminator='\n')
+        writer.writeheader()
+        writer.writerows(row(i) for i in range(3))
+
+    sink = open_sink(tmp_path, flush_every_pages=1)
+    assert sink.rows_written == 3
+    assert os.path.exists(sink.manifest_path)
+    sink.write(row(3))
+    sink.close()
+
+    # Al reabrir manda el manifiesto: las filas viejas no se cuentan dos veces
+    sink = open_sink(tmp_path)
+    assert sink.rows_written == 4
+    assert urls(sink) == [row(i)['url'] for i in range(4)]
+
+
+def crash_on_save(sink, call):
+    """Hacer que la llamada número `call` a save_manifest se corte (como un kill del proceso)"""
+    save = sink.save_manifest
+    calls = []
+
+    def save_manifest():
+        calls.append(None)
+        if len(calls) == call:
+            raise KeyboardInterrupt
+        save()
+
+    sink.save_manifest = save_manifest
+
+
+@pytest.mark.parametrize('stage', ['registered', 'renamed'])
+def test_interrupted_rewrite_is_completed_on_open(tmp_path, monkeypatch, stage):
+    sink = open_sink(tmp_path, flush_every_pages=4, max_segment_mb=0.0005)
+    for i in range(12):
+        sink.write(row(i))
+    sink.close()
+    assert len(sink.segments) > 1
+
+    replacements = {row(5)['url']: row(5, 'nuevo')}
+    if stage == 'registered':
+        # La reescritura quedó en el manifiesto pero el proceso murió antes del rename
+        def interrupted(directory, segment):
+            raise KeyboardInterrupt
+        monkeypatch.setattr(sinks, 'finish_rewrite', interrupted)
+    else:
+        # El rename se hizo pero no llegó a guardarse el manifiesto con los bytes nuevos
+        crash_on_save(sink, 2)
+    with pytest.raises(KeyboardInterrupt):
+        sink.replace_rows(replacements)
+    monkeypatch.undo()
+
+    sink = open_sink(tmp_path)
+    saved = list(sink.iter_rows())
+    assert [r['url'] for r in saved] == [row(i)['url'] for i in range(12)]
+    assert [r['unigramas'] for r in saved if r['url'] == row(5)['url']] == ['nuevo|palabra']
+    assert sink.rows_written == 12
+    assert sink.bytes_written == sum(os.path.getsize(path) for path in sink.segment_paths())
+    assert not [name for name in os.listdir(tmp_path) if name.endswith('.rewrite')]
+    with open(sink.manifest_path, encoding='utf-8') as f:
+        assert not any('rewrite_bytes' in segment for segment in json.load(f)['segments'])
+
+
+def test_unregistered_rewrite_is_discarded(tmp_path):
+    sink = open_sink(tmp_path, flush_every_pages=1)
+    for i in range(3):
+        sink.write(row(i))
+    # Temporal escrito pero nunca registrado en el manifiesto: la versión confirmada es la vieja
+    with open(sinks.rewrite_path(str(tmp_path), 'wikipedia_crawl_data.csv'), 'w', encoding='utf-8') as f:
+        f.write('basura a medio escribir')
+
+    sink = open_sink(tmp_path)
+    assert urls(sink) == [row(i)['url'] for i in range(3)]
+    assert not [name for name in os.listdir(tmp_path) if name.endswith('.rewrite')]
+
+
+def test_reopening_after_crashes_never_duplicates_rows(tmp_path):
+    written = 0
+    for attempt in range(4):
+        sink = open_sink(tmp_path, flush_every_pages=3, max_segment_mb=0.001)
+        # Reanudar desde lo confirmado, como hace el crawler con la frontera
+        written = sink.rows_written
+        for i in range(written, written + 10):
+            sink.write(row(i))
+        # Corte: el buffer se pierde y el último segmento queda con una fila a medias
+        with open(sink.segment_paths()[-1], 'ab') as f:
+            f.write(b'fila,cortada')
+
+    sink = open_sink(tmp_path)
+    saved = urls(sink)
+    assert len(saved) == len(set(saved)) == sink.rows_written
+    assert saved == [row(i)['url'] for i in range(len(saved))]
+    assert len(sink.segments) > 1
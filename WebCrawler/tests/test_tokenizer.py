@@ -0,0 +1,43 @@
+import pytest
+
+from bench_tokenizer import BASE_URL, SAMPLE_TEXT, sample_pages
+from html_extractor import extract_article
+from text_processing import extract_words, fast_tokenize, nltk_tokenize
+from wiki_standin import WikiStandIn
+
+nltk = pytest.importorskip('nltk')
+
+
+@pytest.fixture(scope='module', autouse=True)
+def punkt():
+    try:
+        nltk.tokenize.word_tokenize('a', language='spanish')
+    except LookupError:
+        pytest.skip("faltan los datos punkt de NLTK")
+
+
+def standin_articles(pages=30):
+    site = WikiStandIn(pages=pages, template_ratio=0.2)
+    for i in range(pages):
+        html = site.article_html(f'Artículo {i}')
+        article = extract_article(html, BASE_URL) if html else None
+        if article:
+            yield f'Artículo {i}', article[1]
+
+
+@pytest.mark.parametrize('name, text', [
+    ('vacío', ''),
+    ('solo números y signos', '1 234, 5.6 — «»'),
+    ('contracciones', 'cannot Cannot gimme gonna gotta lemme wanna CANNOT'),
+    ('unicode', 'İstanbul ß ﬁn x² 3.º Ærø ñandú co_autor e-mail'),
+    *sample_pages(None),
+    *standin_articles(),
+])
+def test_fast_tokenizer_matches_nltk(name, text):
+    assert fast_tokenize(text) == nltk_tokenize(text)
+
+
+def test_extract_words_is_the_same_with_both_tokenizers():
+    stop_words = {'de', 'la', 'el', 'en', 'y', 'es', 'un', 'una', 'su'}
+    text = SAMPLE_TEXT * 3
+    assert extract_words(text, stop_words, 'fast') == extract_words(text, stop_words, 'nltk')
@@ -0,0 +1,49 @@
+import threading
+
+from visited import VisitedSet
+
+
+def urls(start, stop):
+    return [f"https://es.wikipedia.org/wiki/Art%C3%ADculo_{i}" for i in range(start, stop)]
+
+
+def test_roundtrip_keeps_members():
+    visited = VisitedSet(expected_items=16)
+    visited.update(urls(0, 5000))  # Varias veces más que la capacidad inicial: fuerza _resize
+    visited.discard(urls(0, 1)[0])
+    restored = VisitedSet.frombytes(visited.tobytes())
+    assert len(restored) == 4999
+    assert urls(0, 1)[0] not in restored
+    assert all(url in restored for url in urls(1, 5000))
+    assert not any(url in restored for url in urls(5000, 5100))
+
+
+def test_readers_see_every_added_url_while_the_table_grows():
+    # Los threads de descarga leen (extract_links) mientras el event loop agrega URLs
+    visited = VisitedSet(expected_items=16)
+    first = urls(0, 2000)
+    visited.update(first)
+    stop = threading.Event()
+    errors = []
+
+    def reader():
+        while not stop.is_set():
+            try:
+                missing = [url for url in first if url not in visited]
+            except Exception as e:
+                errors.append(e)
+                return
+            if missing:
+                errors.append(f"{len(missing)} URLs agregadas no encontradas")
+                return
+
+    threads = [threading.Thread(target=reader) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    try:
+        visited.update(urls(2000, 200000))
+    finally:
+        stop.set()
+        for thread in threads:
+            thread.join()
+    assert errors == []
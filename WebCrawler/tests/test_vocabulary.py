@@ -0,0 +1,68 @@
+import copy
+
+import pytest
+
+from crawler import WikipediaCrawler
+from text_processing import count_ngrams, generate_ngrams
+from vocabulario import decodificar_valor, leer_vocabulario
+from vocabulary import Vocabulary
+
+WORDS = ('costa rica país américa central capital san josé costa rica volcán arenal '
+         'ñandú café costa rica san josé').split()
+
+
+def page(ngram_format):
+    if ngram_format == 'counts':
+        grams = {'unigramas': count_ngrams(WORDS, 1), 'bigramas': count_ngrams(WORDS, 2),
+                 'trigramas': count_ngrams(WORDS, 3)}
+    else:
+        grams = {'unigramas': list(WORDS), 'bigramas': generate_ngrams(WORDS, 2),
+                 'trigramas': generate_ngrams(WORDS, 3)}
+    return {'titulo': 'Costa Rica', 'url': 'https://es.wikipedia.org/wiki/Costa_Rica', 'links': [],
+            'ediciones': {}, 'timestamp': '2024-01-01T00:00:00', **grams}
+
+
+def test_ids_round_trip_and_stay_stable_across_reloads(tmp_path):
+    path = str(tmp_path / 'vocabulary.txt')
+    vocabulary = Vocabulary(path)
+    ids = vocabulary.encode(WORDS)
+    assert vocabulary.decode(ids) == WORDS
+    assert len(vocabulary) == len(set(WORDS))
+    vocabulary.save()
+
+    reloaded = Vocabulary(path)
+    assert reloaded.tokens == vocabulary.tokens
+    assert list(reloaded.encode(WORDS)) == list(ids)
+    assert reloaded.id('nuevo') == len(vocabulary)
+
+
+def test_reload_discards_a_partially_appended_token(tmp_path):
+    path = str(tmp_path / 'vocabulary.txt')
+    vocabulary = Vocabulary(path)
+    vocabulary.encode(WORDS)
+    vocabulary.save()
+    with open(path, 'ab') as f:
+        f.write('volcán'.encode('utf-8')[:5])  # Corte a mitad de un save (y de un carácter)
+
+    reloaded = Vocabulary(path)
+    assert reloaded.tokens == vocabulary.tokens
+    assert reloaded.id('tortuga') == len(vocabulary)
+    reloaded.save()
+    assert Vocabulary(path).tokens == vocabulary.tokens + ['tortuga']
+    assert leer_vocabulario(path) == vocabulary.tokens + ['tortuga']
+
+
+@pytest.mark.parametrize('ngram_format', ['lists', 'counts'])
+def test_spark_decoding_matches_the_text_rows(tmp_path, ngram_format):
+    crawler = WikipediaCrawler(delay=0, data_dir=str(tmp_path), ngram_format=ngram_format, token_ids=True)
+    text_page = page(ngram_format)
+    encoded_page = crawler.get_vocabulary().encode_page(copy.deepcopy(text_page))
+    crawler.save_vocabulary()
+
+    text_row = crawler.page_to_csv_row(text_page)
+    encoded_row = crawler.page_to_csv_row(encoded_page)
+    assert encoded_row['unigramas'] != text_row['unigramas']  # Realmente se guardaron IDs
+    # Lo mismo que hace la UDF de Spark/analysis.py con el vocabulary.txt de la carpeta
+    tokens = leer_vocabulario(str(tmp_path / 'vocabulary.txt'))
+    for column in ('unigramas', 'bigramas', 'trigramas'):
+        assert decodificar_valor(tokens, encoded_row[column]) == text_row[column]
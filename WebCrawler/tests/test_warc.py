@@ -0,0 +1,155 @@
+import base64
+import contextlib
+import hashlib
+import io
+import logging
+import os
+
+import pandas as pd
+
+from crawler import WikipediaCrawler
+from warc import (INDEX_FILE, REVISIT_PROFILE, WarcArchive, WarcWriter, iter_index, payload_digest,
+                  read_document, read_metadata, rebuild_index, scan_records)
+from wiki_standin import StandInServer, WikiStandIn
+
+PAGE_URL = 'https://es.wikipedia.org/wiki/Costa_Rica'
+HTML = '<html><body><p>Costa Rica es un país de América Central.</p></body></html>'.encode('utf-8')
+
+
+class FakeResponse:
+    def __init__(self, content, status_code=200):
+        self.content = content
+        self.status_code = status_code
+        self.reason = 'OK'
+        self.url = PAGE_URL
+        self.headers = {'Content-Type': 'text/html; charset=UTF-8', 'Content-Encoding': 'gzip', 'Content-Length': '12'}
+
+
+def index_entries(directory):
+    return [(entry['url'], entry['type'], entry['digest'], entry['location'])
+            for entry in iter_index(os.path.join(directory, INDEX_FILE))]
+
+
+def test_payload_digest_is_base32_sha1():
+    expected = base64.b32encode(hashlib.sha1(HTML).digest()).decode('ascii')
+    assert payload_digest(HTML) == 'sha1:' + expected
+    assert payload_digest(HTML) != payload_digest(HTML + b' ')
+
+
+def test_second_capture_of_the_same_content_is_a_revisit(tmp_path):
+    directory = str(tmp_path / 'warc')
+    writer = WarcWriter(directory)
+    writer.write_response(PAGE_URL, FakeResponse(HTML), 'html')
+    writer.write_metadata(PAGE_URL, {'ediciones': {'2024-01-01': 2}, 'revision': None})
+    writer.write_response(PAGE_URL, FakeResponse(HTML), 'html')
+    writer.close()
+    assert writer.revisits == 1
+
+    (warc_file,) = [name for name in os.listdir(directory) if name.endswith('.warc.gz')]
+    records = [headers for _, _, headers in scan_records(os.path.join(directory, warc_file))]
+    assert [headers['WARC-Type'] for headers in records] == ['warcinfo', 'response', 'metadata', 'revisit']
+    revisit = records[-1]
+    assert revisit['WARC-Profile'] == REVISIT_PROFILE
+    assert revisit['WARC-Payload-Digest'] == records[1]['WARC-Payload-Digest'] == payload_digest(HTML)
+
+    # Las dos capturas apuntan al mismo registro completo, que guarda el cuerpo descomprimido
+    responses = [entry for entry in iter_index(os.path.join(directory, INDEX_FILE)) if entry['type'] == 'response']
+    assert len(responses) == 2
+    assert responses[0]['location'] == responses[1]['location']
+    path, _, offset, length = responses[1]['location']
+    assert read_document((path, offset, length), PAGE_URL) == {'html': HTML, 'title': None}
+
+    # Otra ejecución sobre el mismo directorio sigue deduplicando contra el índice
+    writer = WarcWriter(directory)
+    writer.write_response(PAGE_URL, FakeResponse(HTML), 'html')
+    writer.write_response(PAGE_URL, FakeResponse(HTML + b'<p>Editada</p>'), 'html')
+    writer.close()
+    assert writer.revisits == 1
+
+
+def test_rebuild_index_matches_the_written_one(tmp_path):
+    directory = str(tmp_path / 'warc')
+    writer = WarcWriter(directory)
+    for i in range(3):
+        writer.write_response(PAGE_URL, FakeResponse(HTML + str(i % 2).encode('ascii')), 'html')
+        writer.write_metadata(PAGE_URL, {'ediciones': {}, 'revision': i})
+    writer.close()
+    written = index_entries(directory)
+
+    os.remove(os.path.join(directory, INDEX_FILE))
+    assert rebuild_index(directory) == len(written)
+    # La metadata se indexa sin digest; el resto tiene que ser idéntico al escrito
+    assert index_entries(directory) == [(url, kind, digest if kind == 'response' else '-', location)
+                                        for url, kind, digest, location in written]
+
+    # Un registro cortado al final se ignora y no rompe la reconstrucción
+    (warc_file,) = [name for name in os.listdir(directory) if name.endswith('.warc.gz')]
+    with open(os.path.join(directory, warc_file), 'ab') as f:
+        f.write(b'\x1f\x8b\x08\x00cortado')
+    assert rebuild_index(directory) == len(written)
+
+    ((url, location, metadata_location),) = WarcArchive(directory).pages()
+    assert url == PAGE_URL
+    assert read_document(location, url)['html'] == HTML + b'0'
+    assert read_metadata(metadata_location) == {'ediciones': {}, 'revision': 2}
+
+
+class EditedStandIn(WikiStandIn):
+    """Sitio sintético cuyas páginas pueden recibir una revisión nueva con el mismo contenido"""
+
+    revision_offset = 0
+
+    def last_revision(self, title):
+        lastrevid, touched = super().last_revision(title)
+        return lastrevid + self.revision_offset, touched
+
+
+def make_crawler(server, data_dir, **options):
+    crawler = WikipediaCrawler(max_depth=4, max_pages=60, delay=0, cpu_workers=0, base_url=server.url,
+                               data_dir=str(data_dir), **options)
+    crawler.rate_limiter.max_rate = crawler.rate_limiter.rate = 1000.0
+    return crawler
+
+
+def saved_rows(data_dir):
+    frame = pd.concat(pd.read_csv(path, keep_default_na=False)
+                      for path in sorted(data_dir.glob('wikipedia_crawl_data*.csv')))
+    return {row['url']: row for row in frame.drop(columns=['timestamp']).to_dict('records')}
+
+
+def test_reprocessing_the_archive_restores_the_rows(tmp_path):
+    site = EditedStandIn(pages=80)
+    crawl_dir = tmp_path / 'crawl'
+    reprocess_dir = tmp_path / 'reprocessed'
+    logging.disable(logging.CRITICAL)
+    try:
+        with StandInServer(site) as server, contextlib.redirect_stdout(io.StringIO()), \
+                contextlib.redirect_stderr(io.StringIO()):
+            crawler = make_crawler(server, crawl_dir, archive_responses=True)
+            crawler.crawl([server.start_url()])
+            crawler.save_to_csv()
+            crawler.close_progress_tracking()
+
+            # Segunda captura de cada página: revisión nueva con el mismo contenido
+            site.revision_offset = 1
+            crawler = make_crawler(server, crawl_dir, archive_responses=True)
+            assert crawler.load_state()
+            pages = crawler.refresh()
+            crawler.close_progress_tracking()
+            revisits = crawler.archive.revisits
+
+            crawler = make_crawler(server, reprocess_dir)
+            crawler.reprocess([str(crawl_dir / 'warc')])
+            crawler.save_to_csv()
+            crawler.close_progress_tracking()
+    finally:
+        logging.disable(logging.NOTSET)
+
+    assert pages > 0 and revisits == pages
+    types = [headers['WARC-Type'] for path in sorted((crawl_dir / 'warc').glob('*.warc.gz'))
+             for _, _, headers in scan_records(str(path))]
+    assert types.count('revisit') == revisits
+    assert types.count('response') == pages
+
+    crawled = saved_rows(crawl_dir)
+    assert saved_rows(reprocess_dir) == crawled
@@ -0,0 +1,229 @@
+# Etapa de CPU del crawler: extracción de HTML, limpieza, tokenización y n-gramas.
+# Son funciones a nivel de módulo para poder ejecutarse en los procesos de un
+# ProcessPoolExecutor; las opciones (stopwords, etc.) llegan una sola vez por
+# proceso mediante `init_worker`, no con cada documento.
+import re
+import time
+from collections import Counter
+from datetime import datetime
+
+from html_extractor import extract_article
+from dump_reader import wikitext_to_text, extract_wikilinks
+from warc import read_document, read_metadata
+from near_duplicates import simhash
+
+MIN_WORDS = 10  # Páginas con menos palabras se descartan
+
+NON_WORD_RE = re.compile(r'[^\w\s]')
+DIGITS_RE = re.compile(r'\d+')
+SPACES_RE = re.compile(r'\s+')
+
+# Contracciones inglesas que word_tokenize (Treebank) separa incluso en texto sin
+# puntuación; el tokenizador rápido las replica para producir los mismos tokens
+TREEBANK_SPLITS = {
+    'cannot': ('can', 'not'),
+    'gimme': ('gim', 'me'),
+    'gonna': ('gon', 'na'),
+    'gotta': ('got', 'ta'),
+    'lemme': ('lem', 'me'),
+    'wanna': ('wan', 'na'),
+}
+# Mismas reglas como regex, para los raros tokens que lower() deja con caracteres no \w
+# (p. ej. 'İ' -> 'i̇'), donde word_tokenize ve límites de palabra dentro del token
+TREEBANK_SPLIT_RES = [re.compile(r'\b(%s)(%s)\b' % pair) for pair in TREEBANK_SPLITS.values()]
+
+# Opciones del proceso worker (se asignan en init_worker)
+_worker_options = None
+
+
+def init_worker(options):
+    """Inicializador de cada proceso del pool: guardar las opciones de procesamiento"""
+    global _worker_options
+    _worker_options = options
+
+
+def clean_text(text):
+    """Limpiar y normalizar texto"""
+    if not text:
+        return ""
+
+    # Remover caracteres especiales y números
+    text = NON_WORD_RE.sub(' ', text)
+    text = DIGITS_RE.sub('', text)
+    text = SPACES_RE.sub(' ', text)
+
+    return text.strip().lower()
+
+
+def fast_tokenize(text):
+    """
+    Limpiar y tokenizar en un paso: mismos tokens que clean_text + word_tokenize
+
+    Después de clean_text solo quedan letras, guiones bajos y espacios simples, así que
+    word_tokenize se reduce a separar por espacios (más las contracciones de TREEBANK_SPLITS).
+    """
+    if not text:
+        return []
+
+    text = NON_WORD_RE.sub(' ', text)
+    text = DIGITS_RE.sub('', text)
+
+    tokens = []
+    for token in text.lower().split():
+        split = TREEBANK_SPLITS.get(token)
+        if split:
+            tokens.extend(split)
+        elif NON_WORD_RE.search(token):
+            for pattern in TREEBANK_SPLIT_RES:
+                token = pattern.sub(r' \1 \2 ', token)
+            tokens.extend(token.split())
+        else:
+            tokens.append(token)
+    return tokens
+
+
+def nltk_tokenize(text):
+    """Tokenizar con clean_text + word_tokenize de NLTK (modo original)"""
+    from nltk.tokenize import word_tokenize
+    return word_tokenize(clean_text(text), language='spanish')
+
+
+TOKENIZERS = {'fast': fast_tokenize, 'nltk': nltk_tokenize}
+
+
+def extract_words(text, stop_words, tokenizer='fast'):
+    """Extraer palabras limpias del texto"""
+    # Tokenizar
+    words = TOKENIZERS[tokenizer](text)
+    # Filtrar stopwords y palabras muy cortas, pero ser menos restrictivo
+    words = [word for word in words if word not in stop_words and len(word) > 1]  # Cambio de >2 a >1
+
+    return words
+
+
+def generate_ngrams(words, n):
+    """Generar n-gramas de una lista de palabras"""
+    if len(words) < n:
+        return []
+
+    ngrams = []
+    for i in range(len(words) - n + 1):
+        ngram = ' '.join(words[i:i+n])
+        ngrams.append(ngram)
+
+    return ngrams
+
+
+def count_ngrams(words, n):
+    """Frecuencia de cada n-grama sin crear un string por aparición (solo uno por n-grama distinto)"""
+    if n == 1:
+        return Counter(words)
+    counts = Counter(zip(*(words[i:] for i in range(n))))
+    return Counter({' '.join(gram): count for gram, count in counts.items()})
+
+
+def build_record(title, url, text, links, ediciones, options, timings=None):
+    """
+    Tokenizar el texto y crear el registro de datos de una página (None si es muy corta)
+
+    Si se pasa `timings`, se anotan ahí los segundos de tokenización y de n-gramas.
+    """
+    # Procesar palabras
+    start = time.perf_counter()
+    words = extract_words(text, options['stop_words'], options.get('tokenizer', 'fast'))
+    tokenized = time.perf_counter()
+    if timings is not None:
+        timings['tokenize'] = tokenized - start
+
+    if len(words) < MIN_WORDS:  # Saltar páginas con muy poco contenido
+        return None
+
+    # Generar n-gramas: listas posicionales o mapas de frecuencia según ngram_format
+    if options.get('ngram_format') == 'counts':
+        unigramas = count_ngrams(words, 1)
+        bigramas = count_ngrams(words, 2)
+        trigramas = count_ngrams(words, 3)
+    else:
+        unigramas = words
+        bigramas = generate_ngrams(words, 2)
+        trigramas = generate_ngrams(words, 3)
+    if timings is not None:
+        timings['ngram'] = time.perf_counter() - tokenized
+
+    # Crear registro de datos
+    record = {
+        'titulo': title,
+        'url': url,
+        'unigramas': unigramas,
+        'bigramas': bigramas,
+        'trigramas': trigramas,
+        'links': links,
+        'ediciones': ediciones,
+        'timestamp': datetime.now().isoformat()
+    }
+    if options.get('simhash'):
+        # Huella para detectar casi duplicados; el proceso principal la quita antes de guardar
+        start = time.perf_counter()
+        record['simhash'] = simhash(words)
+        if timings is not None:
+            timings['simhash'] = time.perf_counter() - start
+    return record
+
+
+def page_links(links, url):
+    """Enlaces que guarda la fila de una página: sin repetir y sin el enlace a sí misma"""
+    return [link for link in dict.fromkeys(links) if link != url]
+
+
+def process_document(url, document, base_url, options=None):
+    """
+    Procesar un documento descargado: HTML -> (registro, total de enlaces en la página, tiempos)
+
+    El registro queda con 'ediciones' vacío y con todos los enlaces a artículos;
+    el proceso principal filtra los ya visitados y completa el historial. Los tiempos
+    ({etapa: segundos} de parse, tokenize y ngram) vuelven al proceso principal para
+    las métricas, también cuando la página se descarta.
+    """
+    options = options or _worker_options
+    start = time.perf_counter()
+    article = extract_article(document['html'], base_url, title=document.get('title'))
+    timings = {'parse': time.perf_counter() - start}
+    if article is None:
+        return None, 0, timings
+
+    title, text, links, all_links_found = article
+    return build_record(title, url, text, links, {}, options, timings), all_links_found, timings
+
+
+def process_wikitext(title, url, wikitext, ediciones, base_url, options=None):
+    """Procesar una página de un dump XML: wikitexto -> registro"""
+    options = options or _worker_options
+    return build_record(
+        title,
+        url,
+        wikitext_to_text(wikitext),
+        extract_wikilinks(wikitext, base_url, url),
+        ediciones,
+        options
+    )
+
+
+def process_archived(url, location, metadata_location, base_url, options=None):
+    """
+    Procesar una página archivada en WARC (modo reprocess): -> (registro, tiempos)
+
+    La lectura y descompresión del registro también ocurren en el worker, así el proceso
+    principal solo recibe el registro terminado. Las ediciones y la revisión salen del
+    registro de metadata guardado al crawlear. Los enlaces quedan como en la fila del
+    crawl (page_links), así re-procesar sin cambios de configuración reproduce las filas.
+    """
+    options = options or _worker_options
+    document = read_document(location, url)
+    page_data, _, timings = process_document(url, document, base_url, options)
+    if page_data is not None:
+        page_data['links'] = page_links(page_data['links'], url)
+        metadata = read_metadata(metadata_location)
+        page_data['ediciones'] = metadata.get('ediciones', {})
+        if metadata.get('revision'):
+            page_data['revision'] = metadata['revision']
+    return page_data, timings
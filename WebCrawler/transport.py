@@ -0,0 +1,137 @@
+import json
+import logging
+import os
+import threading
+from collections import OrderedDict
+
+import requests
+from requests.adapters import HTTPAdapter
+
+try:
+    import brotli  # noqa: F401  (urllib3 lo usa para decodificar 'br')
+    ACCEPT_ENCODING = 'gzip, deflate, br'
+except ImportError:
+    ACCEPT_ENCODING = 'gzip, deflate'
+
+logger = logging.getLogger(__name__)
+
+
+class ValidatorCache:
+    """
+    Caché en disco de validadores HTTP (ETag / Last-Modified) por URL
+
+    Solo guarda los validadores de páginas que ya quedaron registradas en la salida,
+    así un 304 significa siempre "esta página ya está guardada y no cambió".
+    """
+
+    def __init__(self, path, max_entries=200000):
+        self.path = path
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.pending = OrderedDict()
+        self.dirty = False
+        self._lock = threading.Lock()
+        self.load()
+
+    def load(self):
+        """Cargar los validadores guardados en ejecuciones anteriores"""
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                self.entries = OrderedDict(json.load(f))
+            logger.info(f"🗂️ Caché de validadores HTTP: {len(self.entries)} URLs")
+        except Exception as e:
+            logger.warning(f"Error cargando caché de validadores: {e}")
+
+    def get(self, url):
+        with self._lock:
+            return self.entries.get(url)
+
+    def stage(self, url, response):
+        """Anotar los validadores de una respuesta hasta que la página se registre"""
+        etag = response.headers.get('ETag')
+        last_modified = response.headers.get('Last-Modified')
+        if not etag and not last_modified:
+            return
+        with self._lock:
+            self.pending[url] = [etag, last_modified]
+            # Las páginas descartadas nunca se confirman; evitar que el pendiente crezca
+            while len(self.pending) > 1000:
+                self.pending.popitem(last=False)
+
+    def commit(self, url):
+        """Confirmar los validadores de una página que ya quedó guardada"""
+        with self._lock:
+            validators = self.pending.pop(url, None)
+            if validators is None:
+                return
+            self.entries[url] = validators
+            self.entries.move_to_end(url)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+            self.dirty = True
+
+    def save(self):
+        """Guardar la caché de forma atómica (archivo temporal + rename)"""
+        if not self.path or not self.dirty:
+            return
+        with self._lock:
+            snapshot = list(self.entries.items())
+            self.dirty = False
+        temp_path = self.path + '.tmp'
+        try:
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump(snapshot, f, ensure_ascii=False, separators=(',', ':'))
+            os.replace(temp_path, self.path)
+        except Exception as e:
+            logger.warning(f"Error guardando caché de validadores: {e}")
+
+
+class HttpTransport:
+    """
+    Capa de transporte HTTP compartida por el crawler
+
+    - Una sola `requests.Session` con pool de conexiones keep-alive (sin handshake TCP+TLS por página).
+    - Negociación de compresión gzip/deflate (y br si está instalado `brotli`).
+    - GET condicionales con If-None-Match / If-Modified-Since usando `ValidatorCache`.
+    """
+
+    def __init__(self, headers, cache_path=None, pool_size=10, timeout=10):
+        self.timeout = timeout
+        self.session = requests.Session()
+        self.session.headers.update(headers)
+        self.session.headers['Accept-Encoding'] = ACCEPT_ENCODING
+
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+        self.validators = ValidatorCache(cache_path)
+        self.not_modified_count = 0
+
+    def get(self, url, params=None, conditional=False):
+        """GET usando el pool; con `conditional` envía los validadores guardados de la URL"""
+        headers = {}
+        if conditional:
+            cached = self.validators.get(url)
+            if cached:
+                etag, last_modified = cached
+                if etag:
+                    headers['If-None-Match'] = etag
+                if last_modified:
+                    headers['If-Modified-Since'] = last_modified
+
+        response = self.session.get(url, params=params, headers=headers, timeout=self.timeout)
+
+        if response.status_code == 304:
+            self.not_modified_count += 1
+        elif conditional and response.status_code == 200:
+            self.validators.stage(url, response)
+
+        return response
+
+    def close(self):
+        """Cerrar las conexiones y persistir la caché de validadores"""
+        self.validators.save()
+        self.session.close()
@@ -0,0 +1,235 @@
+import hashlib
+import math
+import struct
+from array import array
+from urllib.parse import quote, unquote, urlsplit, urlunsplit
+
+from dump_reader import normalize_title, URL_SAFE_CHARS
+
+# Valores reservados en la tabla de huellas (las huellas reales se desplazan para no chocar)
+EMPTY, DELETED = 0, 1
+
+EXACT_FORMAT = b'F'
+BLOOM_FORMAT = b'B'
+BLOOM_HEADER = struct.Struct('<QQQQ')  # bits, funciones hash, elementos agregados, excepciones
+EXACT_HEADER = struct.Struct('<QQ')  # huellas vivas, casillas ocupadas
+
+
+def canonicalize_url(url):
+    """
+    Forma canónica de una URL de artículo
+
+    Decodifica y vuelve a codificar el título igual que MediaWiki (mismos caracteres
+    seguros que title_to_url), normaliza espacios/guiones bajos y la primera letra,
+    y quita el fragmento. Así '/wiki/costa rica', '/wiki/Costa_Rica' y
+    '/wiki/Costa%5FRica' son la misma página.
+    """
+    parts = urlsplit(url)
+    scheme = parts.scheme.lower() or 'https'
+    netloc = parts.netloc.lower()
+    if parts.path.startswith('/wiki/'):
+        title = normalize_title(unquote(parts.path[len('/wiki/'):]))
+        return f"{scheme}://{netloc}/wiki/{quote(title.replace(' ', '_'), safe=URL_SAFE_CHARS)}"
+    return urlunsplit((scheme, netloc, parts.path, parts.query, ''))
+
+
+def url_fingerprint(url):
+    """Huella de 64 bits de una URL (ya canónica)"""
+    fingerprint = int.from_bytes(hashlib.blake2b(url.encode('utf-8'), digest_size=8).digest(), 'little')
+    # EMPTY y DELETED marcan casillas de la tabla: las huellas 0 y 1 se corren a 2 y 3
+    return fingerprint if fingerprint > DELETED else fingerprint + 2
+
+
+class FingerprintSet:
+    """
+    Conjunto de huellas de 64 bits en una tabla hash abierta sobre array('Q')
+
+    Ocupa 8 bytes por casilla con un factor de carga de hasta 1/2 (16-32 bytes por
+    URL), contra cientos de bytes de un str dentro de un set. Usa sondeo lineal y
+    marcas de borrado para `discard`.
+
+    Admite un escritor (el event loop) y lectores en otros threads (extract_links en
+    los threads de descarga) sin lock: la tabla y su máscara viven juntas en la tupla
+    `slots`, que cada búsqueda lee una sola vez, y al crecer la tabla nueva se llena
+    completa antes de reemplazar la tupla, así que un lector nunca combina la máscara
+    nueva con la tabla vieja ni ve una tabla a medio llenar.
+    """
+
+    def __init__(self, capacity=1024):
+        self.slots = self._new_slots(capacity)
+        self.count = 0
+        self.used = 0  # Casillas ocupadas, incluyendo borradas
+
+    @staticmethod
+    def _new_slots(capacity):
+        size = 1 << max(4, (capacity * 2 - 1).bit_length())
+        return array('Q', bytes(8 * size)), size - 1
+
+    @staticmethod
+    def _find(slots, fingerprint):
+        """Casilla donde está la huella, o la casilla libre donde se insertaría (con su estado)"""
+        table, mask = slots
+        index = fingerprint & mask
+        free = None
+        while True:
+            value = table[index]
+            if value == fingerprint:
+                return index, True
+            if value == EMPTY:
+                return (index if free is None else free), False
+            if value == DELETED and free is None:
+                free = index
+            index = (index + 1) & mask
+
+    def add(self, fingerprint):
+        if (self.used + 1) * 2 > len(self.slots[0]):
+            self._resize()
+        slots = self.slots
+        index, found = self._find(slots, fingerprint)
+        if found:
+            return
+        table = slots[0]
+        if table[index] == EMPTY:
+            self.used += 1
+        table[index] = fingerprint
+        self.count += 1
+
+    def discard(self, fingerprint):
+        slots = self.slots
+        index, found = self._find(slots, fingerprint)
+        if found:
+            slots[0][index] = DELETED
+            self.count -= 1
+
+    def __contains__(self, fingerprint):
+        return self._find(self.slots, fingerprint)[1]
+
+    def __len__(self):
+        return self.count
+
+    def __iter__(self):
+        return (value for value in self.slots[0] if value > DELETED)
+
+    def _resize(self):
+        live = array('Q', iter(self))
+        slots = self._new_slots(max(len(live) * 2, 1024))
+        table = slots[0]
+        for fingerprint in live:
+            table[self._find(slots, fingerprint)[0]] = fingerprint
+        # Una sola asignación: los lectores ven la tabla vieja completa o la nueva completa
+        self.slots = slots
+        self.used = len(live)
+
+
+class BloomFilter:
+    """Filtro de Bloom sobre huellas de 64 bits (doble hashing con sus dos mitades)"""
+
+    def __init__(self, capacity, error_rate=0.001, bits=None, hashes=None):
+        self.bits = bits or max(64, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hashes = hashes or max(1, round(self.bits / capacity * math.log(2)))
+        self.data = bytearray((self.bits + 7) // 8)
+        self.count = 0
+
+    def _positions(self, fingerprint):
+        h1 = fingerprint & 0xFFFFFFFF
+        h2 = (fingerprint >> 32) | 1
+        return ((h1 + i * h2) % self.bits for i in range(self.hashes))
+
+    def add(self, fingerprint):
+        for position in self._positions(fingerprint):
+            self.data[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, fingerprint):
+        return all(self.data[position >> 3] & (1 << (position & 7)) for position in self._positions(fingerprint))
+
+
+class VisitedSet:
+    """
+    Conjunto compacto de URLs visitadas (reemplaza al set de strings)
+
+    Guarda huellas de 64 bits de las URLs canónicas en un FingerprintSet exacto o,
+    con `bloom_error_rate`, en un filtro de Bloom (~1-2 bytes por URL a cambio de
+    falsos positivos: alguna URL nueva se toma por visitada). Como un filtro de Bloom
+    no permite borrar, `discard` anota la huella en un conjunto pequeño de excepciones.
+    Se serializa con `tobytes`/`frombytes` para los checkpoints.
+    """
+
+    def __init__(self, expected_items=100000, bloom_error_rate=None):
+        if bloom_error_rate:
+            self.fingerprints = BloomFilter(expected_items, bloom_error_rate)
+        else:
+            self.fingerprints = FingerprintSet(expected_items)
+        self.discarded = set()
+
+    @property
+    def is_bloom(self):
+        return isinstance(self.fingerprints, BloomFilter)
+
+    def add(self, url):
+        fingerprint = url_fingerprint(url)
+        self.discarded.discard(fingerprint)
+        if fingerprint not in self.fingerprints:
+            self.fingerprints.add(fingerprint)
+
+    def update(self, urls):
+        for url in urls:
+            self.add(url)
+
+    def discard(self, url):
+        fingerprint = url_fingerprint(url)
+        if self.is_bloom:
+            self.discarded.add(fingerprint)
+        else:
+            self.fingerprints.discard(fingerprint)
+
+    def __contains__(self, url):
+        fingerprint = url_fingerprint(url)
+        return fingerprint in self.fingerprints and fingerprint not in self.discarded
+
+    def __len__(self):
+        if self.is_bloom:
+            return self.fingerprints.count - len(self.discarded)
+        return len(self.fingerprints)
+
+    def tobytes(self):
+        """
+        Serializar: la tabla hash tal cual (modo exacto) o los bits del filtro (modo Bloom)
+
+        Se guarda la tabla completa y no solo las huellas para que cargarla sea una copia
+        de memoria, sin reinsertar cada huella.
+        """
+        if self.is_bloom:
+            bloom = self.fingerprints
+            return (BLOOM_FORMAT + BLOOM_HEADER.pack(bloom.bits, bloom.hashes, bloom.count, len(self.discarded))
+                    + bytes(bloom.data) + array('Q', self.discarded).tobytes())
+        table = self.fingerprints
+        return EXACT_FORMAT + EXACT_HEADER.pack(table.count, table.used) + table.slots[0].tobytes()
+
+    @classmethod
+    def frombytes(cls, data):
+        data = memoryview(data)
+        visited = cls.__new__(cls)
+        visited.discarded = set()
+        if bytes(data[:1]) == BLOOM_FORMAT:
+            bits, hashes, count, discarded = BLOOM_HEADER.unpack_from(data, 1)
+            bloom = BloomFilter(1, bits=bits, hashes=hashes)
+            start = 1 + BLOOM_HEADER.size
+            end = start + len(bloom.data)
+            bloom.data = bytearray(data[start:end])
+            bloom.count = count
+            visited.fingerprints = bloom
+            if discarded:
+                exceptions = array('Q')
+                exceptions.frombytes(data[end:])
+                visited.discarded = set(exceptions)
+        else:
+            count, used = EXACT_HEADER.unpack_from(data, 1)
+            table = FingerprintSet.__new__(FingerprintSet)
+            slots = array('Q')
+            slots.frombytes(data[1 + EXACT_HEADER.size:])
+            table.slots = (slots, len(slots) - 1)
+            table.count = count
+            table.used = used
+            visited.fingerprints = table
+        return visited
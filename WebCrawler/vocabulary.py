@@ -0,0 +1,156 @@
+import logging
+import os
+from array import array
+from collections import Counter
+
+logger = logging.getLogger(__name__)
+
+
+class IdGrams:
+    """
+    N-gramas posicionales como IDs en un array('I')
+
+    Se comporta como la lista de n-gramas (len, iteración y slices devuelven tuplas de
+    IDs) pero ocupa 4 bytes por token en lugar de un str por n-grama. Con `sliding` los
+    n-gramas son las ventanas consecutivas de `ids` (el array de unigramas de la página,
+    compartido sin copiarlo); si no, las tuplas van una tras otra.
+    """
+    __slots__ = ('n', 'ids', 'sliding')
+
+    def __init__(self, n, ids, sliding=False):
+        self.n = n
+        self.ids = ids
+        self.sliding = sliding
+
+    def __len__(self):
+        if self.sliding:
+            return max(0, len(self.ids) - self.n + 1)
+        return len(self.ids) // self.n
+
+    def start(self, index):
+        return index if self.sliding else index * self.n
+
+    def __iter__(self):
+        return iter(self[:])
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            raise TypeError("IdGrams solo admite slices")
+        ids, n = self.ids, self.n
+        return [tuple(ids[self.start(i):self.start(i) + n]) for i in range(*index.indices(len(self)))]
+
+
+def gram_text(gram):
+    """Forma de texto de un n-grama: el mismo str, o los IDs separados por espacios"""
+    if isinstance(gram, str):
+        return gram
+    if isinstance(gram, int):
+        return str(gram)
+    return ' '.join(map(str, gram))
+
+
+class Vocabulary:
+    """
+    Diccionario token -> ID entero estable, para guardar los n-gramas como enteros
+
+    Los IDs se asignan en orden de aparición y el archivo tiene un token por línea (el
+    número de línea, desde 0, es el ID), así que solo crece agregando al final y un ID
+    nunca cambia entre ejecuciones. `save()` agrega los tokens nuevos y hace fsync; el
+    crawler lo llama antes de confirmar cada lote de filas, así ninguna fila confirmada
+    referencia un ID que no esté en el archivo.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.ids = {}
+        self.tokens = []
+        self.saved = 0
+        self.load()
+
+    def __len__(self):
+        return len(self.tokens)
+
+    def load(self):
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, 'rb') as f:
+            data = f.read()
+        complete = data.rfind(b'\n') + 1
+        if complete < len(data):
+            # Una línea sin '\n' es un token a medio escribir: ninguna fila confirmada lo usa
+            logger.warning(f"✂️ Descartando un token incompleto al final de {self.path}")
+            with open(self.path, 'r+b') as f:
+                f.truncate(complete)
+        self.tokens = data[:complete].decode('utf-8').split('\n')[:-1]
+        self.ids = {token: index for index, token in enumerate(self.tokens)}
+        self.saved = len(self.tokens)
+
+    def id(self, token):
+        token_id = self.ids.get(token)
+        if token_id is None:
+            token_id = self.ids[token] = len(self.tokens)
+            self.tokens.append(token)
+        return token_id
+
+    def encode(self, words):
+        """Lista de tokens -> array('I') de IDs"""
+        ids = self.ids
+        for token in dict.fromkeys(words):  # Tokens nuevos en orden de aparición
+            if token not in ids:
+                self.id(token)
+        return array('I', map(ids.__getitem__, words))
+
+    def encode_ngrams(self, ngrams, n):
+        """
+        Codificar un campo de n-gramas: lista -> array('I') (n=1) o IdGrams,
+        mapa de frecuencias -> Counter con claves ID (n=1) o tuplas de IDs
+        """
+        if isinstance(ngrams, dict):
+            if n == 1:
+                return Counter({self.id(gram): count for gram, count in ngrams.items()})
+            return Counter({tuple(map(self.id, gram.split(' '))): count for gram, count in ngrams.items()})
+        if n == 1:
+            return self.encode(ngrams)
+        ids = array('I')
+        for gram in ngrams:
+            ids.extend(map(self.id, gram.split(' ')))
+        return IdGrams(n, ids)
+
+    def encode_page(self, page_data):
+        """
+        Reemplazar en su lugar los n-gramas de una página por sus IDs
+
+        En el formato de listas los bigramas y trigramas son las ventanas consecutivas de
+        los unigramas: se representan sobre el mismo array, sin volver a separar strings.
+        """
+        unigramas = page_data.get('unigramas', [])
+        encoded = self.encode_ngrams(unigramas, 1)
+        for field, n in (('bigramas', 2), ('trigramas', 3)):
+            ngrams = page_data.get(field, [])
+            if isinstance(ngrams, list) and isinstance(unigramas, list) and self.are_windows(unigramas, ngrams, n):
+                page_data[field] = IdGrams(n, encoded, sliding=True)
+            else:
+                page_data[field] = self.encode_ngrams(ngrams, n)
+        page_data['unigramas'] = encoded
+        return page_data
+
+    @staticmethod
+    def are_windows(words, ngrams, n):
+        """True si `ngrams` son las ventanas de n tokens de `words` (como las genera generate_ngrams)"""
+        if len(ngrams) != max(0, len(words) - n + 1):
+            return False
+        return not ngrams or (ngrams[0] == ' '.join(words[:n]) and ngrams[-1] == ' '.join(words[-n:]))
+
+    def decode(self, ids):
+        return [self.tokens[token_id] for token_id in ids]
+
+    def save(self):
+        """Agregar al archivo los tokens nuevos desde el último save (con fsync)"""
+        if self.saved == len(self.tokens):
+            return
+        new_tokens = self.tokens[self.saved:]
+        with open(self.path, 'a', encoding='utf-8', newline='\n') as f:
+            f.write('\n'.join(new_tokens) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+        self.saved += len(new_tokens)
@@ -0,0 +1,299 @@
+import base64
+import gzip
+import hashlib
+import json
+import logging
+import os
+import threading
+import uuid
+import zlib
+from datetime import datetime, timezone
+from urllib.parse import unquote, urlsplit
+
+logger = logging.getLogger(__name__)
+
+INDEX_FILE = 'index.cdx'
+REVISIT_PROFILE = 'http://netpreserve.org/warc/1.1/revisit/identical-payload-digest'
+
+# Encabezados que dejan de ser ciertos al guardar el cuerpo ya descomprimido
+DROPPED_HEADERS = {'content-encoding', 'content-length', 'transfer-encoding'}
+
+
+def payload_digest(body):
+    """Digest del contenido (SHA-1 en base32, como lo escriben los crawlers WARC)"""
+    return 'sha1:' + base64.b32encode(hashlib.sha1(body).digest()).decode('ascii')
+
+
+def warc_date():
+    return datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+
+
+def http_block(response, body_bytes=None):
+    """Respuesta HTTP serializada: línea de estado, encabezados y (si se pasa) el cuerpo"""
+    lines = [f"HTTP/1.1 {response.status_code} {response.reason or ''}".rstrip()]
+    for name, value in response.headers.items():
+        if name.lower() not in DROPPED_HEADERS:
+            lines.append(f"{name}: {value}")
+    if body_bytes is not None:
+        lines.append(f"Content-Length: {len(body_bytes)}")
+    head = ('\r\n'.join(lines) + '\r\n\r\n').encode('utf-8')
+    return head + (body_bytes or b'')
+
+
+def encode_record(headers, block):
+    """Registro WARC/1.1 comprimido como un miembro gzip independiente (se puede leer por offset)"""
+    fields = [('WARC-Record-ID', f'<urn:uuid:{uuid.uuid4()}>'), ('WARC-Date', warc_date())]
+    fields += list(headers) + [('Content-Length', str(len(block)))]
+    head = 'WARC/1.1\r\n' + ''.join(f"{name}: {value}\r\n" for name, value in fields) + '\r\n'
+    return gzip.compress(head.encode('utf-8') + block + b'\r\n\r\n', compresslevel=6)
+
+
+def parse_record(data):
+    """Registro WARC descomprimido -> (encabezados, bloque)"""
+    head, _, rest = data.partition(b'\r\n\r\n')
+    headers = {}
+    for line in head.decode('utf-8').split('\r\n')[1:]:
+        name, _, value = line.partition(':')
+        headers[name.strip()] = value.strip()
+    length = int(headers.get('Content-Length', len(rest)))
+    return headers, rest[:length]
+
+
+def read_record(location):
+    """Leer un registro a partir de su ubicación (archivo, offset, largo) en el índice"""
+    path, offset, length = location
+    with open(path, 'rb') as f:
+        f.seek(offset)
+        return parse_record(gzip.decompress(f.read(length)))
+
+
+def split_http(block):
+    """Bloque de una respuesta HTTP -> (código, encabezados en minúsculas, cuerpo)"""
+    head, _, body = block.partition(b'\r\n\r\n')
+    lines = head.decode('iso-8859-1').split('\r\n')
+    status = int(lines[0].split(' ', 2)[1])
+    headers = {}
+    for line in lines[1:]:
+        name, _, value = line.partition(':')
+        headers[name.strip().lower()] = value.strip()
+    return status, headers, body
+
+
+def read_document(location, page_url):
+    """
+    Reconstruir el documento {'html', 'title'} que devolvió fetch_page al crawlear
+
+    Según el modo de descarga guardado en el registro: la página completa, el JSON de
+    action=parse o el HTML del endpoint REST (el título sale de la URL, como al crawlear).
+    """
+    headers, block = read_record(location)
+    _, _, body = split_http(block)
+    fetch_mode = headers.get('WikiCrawler-Fetch-Mode', 'html')
+    if fetch_mode == 'parse':
+        data = json.loads(body)
+        return {'html': data['parse']['text'], 'title': data['parse']['title']}
+    if fetch_mode == 'rest':
+        title = unquote(urlsplit(page_url).path.split('/wiki/', 1)[-1]).replace('_', ' ')
+        return {'html': body, 'title': title}
+    return {'html': body, 'title': None}
+
+
+def read_metadata(location):
+    """Datos guardados al terminar la página (ediciones, revisión) o {} si no hay"""
+    if location is None:
+        return {}
+    _, block = read_record(location)
+    return json.loads(block)
+
+
+def scan_records(path):
+    """Recorrer un .warc.gz miembro por miembro: (offset, largo, encabezados); para si el final está cortado"""
+    with open(path, 'rb') as f:
+        data = f.read()
+    offset = 0
+    while offset < len(data):
+        decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        try:
+            record = decompressor.decompress(data[offset:])
+        except zlib.error:
+            logger.warning(f"✂️ {os.path.basename(path)}: registro dañado en el byte {offset}, se ignora el resto")
+            return
+        if not decompressor.eof:
+            logger.warning(f"✂️ {os.path.basename(path)}: registro incompleto al final (byte {offset})")
+            return
+        length = len(data) - offset - len(decompressor.unused_data)
+        yield offset, length, parse_record(record)[0]
+        offset += length
+
+
+class WarcWriter:
+    """
+    Archivo de las respuestas descargadas en WARC comprimido (.warc.gz), direccionado por contenido
+
+    Cada registro es un miembro gzip propio, así que se puede leer con un seek al offset
+    que guarda el índice (`index.cdx`: URL de la página, tipo, digest, archivo, offset y
+    largo). Si el contenido de una respuesta (su SHA-1) ya está archivado, se escribe un
+    registro `revisit` solo con los encabezados y el índice apunta al original. Después
+    de cada página terminada se agrega un registro `metadata` con sus ediciones y su
+    revisión, para poder re-derivar el corpus completo sin red (ver WarcArchive).
+
+    Cada ejecución empieza archivos nuevos (rotan al llegar a `max_file_mb`): un registro
+    cortado por una interrupción queda al final de un archivo que ya no se continúa. Es
+    thread-safe: las descargas ocurren en el pool de threads.
+    """
+
+    def __init__(self, directory, max_file_mb=1024, prefix='wikicrawl'):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.max_file_bytes = int(max_file_mb * 1024 * 1024)
+        self.run_id = f"{prefix}-{datetime.now(timezone.utc).strftime('%Y%m%d%H%M%S')}-{os.getpid()}"
+        self.sequence = 0
+        self.file = None
+        self.file_name = None
+        self.digests = {}  # digest -> (archivo, offset, largo) de la respuesta completa
+        self.bytes_written = 0
+        self.revisits = 0
+        self._lock = threading.Lock()
+        self.index_path = os.path.join(directory, INDEX_FILE)
+        if os.path.exists(self.index_path):
+            for entry in iter_index(self.index_path):
+                if entry['type'] == 'response':
+                    self.digests.setdefault(entry['digest'], entry['location'][1:])
+        self.index = open(self.index_path, 'a', encoding='utf-8')
+
+    def open_file(self):
+        if self.file is not None:
+            self.file.close()
+        self.file_name = f"{self.run_id}-{self.sequence:05d}.warc.gz"
+        self.sequence += 1
+        self.file = open(os.path.join(self.directory, self.file_name), 'ab')
+        self.file.write(encode_record(
+            [('WARC-Type', 'warcinfo'), ('WARC-Filename', self.file_name), ('Content-Type', 'application/warc-fields')],
+            b'software: WikipediaCrawler\r\nformat: WARC File Format 1.1\r\n'
+        ))
+
+    def append(self, page_url, record_type, digest, data, location=None):
+        """Agregar un registro ya comprimido y su línea de índice (location: la del original)"""
+        with self._lock:
+            if self.file is None or self.file.tell() >= self.max_file_bytes:
+                self.open_file()
+            offset = self.file.tell()
+            self.file.write(data)
+            self.file.flush()
+            self.bytes_written += len(data)
+            if location is None:
+                location = (self.file_name, offset, len(data))
+                if record_type == 'response':
+                    self.digests.setdefault(digest, location)
+            file_name, offset, length = location
+            self.index.write(f"{page_url} {record_type} {digest} {file_name} {offset} {length}\n")
+            self.index.flush()
+
+    def write_response(self, page_url, response, fetch_mode):
+        """Archivar la respuesta de una página (el cuerpo se guarda descomprimido)"""
+        body = response.content
+        digest = payload_digest(body)
+        headers = [
+            ('WARC-Target-URI', response.url),
+            ('WARC-Payload-Digest', digest),
+            ('Content-Type', 'application/http; msgtype=response'),
+            ('WikiCrawler-Page-URL', page_url),
+            ('WikiCrawler-Fetch-Mode', fetch_mode),
+        ]
+        with self._lock:
+            original = self.digests.get(digest)
+        if original is not None:
+            # Mismo contenido ya archivado: solo los encabezados, el índice apunta al original
+            self.revisits += 1
+            data = encode_record([('WARC-Type', 'revisit'), ('WARC-Profile', REVISIT_PROFILE)] + headers,
+                                 http_block(response))
+            self.append(page_url, 'response', digest, data, location=original)
+            return
+        data = encode_record([('WARC-Type', 'response')] + headers, http_block(response, body))
+        self.append(page_url, 'response', digest, data)
+
+    def write_metadata(self, page_url, metadata):
+        block = json.dumps(metadata, ensure_ascii=False, default=list).encode('utf-8')
+        data = encode_record([
+            ('WARC-Type', 'metadata'),
+            ('WARC-Target-URI', page_url),
+            ('Content-Type', 'application/json'),
+        ], block)
+        self.append(page_url, 'metadata', payload_digest(block), data)
+
+    def close(self):
+        with self._lock:
+            if self.file is not None:
+                self.file.close()
+                self.file = None
+            self.index.close()
+
+
+def iter_index(index_path):
+    directory = os.path.dirname(index_path)
+    with open(index_path, encoding='utf-8') as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) != 6:
+                continue  # Línea cortada por una interrupción
+            page_url, record_type, digest, file_name, offset, length = parts
+            yield {
+                'url': page_url,
+                'type': record_type,
+                'digest': digest,
+                'location': (os.path.join(directory, file_name), file_name, int(offset), int(length))
+            }
+
+
+def rebuild_index(directory):
+    """Reconstruir index.cdx recorriendo los .warc.gz (si se perdió o se copiaron solo los WARC)"""
+    digests = {}
+    lines = []
+    for file_name in sorted(name for name in os.listdir(directory) if name.endswith('.warc.gz')):
+        for offset, length, headers in scan_records(os.path.join(directory, file_name)):
+            record_type = headers.get('WARC-Type')
+            if record_type in ('response', 'revisit'):
+                digest = headers.get('WARC-Payload-Digest', '-')
+                location = (file_name, offset, length)
+                if record_type == 'response':
+                    digests.setdefault(digest, location)
+                elif digest in digests:
+                    location = digests[digest]
+                else:
+                    continue
+                lines.append(f"{headers.get('WikiCrawler-Page-URL')} response {digest} "
+                             f"{location[0]} {location[1]} {location[2]}\n")
+            elif record_type == 'metadata':
+                lines.append(f"{headers.get('WARC-Target-URI')} metadata - {file_name} {offset} {length}\n")
+    with open(os.path.join(directory, INDEX_FILE), 'w', encoding='utf-8') as f:
+        f.writelines(lines)
+    return len(lines)
+
+
+class WarcArchive:
+    """Lectura de uno o varios directorios de WARC para re-procesar el corpus sin red"""
+
+    def __init__(self, directories):
+        self.directories = [directories] if isinstance(directories, str) else list(directories)
+
+    def pages(self):
+        """
+        Última captura de cada página: [(url, ubicación de la respuesta, ubicación de la metadata)]
+
+        Ordenadas por archivo y offset para leer los WARC en secuencia; las ubicaciones son
+        tuplas (ruta, offset, largo) para read_document / read_metadata.
+        """
+        responses = {}
+        metadata = {}
+        for directory in self.directories:
+            index_path = os.path.join(directory, INDEX_FILE)
+            if not os.path.exists(index_path):
+                logger.info(f"🗂️ Sin índice en {directory}: reconstruyéndolo desde los WARC...")
+                rebuild_index(directory)
+            for entry in iter_index(index_path):
+                path, _, offset, length = entry['location']
+                target = responses if entry['type'] == 'response' else metadata
+                target[entry['url']] = (path, offset, length)
+        pages = [(url, location, metadata.get(url)) for url, location in responses.items()]
+        pages.sort(key=lambda page: page[1])
+        return pages